@@ -1,6 +1 @@
-# This file makes the app directory a Python package 
-
-from .core.config import settings, config_manager
-from .routers import files, config
-
-__all__ = ['settings', 'config_manager', 'files', 'config'] 
\ No newline at end of file
+# This file makes the app directory a Python package 
\ No newline at end of file
@@ -4,9 +4,21 @@
 from .futils import (
     get_long_path,
     safe_rename,
+    rename_noreplace,
     safe_makedirs,
     safe_path_exists,
     safe_remove_file,
     safe_remove_empty_dir,
-    safe_get_file_size
-) 
\ No newline at end of file
+    safe_remove_files,
+    prune_empty_dirs,
+    safe_get_file_size,
+    async_safe_rename,
+    async_safe_makedirs,
+    async_safe_path_exists,
+    async_safe_remove_file,
+    async_safe_remove_empty_dir,
+    async_safe_remove_files,
+    async_prune_empty_dirs,
+    async_safe_get_file_size
+)
+from .executor import io_executor, run_io, run_io_cancellable, run_in_thread 
\ No newline at end of file
@@ -1,50 +1,128 @@
 from pydantic import BaseModel
-from typing import List, Optional
-import yaml
+from typing import Callable, FrozenSet, List, Optional
+import json
+import logging
 import os
+import threading
 from pathlib import Path
 from ..models.settings import Settings
 from ..models.config import LLMConfig, TMDBConfig, MediaConfig, BasicConfig
 
+# Called with the previous snapshot, the new one and the names of the
+# changed sections (e.g. "tmdb_config")
+SettingsListener = Callable[[Settings, Settings, FrozenSet[str]], None]
+
 class MediaLibrary(BaseModel):
     path: str
     type: str  # 'movie' 或 'tv'
 
+def changed_sections(old: Settings, new: Settings) -> FrozenSet[str]:
+    """Names of the top-level settings fields that differ between two snapshots"""
+    return frozenset(
+        name for name in Settings.model_fields
+        if getattr(old, name) != getattr(new, name)
+    )
+
 class ConfigManager:
-    """Configuration manager for the application"""
-    
+    """
+    Configuration manager for the application
+
+    Settings are immutable snapshots. Saving publishes a new snapshot with
+    the next version number and notifies the listeners of the sections that
+    changed, so services can rebuild the clients, pools and limiters built
+    from those sections while holders of the old snapshot keep a consistent
+    view until they are done with it.
+    """
+
     def __init__(self, config_file: str = "config.json"):
         self.config_file = config_file
-        self.settings: Optional[Settings] = None
-    
+        self._settings: Optional[Settings] = None
+        self.version = 0
+        self._listeners: List[SettingsListener] = []
+        self._lock = threading.RLock()
+        self.logger = logging.getLogger("config")
+
+    @property
+    def settings(self) -> Settings:
+        """Current settings, read from the config file on first access"""
+        return self.get_settings()
+
     def load_settings(self) -> Settings:
         """Load settings from config file or create default settings"""
         if os.path.exists(self.config_file):
             with open(self.config_file, "r") as f:
                 config_data = json.load(f)
-                self.settings = Settings(**config_data)
+                self._publish(Settings(**config_data))
         else:
-            self.settings = Settings(
+            self.save_settings(Settings(
                 llm_config=LLMConfig.get_default_configs()["openai"],
                 tmdb_config=TMDBConfig.get_default_config(),
                 media_config=MediaConfig.get_default_config(),
                 basic_config=BasicConfig.get_default_config()
-            )
-            self.save_settings(self.settings)
-        return self.settings
-    
+            ))
+        return self._settings
+
     def save_settings(self, settings: Settings) -> None:
         """Save settings to config file"""
-        with open(self.config_file, "w") as f:
-            json.dump(settings.dict(), f, indent=2)
-        self.settings = settings
-    
+        with self._lock:
+            with open(self.config_file, "w") as f:
+                json.dump(settings.dict(), f, indent=2)
+            self._publish(settings)
+
+    def update_settings(self, **sections) -> Settings:
+        """
+        Save a new snapshot with the given sections replaced
+
+        Args:
+            **sections: Settings fields to replace, e.g. tmdb_config=TMDBConfig(...)
+        """
+        with self._lock:
+            settings = self.get_settings().model_copy(update=sections)
+            self.save_settings(settings)
+            return settings
+
     def get_settings(self) -> Settings:
         """Get current settings, loading them if necessary"""
-        if not self.settings:
-            self.settings = self.load_settings()
-        return self.settings
+        if not self._settings:
+            with self._lock:
+                if not self._settings:
+                    self.load_settings()
+        return self._settings
+
+    def subscribe(self, listener: SettingsListener) -> Callable[[], None]:
+        """
+        Call listener whenever a snapshot with changed sections is published
+
+        Returns:
+            A function that removes the listener
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if listener in self._listeners:
+                    self._listeners.remove(listener)
+        return unsubscribe
+
+    def _publish(self, settings: Settings) -> None:
+        """Make settings the current snapshot and notify listeners of the changes"""
+        with self._lock:
+            old, self._settings = self._settings, settings
+            self.version += 1
+            listeners = list(self._listeners)
+        if old is None:
+            return
+        changed = changed_sections(old, settings)
+        if not changed:
+            return
+        self.logger.info(f"Settings version {self.version}: {', '.join(sorted(changed))} changed")
+        for listener in listeners:
+            try:
+                listener(old, settings, changed)
+            except Exception as e:
+                self.logger.error(f"Settings listener failed: {str(e)}")
 
-# Create a global config manager instance
+# Create a global config manager instance; settings are loaded on startup
+# or on first access, not at import
 config_manager = ConfigManager()
-settings = config_manager.get_settings() 
\ No newline at end of file
@@ -0,0 +1,207 @@
+"""Container of lazily created, shared service instances"""
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple, Type, TypeVar
+
+T = TypeVar("T")
+
+# Seconds a dropped instance stays open for the requests still holding it
+CLOSE_GRACE = 60.0
+
+class ServiceContainer:
+    """
+    Creates one shared instance per registered service on first use
+
+    Services are built by their factory, which receives the container to
+    resolve the services they depend on, so a single TMDBService (and its
+    rate limiter) serves every router and service. Nothing is constructed at
+    import time.
+
+    When a new settings snapshot is published, the instances built from the
+    changed sections are dropped, together with the instances that were built
+    from them (a MovieService holding a rebuilt TMDBService); the next `get`
+    builds them again from the current settings, while requests already
+    running finish with the instances they hold. Dropped instances that own
+    connections (an `aclose()` or `close()` method) are closed on the event
+    loop `close_grace` seconds later, once those requests are done. Stateful
+    services (running jobs, transfers) are registered as not reloadable and
+    look up their collaborators through the container when they need them.
+    """
+
+    def __init__(self, config_manager, close_grace: float = CLOSE_GRACE):
+        self.config_manager = config_manager
+        self._factories: Dict[type, Tuple[Callable[["ServiceContainer"], Any], bool, Optional[FrozenSet[str]]]] = {}
+        self._instances: Dict[type, Any] = {}
+        # Service type -> services whose instances were built with it
+        self._dependents: Dict[type, Set[type]] = {}
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self.close_grace = close_grace
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Dropped instances waiting for their grace period to end
+        self._retired: List[Any] = []
+        self._closing: Set[asyncio.Task] = set()
+        self.logger = logging.getLogger("container")
+        config_manager.subscribe(self._settings_changed)
+
+    def register(
+        self,
+        service_type: Type[T],
+        factory: Optional[Callable[["ServiceContainer"], T]] = None,
+        reloadable: bool = True,
+        sections: Optional[Iterable[str]] = None
+    ) -> None:
+        """
+        Register how a service is built
+
+        Args:
+            service_type: Class the service is looked up by
+            factory: Builds the service from the container; defaults to service_type(config_manager)
+            reloadable: Rebuild the service after a settings change
+            sections: Settings sections the service is built from; None for all
+        """
+        if factory is None:
+            factory = lambda container: service_type(container.config_manager)
+        with self._lock:
+            self._factories[service_type] = (
+                factory,
+                reloadable,
+                frozenset(sections) if sections is not None else None
+            )
+            self._instances.pop(service_type, None)
+
+    def get(self, service_type: Type[T]) -> T:
+        """The shared instance of a service, created on first use"""
+        building = getattr(self._local, "building", None)
+        if building:
+            # Resolved while building another service: rebuild that one too
+            # when this one is replaced
+            with self._lock:
+                self._dependents.setdefault(service_type, set()).add(building[-1])
+        instance = self._instances.get(service_type)
+        if instance is not None:
+            return instance
+        with self._lock:
+            instance = self._instances.get(service_type)
+            if instance is None:
+                try:
+                    factory = self._factories[service_type][0]
+                except KeyError:
+                    raise LookupError(f"Service not registered: {service_type.__name__}") from None
+                if building is None:
+                    building = self._local.building = []
+                building.append(service_type)
+                try:
+                    instance = factory(self)
+                finally:
+                    building.pop()
+                self._instances[service_type] = instance
+                self.logger.debug(f"Created {service_type.__name__}")
+            return instance
+
+    def created(self, service_type: Type[T]) -> Optional[T]:
+        """The instance of a service if it has been created, without creating it"""
+        return self._instances.get(service_type)
+
+    def provider(self, service_type: Type[T]) -> Callable[[], T]:
+        """Dependency function returning the shared instance, for FastAPI's Depends"""
+        def provide() -> T:
+            return self.get(service_type)
+        provide.__name__ = f"provide_{service_type.__name__}"
+        return provide
+
+    def reload(self, sections: Optional[Iterable[str]] = None) -> None:
+        """
+        Drop reloadable instances so they are rebuilt from the current settings
+
+        Args:
+            sections: Changed settings sections; only services built from them
+                and the services built with those are dropped. None drops all.
+        """
+        changed = frozenset(sections) if sections is not None else None
+        with self._lock:
+            stale = [
+                service_type
+                for service_type, (_, reloadable, used) in self._factories.items()
+                if reloadable and (changed is None or used is None or used & changed)
+            ]
+            seen: Set[type] = set()
+            dropped = []
+            retired = []
+            while stale:
+                service_type = stale.pop()
+                if service_type in seen or not self._factories[service_type][1]:
+                    continue
+                seen.add(service_type)
+                instance = self._instances.pop(service_type, None)
+                if instance is not None:
+                    dropped.append(service_type)
+                    if _closer(instance) is not None:
+                        retired.append(instance)
+                stale.extend(self._dependents.pop(service_type, ()))
+            self._retired.extend(retired)
+        if dropped:
+            names = ", ".join(sorted(service_type.__name__ for service_type in dropped))
+            self.logger.info(f"Rebuilding from the updated settings: {names}")
+        if retired:
+            self._schedule_close(retired)
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Set the event loop dropped instances are closed on"""
+        self._loop = loop
+
+    async def aclose(self) -> None:
+        """Close every instance, current and dropped, that owns connections"""
+        with self._lock:
+            instances = list(self._retired) + list(self._instances.values())
+            self._retired.clear()
+            self._instances.clear()
+            self._dependents.clear()
+        for task in list(self._closing):
+            task.cancel()
+        await self._close(instances)
+
+    def _schedule_close(self, instances: List[Any]) -> None:
+        """Close instances after the grace period; callable from any thread"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            # No loop yet, so no request can be holding the instances
+            return
+
+        def start() -> None:
+            task = loop.create_task(self._close_later(instances))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+        try:
+            loop.call_soon_threadsafe(start)
+        except RuntimeError:
+            pass  # The loop has closed
+
+    async def _close_later(self, instances: List[Any]) -> None:
+        await asyncio.sleep(self.close_grace)
+        with self._lock:
+            # aclose may have taken them over during the grace period
+            instances = [instance for instance in instances if instance in self._retired]
+            for instance in instances:
+                self._retired.remove(instance)
+        await self._close(instances)
+
+    async def _close(self, instances: List[Any]) -> None:
+        for instance in instances:
+            close = _closer(instance)
+            if close is None:
+                continue
+            try:
+                result = close()
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                self.logger.error(f"Failed to close {type(instance).__name__}: {str(e)}")
+
+    def _settings_changed(self, old, new, changed: FrozenSet[str]) -> None:
+        self.reload(changed)
+
+def _closer(instance: Any) -> Optional[Callable[[], Any]]:
+    """The aclose() or close() method of an instance, if it has one"""
+    return getattr(instance, "aclose", None) or getattr(instance, "close", None)
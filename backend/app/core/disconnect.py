@@ -0,0 +1,68 @@
+"""Request-scoped cancellation when the client goes away"""
+import asyncio
+import logging
+from typing import Iterable
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+class CancelOnDisconnectMiddleware:
+    """
+    Cancels the handler of a request whose client has disconnected
+
+    Starlette only notices a disconnect when it tries to send the response,
+    so a scan keeps issuing TMDB lookups and LLM batches long after the user
+    has navigated away. This middleware listens for the disconnect while the
+    handler runs and cancels it. The CancelledError propagates through every
+    await in the services: rate-limiter waits and backoff sleeps end, queued
+    IO executor calls are dropped, cancellable directory walks stop and async
+    HTTP calls are aborted.
+
+    Only requests with the given methods are cancelled. By default these are
+    the read-only ones; a rename, delete or transfer the client stopped
+    waiting for still runs to a consistent end.
+    """
+
+    def __init__(self, app: ASGIApp, methods: Iterable[str] = ("GET", "HEAD")):
+        self.app = app
+        self.methods = frozenset(methods)
+        self.logger = logging.getLogger("disconnect")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in self.methods:
+            await self.app(scope, receive, send)
+            return
+
+        # Incoming messages are forwarded to the handler through a queue, so
+        # the listener can watch for the disconnect while the handler runs
+        messages: asyncio.Queue = asyncio.Queue()
+        response_complete = False
+        disconnected = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_complete
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete = True
+            await send(message)
+
+        handler = asyncio.create_task(self.app(scope, messages.get, send_wrapper))
+
+        async def listen() -> None:
+            nonlocal disconnected
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    if not response_complete and not handler.done():
+                        disconnected = True
+                        self.logger.info(f"Client disconnected, cancelling {scope['method']} {scope['path']}")
+                        handler.cancel()
+                    return
+
+        listener = asyncio.create_task(listen())
+        try:
+            await handler
+        except asyncio.CancelledError:
+            if not disconnected:
+                raise
+            # Nobody is left to send a response to
+        finally:
+            listener.cancel()
@@ -0,0 +1,148 @@
+"""Managed executor for blocking filesystem work"""
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+DEFAULT_IO_WORKERS = 8
+
+class IOExecutor:
+    """Sized thread pool that keeps blocking filesystem calls off the event loop"""
+
+    def __init__(self, max_workers: int = DEFAULT_IO_WORKERS, thread_name_prefix: str = "aigua-io"):
+        """
+        Initialize the executor
+
+        Args:
+            max_workers: Maximum number of worker threads
+            thread_name_prefix: Prefix for worker thread names
+        """
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger("io_executor")
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Create the underlying thread pool on first use"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=self.thread_name_prefix
+                )
+            return self._executor
+
+    def configure(self, max_workers: int) -> None:
+        """
+        Resize the pool
+
+        Work already submitted finishes on the old pool; new work goes to a
+        pool of the requested size.
+        """
+        max_workers = max(1, int(max_workers))
+        with self._lock:
+            if max_workers == self.max_workers:
+                return
+            old_executor, self._executor = self._executor, None
+            self.max_workers = max_workers
+        if old_executor is not None:
+            old_executor.shutdown(wait=False)
+        self.logger.info(f"IO executor resized to {max_workers} workers")
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run a blocking function on the pool and await its result
+
+        Cancelling the awaiting task cancels the call if it has not started yet.
+        """
+        future = self._get_executor().submit(functools.partial(func, *args, **kwargs))
+        return await asyncio.wrap_future(future)
+
+    async def run_cancellable(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run a long blocking function that cooperates with cancellation
+
+        The function receives a threading.Event as its first argument. The event
+        is set when the awaiting task is cancelled, so loops such as directory
+        walks can stop early instead of running to completion in the background.
+        A call that has already started is waited for before the cancellation
+        propagates, so the caller never unwinds (or reports itself stopped)
+        while the call is still changing files.
+        """
+        cancel_event = threading.Event()
+        future = self._get_executor().submit(functools.partial(func, cancel_event, *args, **kwargs))
+        result = asyncio.wrap_future(future)
+        try:
+            return await asyncio.shield(result)
+        except asyncio.CancelledError:
+            cancel_event.set()
+            if not future.cancel():
+                # Already running; the call checks the event and returns soon
+                await asyncio.wait({result})
+                if not result.cancelled():
+                    result.exception()  # Retrieved; the cancellation wins
+            raise
+
+    def shutdown(self, cancel_futures: bool = True) -> None:
+        """Stop the pool, dropping queued work by default"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=cancel_futures)
+
+# Create a global IO executor instance
+io_executor = IOExecutor()
+
+async def run_io(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking filesystem call on the shared IO executor"""
+    return await io_executor.run(func, *args, **kwargs)
+
+async def run_io_cancellable(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a cancellation-aware blocking call on the shared IO executor"""
+    return await io_executor.run_cancellable(func, *args, **kwargs)
+
+async def run_in_thread(func: Callable[..., Any], *args, name: str = "aigua-worker", **kwargs) -> Any:
+    """
+    Run a long cancellation-aware blocking call on a thread of its own
+
+    Behaves like run_io_cancellable (func receives the cancel event first,
+    and a cancelled caller waits for func to return) but does not hold one
+    of the shared IO workers for the whole call, which for a transfer can
+    be hours.
+    """
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+    cancel_event = threading.Event()
+
+    def settle(result: Any, error: Optional[BaseException]) -> None:
+        if done.done():
+            return
+        if error is not None:
+            done.set_exception(error)
+        else:
+            done.set_result(result)
+
+    def target() -> None:
+        result, error = None, None
+        try:
+            result = func(cancel_event, *args, **kwargs)
+        except BaseException as e:
+            error = e
+        try:
+            loop.call_soon_threadsafe(settle, result, error)
+        except RuntimeError:
+            # The loop has closed; nobody is waiting any more
+            pass
+
+    threading.Thread(target=target, name=name).start()
+    try:
+        return await asyncio.shield(done)
+    except asyncio.CancelledError:
+        cancel_event.set()
+        await asyncio.wait({done})
+        if not done.cancelled():
+            done.exception()  # Retrieved; the cancellation wins
+        raise
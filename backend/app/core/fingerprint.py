@@ -0,0 +1,78 @@
+"""Content fingerprints for media files"""
+import hashlib
+import mmap
+import os
+import struct
+import time
+from typing import Optional
+from .futils import get_long_path
+from .io_scheduler import throttle
+from .metrics import observe_fs
+
+# Size of the chunk hashed at each end of the file
+CHUNK_SIZE = 64 * 1024
+
+# Read size used when hashing whole files
+FULL_HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+def compute_fingerprint(path: str) -> str:
+    """
+    Compute a fingerprint from the file size and its first and last 64 KB
+
+    Follows the OpenSubtitles hash: the file size plus the sum of the
+    little-endian 64-bit words of both chunks, modulo 2**64. The chunks are
+    read through a memory map, so only the pages actually touched are read
+    from disk regardless of the file size.
+
+    Returns:
+        str: "<size hex>-<hash hex>", stable across renames and moves
+    """
+    throttle(path, 2 * CHUNK_SIZE, ops=1)
+    start = time.perf_counter()
+    with open(get_long_path(path), "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        file_hash = size
+        if size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                file_hash += _sum_words(view[:CHUNK_SIZE])
+                file_hash += _sum_words(view[max(0, size - CHUNK_SIZE):])
+    observe_fs("fingerprint", path, time.perf_counter() - start)
+    return f"{size:x}-{file_hash & 0xFFFFFFFFFFFFFFFF:016x}"
+
+def _sum_words(chunk: bytes) -> int:
+    """Sum a chunk as little-endian unsigned 64-bit words, zero-padding the tail"""
+    remainder = len(chunk) % 8
+    if remainder:
+        chunk += b"\0" * (8 - remainder)
+    return sum(struct.unpack(f"<{len(chunk) // 8}Q", chunk))
+
+def new_full_hasher():
+    """Hash object used for full-content hashes, e.g. to verify copies"""
+    return hashlib.blake2b(digest_size=32)
+
+def compute_full_hash(path: str) -> str:
+    """
+    Hash the complete contents of a file with BLAKE2b
+
+    This reads every byte, so callers should reserve it for files whose size
+    and fingerprint already collide. It is a plain module-level function so it
+    can run in worker processes.
+    """
+    digest = new_full_hasher()
+    buffer = bytearray(FULL_HASH_CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(get_long_path(path), "rb", buffering=0) as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            throttle(path, read)
+            digest.update(view[:read])
+    return digest.hexdigest()
+
+def try_full_hash(path: str) -> Optional[str]:
+    """Full hash of a file, or None if it cannot be read (safe to run in worker processes)"""
+    try:
+        return compute_full_hash(path)
+    except OSError:
+        return None
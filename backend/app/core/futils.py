@@ -1,8 +1,15 @@
 """File utilities for handling long paths and safe file operations."""
+import ctypes
+import ctypes.util
+import errno
+import logging
 import os
 import platform
-import traceback
 from typing import List, Optional, Dict, Any
+from .executor import run_io
+from .oplog import record
+
+logger = logging.getLogger("futils")
 
 # 添加长路径支持函数
 def get_long_path(path):
@@ -21,33 +28,101 @@ def get_long_path(path):
 def safe_rename(src, dst):
     """
     安全地重命名/移动文件，支持长路径
+    
+    操作结果记录到操作日志（oplog），不再逐行打印
     """
     long_src = get_long_path(src)
     long_dst = get_long_path(dst)
     
-    print(f"尝试重命名文件 (使用长路径支持): \n  源: {long_src} \n  目标: {long_dst}")
-    
     # 如果源文件和目标相同，直接返回成功
     if os.path.normpath(long_src) == os.path.normpath(long_dst):
-        print("源文件和目标文件路径相同，无需重命名")
+        record("rename", "unchanged", src=src, dst=dst)
         return True
     
     # 确保源文件存在
     if not os.path.exists(long_src):
-        print(f"源文件不存在: {src}")
+        record("rename", "not_found", src=src, dst=dst)
         return False
     
     # 执行重命名操作
     try:
         os.rename(long_src, long_dst)
-        print(f"文件重命名成功")
+        record("rename", "success", src=src, dst=dst)
         return True
     except Exception as e:
-        print(f"文件重命名失败: {str(e)}")
-        print(f"错误类型: {type(e)}")
-        print(f"错误堆栈: {traceback.format_exc()}")
+        record("rename", "error", src=src, dst=dst, error=str(e), error_type=type(e).__name__)
+        logger.debug("重命名失败: %s -> %s", src, dst, exc_info=True)
+        return False
+
+# renameat2() flag that makes the rename fail with EEXIST instead of replacing
+RENAME_NOREPLACE = 1
+AT_FDCWD = -100
+
+# Errors meaning the filesystem or kernel lacks the primitive, not that the rename failed
+_NOREPLACE_UNSUPPORTED = {errno.EINVAL, errno.ENOSYS, errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP}
+
+def _load_renameat2():
+    """renameat2() from libc on Linux, or None where it is not available"""
+    if platform.system() != 'Linux':
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        renameat2 = libc.renameat2
+    except (OSError, AttributeError):
+        return None
+    renameat2.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+    renameat2.restype = ctypes.c_int
+    return renameat2
+
+_renameat2 = _load_renameat2()
+
+def _same_file(src, dst):
+    try:
+        return os.path.samefile(src, dst)
+    except OSError:
         return False
 
+def rename_noreplace(src, dst):
+    """
+    Rename src to dst, failing with FileExistsError if dst exists
+
+    Unlike an exists() check followed by os.rename, no file created at dst in
+    between is ever replaced. Windows renames never replace; on Linux this
+    uses renameat2(RENAME_NOREPLACE), and elsewhere (or where the filesystem
+    does not support it) a hard link to dst followed by unlinking src.
+    A case-only rename on a case-insensitive filesystem is a plain rename,
+    and if dst is already a hard link to src (a link-then-unlink interrupted
+    before the unlink) src is just unlinked; no data is lost either way.
+    """
+    if platform.system() == 'Windows':
+        os.rename(src, dst)
+        return
+    try:
+        if _renameat2 is not None:
+            if _renameat2(AT_FDCWD, os.fsencode(src), AT_FDCWD, os.fsencode(dst), RENAME_NOREPLACE) == 0:
+                return
+            code = ctypes.get_errno()
+            if code not in _NOREPLACE_UNSUPPORTED:
+                raise OSError(code, os.strerror(code), dst)
+        try:
+            os.link(src, dst)
+        except OSError as e:
+            if e.errno not in _NOREPLACE_UNSUPPORTED:
+                raise
+            # No hard links on this filesystem; the check below is the best left
+            if os.path.lexists(dst):
+                raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), dst)
+            os.rename(src, dst)
+            return
+        os.unlink(src)
+    except FileExistsError:
+        if not _same_file(src, dst):
+            raise
+        if src.lower() == dst.lower():
+            os.rename(src, dst)
+        else:
+            os.unlink(src)
+
 # 安全创建目录的辅助函数
 def safe_makedirs(path, exist_ok=True):
     """
@@ -66,13 +141,12 @@ def safe_path_exists(path):
     return os.path.exists(long_path)
 
 # 安全删除文件的辅助函数
-def safe_remove_file(path, log_to=None, should_remove_empty_dir=True):
+def safe_remove_file(path, should_remove_empty_dir=True):
     """
     安全地删除文件，支持长路径
     
     Args:
         path: 要删除的文件路径
-        log_to: 可选的记录日志的列表，用于保存操作结果
         should_remove_empty_dir: 是否在删除文件后检查并删除空目录
         
     Returns:
@@ -84,64 +158,30 @@ def safe_remove_file(path, log_to=None, should_remove_empty_dir=True):
             file_size = os.path.getsize(long_path)
             parent_dir = os.path.dirname(long_path)
             os.remove(long_path)
-            removal_log = f"文件已成功删除: {path} (大小: {file_size} 字节)"
-            print(removal_log)
-            
-            # 如果提供了日志列表，记录操作
-            if log_to is not None and isinstance(log_to, list):
-                log_to.append({
-                    "file": path,
-                    "status": "success",
-                    "message": removal_log,
-                    "operation": "delete",
-                    "file_size": file_size
-                })
+            record("delete", "success", file=path, file_size=file_size)
             
-            # 检查目录是否为空，如果为空则删除目录
+            # 检查目录是否为空，如果为空则删除目录（逐级向上，非空即停止）
             if should_remove_empty_dir and parent_dir:
-                safe_remove_empty_dir(parent_dir, log_to)
+                prune_empty_dirs([parent_dir])
             
             return True
         else:
-            not_found_log = f"文件不存在或不是文件: {path}"
-            print(not_found_log)
-            
-            # 如果提供了日志列表，记录操作
-            if log_to is not None and isinstance(log_to, list):
-                log_to.append({
-                    "file": path,
-                    "status": "not_found",
-                    "message": not_found_log,
-                    "operation": "delete"
-                })
-            
+            record("delete", "not_found", file=path)
             return False
     except Exception as e:
-        error_log = f"删除文件失败: {path}, 错误: {str(e)}"
-        print(error_log)
-        print(f"错误类型: {type(e)}")
-        print(f"错误堆栈: {traceback.format_exc()}")
-        
-        # 如果提供了日志列表，记录操作
-        if log_to is not None and isinstance(log_to, list):
-            log_to.append({
-                "file": path,
-                "status": "error",
-                "message": error_log,
-                "operation": "delete",
-                "error": str(e)
-            })
-        
+        record("delete", "error", file=path, error=str(e), error_type=type(e).__name__)
+        logger.debug("删除文件失败: %s", path, exc_info=True)
         return False
 
 # 安全删除空目录的辅助函数
-def safe_remove_empty_dir(path, log_to=None):
+def safe_remove_empty_dir(path):
     """
     安全地删除空目录，支持长路径
     
+    删除成功后继续检查父目录，父目录为空时一并删除
+    
     Args:
         path: 要删除的目录路径
-        log_to: 可选的记录日志的列表，用于保存操作结果
         
     Returns:
         bool: 删除操作是否成功
@@ -152,69 +192,115 @@ def safe_remove_empty_dir(path, log_to=None):
             # 检查目录是否为空
             if not os.listdir(long_path):
                 os.rmdir(long_path)
-                removal_log = f"空目录已成功删除: {path}"
-                print(removal_log)
+                record("delete_empty_dir", "success", directory=path)
                 
-                # 如果提供了日志列表，记录操作
-                if log_to is not None and isinstance(log_to, list):
-                    log_to.append({
-                        "directory": path,
-                        "status": "success",
-                        "message": removal_log,
-                        "operation": "delete_empty_dir"
-                    })
-                
-                # 递归检查父目录是否为空
-                parent_dir = os.path.dirname(long_path)
-                if parent_dir:
-                    safe_remove_empty_dir(parent_dir, log_to)
+                # 父目录只尝试 rmdir，非空即停止
+                parent_dir = os.path.dirname(path)
+                if parent_dir and parent_dir != path:
+                    prune_empty_dirs([parent_dir])
                 
                 return True
             else:
-                not_empty_log = f"目录不为空，无法删除: {path}"
-                print(not_empty_log)
-                
-                # 如果提供了日志列表，记录操作
-                if log_to is not None and isinstance(log_to, list):
-                    log_to.append({
-                        "directory": path,
-                        "status": "not_empty",
-                        "message": not_empty_log,
-                        "operation": "delete_empty_dir"
-                    })
-                
+                record("delete_empty_dir", "not_empty", directory=path)
                 return False
         else:
-            not_found_log = f"目录不存在或不是目录: {path}"
-            print(not_found_log)
-            
-            # 如果提供了日志列表，记录操作
-            if log_to is not None and isinstance(log_to, list):
-                log_to.append({
-                    "directory": path,
-                    "status": "not_found",
-                    "message": not_found_log,
-                    "operation": "delete_empty_dir"
-                })
-            
+            record("delete_empty_dir", "not_found", directory=path)
             return False
     except Exception as e:
-        error_log = f"删除目录失败: {path}, 错误: {str(e)}"
-        print(error_log)
-        print(f"错误类型: {type(e)}")
-        print(f"错误堆栈: {traceback.format_exc()}")
+        record("delete_empty_dir", "error", directory=path, error=str(e), error_type=type(e).__name__)
+        logger.debug("删除目录失败: %s", path, exc_info=True)
+        return False
+
+# 批量删除后自底向上清理空目录的辅助函数
+def prune_empty_dirs(directories, stop_at=None):
+    """
+    自底向上一次性删除空目录，支持长路径
+    
+    给定目录及其所有上级目录按深度从深到浅各尝试一次 rmdir，不调用 listdir：
+    rmdir 对非空目录直接失败，而非空目录的所有上级目录也必然非空，因此跳过。
+    
+    Args:
+        directories: 可能变为空的目录（通常是被删除文件的父目录）
+        stop_at: 可选的根目录列表，这些目录本身及其上级目录不会被删除
         
-        # 如果提供了日志列表，记录操作
-        if log_to is not None and isinstance(log_to, list):
-            log_to.append({
-                "directory": path,
-                "status": "error",
-                "message": error_log,
-                "operation": "delete_empty_dir",
-                "error": str(e)
-            })
+    Returns:
+        List[str]: 已删除的目录
+    """
+    stops = {os.path.normpath(path) for path in (stop_at or [])}
+    candidates = set()
+    for directory in directories:
+        directory = os.path.normpath(directory)
+        # 收集目录及其上级目录，直到根目录或停止目录
+        while directory not in candidates and directory not in stops:
+            candidates.add(directory)
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                break
+            directory = parent
+    
+    removed = []
+    blocked = set()
+    # 最深的目录优先，保证子目录先于父目录处理
+    for directory in sorted(candidates, key=lambda path: path.count(os.sep), reverse=True):
+        parent = os.path.dirname(directory)
+        if directory in blocked:
+            blocked.add(parent)
+            continue
+        try:
+            os.rmdir(get_long_path(directory))
+        except FileNotFoundError:
+            # 已经不存在，视为已清理
+            continue
+        except OSError:
+            # 非空或无法删除：其上级目录同样无法删除
+            blocked.add(parent)
+            continue
+        removed.append(directory)
+        record("delete_empty_dir", "success", directory=directory)
+    return removed
+
+# 批量删除文件的辅助函数
+def safe_remove_files(paths, should_remove_empty_dir=True, stop_at=None):
+    """
+    批量安全删除文件，支持长路径
+    
+    与逐个调用 safe_remove_file 不同，空目录在所有文件删除之后
+    通过 prune_empty_dirs 一次性清理，每个目录最多检查一次。
+    
+    Args:
+        paths: 要删除的文件路径
+        should_remove_empty_dir: 是否在删除后清理变为空的目录
+        stop_at: 可选的根目录列表，清理空目录时不会越过这些目录
         
-        return False
+    Returns:
+        Dict: 删除的文件数、删除的字节数、失败的文件和删除的目录
+    """
+    removed = 0
+    removed_bytes = 0
+    failed = []
+    parents = set()
+    for path in paths:
+        long_path = get_long_path(path)
+        try:
+            file_size = os.path.getsize(long_path)
+            os.remove(long_path)
+        except OSError as e:
+            failed.append({"file": path, "error": str(e)})
+            status = "not_found" if isinstance(e, FileNotFoundError) else "error"
+            record("delete", status, file=path, error=str(e))
+            continue
+        removed += 1
+        removed_bytes += file_size
+        parents.add(os.path.dirname(path))
+        record("delete", "success", file=path, file_size=file_size)
+    
+    removed_dirs = prune_empty_dirs(parents, stop_at) if should_remove_empty_dir else []
+    return {
+        "removed": removed,
+        "removed_bytes": removed_bytes,
+        "failed": failed,
+        "removed_dirs": removed_dirs
+    }
 
 # 安全获取文件大小的辅助函数
 def safe_get_file_size(path):
@@ -233,5 +319,54 @@ def safe_get_file_size(path):
             return os.path.getsize(long_path)
         return 0
     except Exception as e:
-        print(f"获取文件大小失败: {path}, 错误: {str(e)}")
-        return 0 
\ No newline at end of file
+        record("get_file_size", "error", file=path, error=str(e))
+        return 0 
+
+# 以下异步版本在专用IO线程池中执行，避免阻塞事件循环
+async def async_safe_rename(src, dst):
+    """
+    safe_rename的异步版本，在IO线程池中执行
+    """
+    return await run_io(safe_rename, src, dst)
+
+async def async_safe_makedirs(path, exist_ok=True):
+    """
+    safe_makedirs的异步版本，在IO线程池中执行
+    """
+    return await run_io(safe_makedirs, path, exist_ok)
+
+async def async_safe_path_exists(path):
+    """
+    safe_path_exists的异步版本，在IO线程池中执行
+    """
+    return await run_io(safe_path_exists, path)
+
+async def async_safe_remove_file(path, should_remove_empty_dir=True):
+    """
+    safe_remove_file的异步版本，在IO线程池中执行
+    """
+    return await run_io(safe_remove_file, path, should_remove_empty_dir)
+
+async def async_safe_remove_empty_dir(path):
+    """
+    safe_remove_empty_dir的异步版本，在IO线程池中执行
+    """
+    return await run_io(safe_remove_empty_dir, path)
+
+async def async_prune_empty_dirs(directories, stop_at=None):
+    """
+    prune_empty_dirs的异步版本，在IO线程池中执行
+    """
+    return await run_io(prune_empty_dirs, directories, stop_at)
+
+async def async_safe_remove_files(paths, should_remove_empty_dir=True, stop_at=None):
+    """
+    safe_remove_files的异步版本，在IO线程池中执行
+    """
+    return await run_io(safe_remove_files, paths, should_remove_empty_dir, stop_at)
+
+async def async_safe_get_file_size(path):
+    """
+    safe_get_file_size的异步版本，在IO线程池中执行
+    """
+    return await run_io(safe_get_file_size, path)
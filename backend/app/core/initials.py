@@ -0,0 +1,57 @@
+"""Initial-letter buckets (0-9, A-Z) for media titles, including CJK titles"""
+import functools
+import os
+import unicodedata
+from typing import Optional
+
+# Code point range covered by the precomputed table (CJK Extension A and Unified Ideographs)
+TABLE_FIRST = 0x3400
+TABLE_LAST = 0x9FFF
+TABLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "cjk_initials.bin")
+
+DIGIT_BUCKET = "0-9"
+BUCKETS = [DIGIT_BUCKET] + [chr(i) for i in range(ord("A"), ord("Z") + 1)]
+
+@functools.lru_cache(maxsize=1)
+def _table() -> bytes:
+    """Load the table on first use (built by scripts/build_cjk_initials.py)"""
+    with open(TABLE_PATH, "rb") as f:
+        return f.read()
+
+@functools.lru_cache(maxsize=4096)
+def _char_bucket(char: str) -> Optional[str]:
+    """Bucket of a single character, or None if it does not decide one"""
+    # Full-width letters/digits and compatibility ideographs fold to their plain forms
+    char = unicodedata.normalize("NFKC", char)[:1]
+    if not char:
+        return None
+    if char.isascii():
+        if char.isdigit():
+            return DIGIT_BUCKET
+        if char.isalpha():
+            return char.upper()
+        return None
+    if char.isdigit():
+        return DIGIT_BUCKET
+    code_point = ord(char)
+    if TABLE_FIRST <= code_point <= TABLE_LAST:
+        initial = _table()[code_point - TABLE_FIRST]
+        return chr(initial) if initial else None
+    # Latin letters with diacritics, e.g. "É" → "E"
+    base = unicodedata.normalize("NFKD", char)[:1]
+    if base.isascii() and base.isalpha():
+        return base.upper()
+    return None
+
+def initial_bucket(title: str) -> Optional[str]:
+    """
+    Get the initial-letter bucket of a title
+
+    Leading characters that do not decide a bucket, such as brackets, spaces
+    or 《》, are skipped. Returns None if no character of the title does.
+    """
+    for char in title:
+        bucket = _char_bucket(char)
+        if bucket is not None:
+            return bucket
+    return None
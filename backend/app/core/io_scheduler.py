@@ -0,0 +1,176 @@
+"""Byte-rate and operation-rate throttling of disk I/O per mount point"""
+import logging
+import os
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional
+from .metrics import observe_fs
+
+# Directories whose limits are remembered before the cache is cleared
+DIRECTORY_CACHE_SIZE = 4096
+
+class TokenBucket:
+    """
+    Thread-safe token bucket for blocking callers
+
+    Unlike the async RateLimiter used for API requests, this one is called
+    from IO executor threads. A request larger than the burst is granted by
+    going into debt, so large chunks are throttled on average instead of
+    blocking forever.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        """
+        Initialize the bucket
+
+        Args:
+            rate: Tokens added per second
+            burst: Maximum number of stored tokens (defaults to one second worth)
+        """
+        self.rate = rate
+        self.burst = burst if burst is not None else rate
+        self.tokens = self.burst
+        self.last_update = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float, cancel_event: Optional[threading.Event] = None) -> None:
+        """Take tokens, sleeping until the bucket has refilled enough"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last_update) * self.rate)
+            self.last_update = now
+            self.tokens -= amount
+            wait_time = -self.tokens / self.rate if self.tokens < 0 else 0
+        # Sleep outside the lock; later callers queue up behind the debt
+        if wait_time > 0:
+            if cancel_event is not None:
+                cancel_event.wait(wait_time)
+            else:
+                time.sleep(wait_time)
+
+class IOLimits:
+    """Byte and operation buckets of one mount point"""
+    __slots__ = ("mount", "bytes", "ops")
+
+    def __init__(self, mount: str, bytes_per_second: float = 0, ops_per_second: float = 0):
+        self.mount = mount
+        self.bytes = TokenBucket(bytes_per_second) if bytes_per_second > 0 else None
+        self.ops = TokenBucket(ops_per_second) if ops_per_second > 0 else None
+
+class IOScheduler:
+    """
+    Shared throttle for transfers, hashing and scans
+
+    Limits are configured per mount point (any directory prefix, e.g. the
+    NAS share). Every consumer reports the bytes it reads or writes and the
+    metadata operations it performs against a path; the path is charged to
+    the longest configured mount that contains it. Paths outside every
+    configured mount are not throttled, and with no limits configured a call
+    returns immediately.
+    """
+
+    def __init__(self):
+        self._limits: List[IOLimits] = []
+        self._cache: Dict[str, Optional[IOLimits]] = {}
+        # Bumped by configure so lookups started before it do not cache stale limits
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger("io_scheduler")
+
+    def configure(self, limits: Iterable) -> None:
+        """
+        Replace the limits
+
+        Args:
+            limits: Objects with mount, bytes_per_second and ops_per_second
+        """
+        configured = [
+            IOLimits(os.path.normcase(os.path.abspath(limit.mount)), limit.bytes_per_second, limit.ops_per_second)
+            for limit in limits
+            if limit.bytes_per_second > 0 or limit.ops_per_second > 0
+        ]
+        # Longest mount first so nested mounts win
+        configured.sort(key=lambda limit: len(limit.mount), reverse=True)
+        with self._lock:
+            self._limits = configured
+            self._cache = {}
+            self._generation += 1
+        for limit in configured:
+            self.logger.info(f"Throttling I/O on {limit.mount}")
+
+    def _limits_for(self, path: str) -> Optional[IOLimits]:
+        with self._lock:
+            limits, cache, generation = self._limits, self._cache, self._generation
+        if not limits:
+            return None
+        normalized = os.path.normcase(os.path.abspath(path))
+        # Cached per parent directory; the many files of one directory share an entry
+        directory = os.path.dirname(normalized)
+        try:
+            found = cache[directory]
+        except KeyError:
+            found = self._match(limits, directory)
+            with self._lock:
+                if self._generation == generation:
+                    if len(self._cache) >= DIRECTORY_CACHE_SIZE:
+                        self._cache.clear()
+                    self._cache[directory] = found
+        if found is None:
+            # The path may be a configured mount itself
+            found = next((limit for limit in limits if limit.mount == normalized), None)
+        return found
+
+    def _match(self, limits: List[IOLimits], directory: str) -> Optional[IOLimits]:
+        for limit in limits:
+            if directory == limit.mount or directory.startswith(limit.mount.rstrip(os.sep) + os.sep):
+                return limit
+        return None
+
+    def throttle(
+        self,
+        path: str,
+        nbytes: int = 0,
+        ops: int = 0,
+        cancel_event: Optional[threading.Event] = None
+    ) -> None:
+        """Account I/O against the mount holding path, blocking while over its limits"""
+        limits = self._limits_for(path)
+        if limits is None:
+            return
+        if ops and limits.ops is not None:
+            limits.ops.acquire(ops, cancel_event)
+        if nbytes and limits.bytes is not None:
+            limits.bytes.acquire(nbytes, cancel_event)
+
+    def share(self, workers: int) -> List[Dict]:
+        """Limits divided evenly among worker processes, for their initializer"""
+        workers = max(1, workers)
+        return [
+            {
+                "mount": limit.mount,
+                "bytes_per_second": limit.bytes.rate / workers if limit.bytes else 0,
+                "ops_per_second": limit.ops.rate / workers if limit.ops else 0
+            }
+            for limit in self._limits
+        ]
+
+# Create a global IO scheduler instance
+io_scheduler = IOScheduler()
+
+def configure_worker(limits: List[Dict]) -> None:
+    """Process pool initializer applying a share of the parent's limits"""
+    io_scheduler.configure(SimpleNamespace(**limit) for limit in limits)
+
+def throttle(path: str, nbytes: int = 0, ops: int = 0, cancel_event: Optional[threading.Event] = None) -> None:
+    """Account I/O against the shared scheduler"""
+    io_scheduler.throttle(path, nbytes, ops, cancel_event)
+
+def throttled_listdir(path: str) -> List[str]:
+    """os.listdir charged as one operation against the mount holding path"""
+    io_scheduler.throttle(path, ops=1)
+    start = time.perf_counter()
+    try:
+        return os.listdir(path)
+    finally:
+        observe_fs("listdir", os.path.join(path, ""), time.perf_counter() - start)
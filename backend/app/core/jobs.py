@@ -0,0 +1,763 @@
+"""Persistent queue of long-running background jobs"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from .executor import run_io
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:  # only available on Windows
+    msvcrt = None
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_CANCELLING = "cancelling"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+JOB_INTERRUPTED = "interrupted"
+
+FINISHED_STATES = (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED)
+RESUMABLE_STATES = (JOB_FAILED, JOB_CANCELLED, JOB_INTERRUPTED)
+
+# Seconds between progress writes of a running job; subscribers see every update
+PROGRESS_SAVE_INTERVAL = 1.0
+
+# Updates buffered per event subscriber before the oldest are dropped
+SUBSCRIBER_BACKLOG = 256
+
+# Seconds between reads of job changes made by other worker processes, and
+# between attempts to take over the job workers from a process that stopped
+SYNC_INTERVAL = 1.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    state TEXT NOT NULL,
+    params TEXT NOT NULL,
+    stages TEXT NOT NULL,
+    checkpoint TEXT NOT NULL,
+    error TEXT,
+    attempts INTEGER NOT NULL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    result BLOB,
+    cancel_requested INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+_COLUMNS = ("id", "kind", "state", "params", "stages", "checkpoint", "error", "attempts", "created", "updated")
+
+class JobStore:
+    """
+    Job records backed by SQLite
+
+    Results are kept in their own column and only read on request, so
+    loading the job list at startup stays cheap however large the results.
+    Every worker process opens the same database; state changes that could
+    race between processes (claiming, cancelling, requeueing, deleting) are
+    single conditional updates.
+
+    All methods are blocking; call them through the IO executor.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use"""
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, timeout=10.0, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "cancel_requested" not in columns:
+                # Databases created before cancellation across processes
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN cancel_requested INTEGER NOT NULL DEFAULT 0")
+                self._conn.commit()
+        return self._conn
+
+    def save(self, row: Dict) -> None:
+        """
+        Insert or update a job, keeping its stored result
+
+        A cancel request from another process survives progress saves of the
+        running job and is cleared by its next state change.
+        """
+        values = tuple(row[column] for column in _COLUMNS)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in _COLUMNS[1:])
+        updates += f", cancel_requested = CASE WHEN excluded.state = '{JOB_RUNNING}' THEN cancel_requested ELSE 0 END"
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                f"INSERT INTO jobs ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))}) "
+                f"ON CONFLICT(id) DO UPDATE SET {updates}",
+                values
+            )
+            conn.commit()
+
+    def save_result(self, job_id: str, result: Optional[bytes]) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("UPDATE jobs SET result = ? WHERE id = ?", (result, job_id))
+            conn.commit()
+
+    def get_result(self, job_id: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._connect().execute("SELECT result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def load(self, job_id: str) -> Optional[Dict]:
+        """One job without its result"""
+        with self._lock:
+            row = self._connect().execute(
+                f"SELECT {', '.join(_COLUMNS)}, cancel_requested FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        return dict(zip(_COLUMNS + ("cancel_requested",), row)) if row else None
+
+    def load_all(self) -> List[Dict]:
+        """All jobs without their results, oldest first"""
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT {', '.join(_COLUMNS)}, cancel_requested FROM jobs ORDER BY created"
+            ).fetchall()
+        return [dict(zip(_COLUMNS + ("cancel_requested",), row)) for row in rows]
+
+    def load_versions(self) -> List[Tuple[str, float, bool]]:
+        """(id, updated, cancel requested) of every job, to find changes cheaply"""
+        with self._lock:
+            rows = self._connect().execute("SELECT id, updated, cancel_requested FROM jobs").fetchall()
+        return [(job_id, updated, bool(cancel_requested)) for job_id, updated, cancel_requested in rows]
+
+    def claim(self, job_id: str) -> bool:
+        """Mark a queued job running; False if it is no longer queued"""
+        return self._update(
+            "UPDATE jobs SET state = ?, updated = ? WHERE id = ? AND state = ?",
+            (JOB_RUNNING, time.time(), job_id, JOB_QUEUED)
+        )
+
+    def request_cancel(self, job_id: str) -> None:
+        """Cancel a waiting job, or ask the process running it to cancel it"""
+        now = time.time()
+        if not self._update(
+            "UPDATE jobs SET state = ?, updated = ? WHERE id = ? AND state IN (?, ?)",
+            (JOB_CANCELLED, now, job_id, JOB_QUEUED, JOB_INTERRUPTED)
+        ):
+            self._update(
+                "UPDATE jobs SET cancel_requested = 1, updated = ? WHERE id = ? AND state = ?",
+                (now, job_id, JOB_RUNNING)
+            )
+
+    def requeue(self, job_id: str, restart: bool) -> bool:
+        """Queue a stopped job again; False if it is not stopped"""
+        reset = ", checkpoint = '{}', stages = '{}'" if restart else ""
+        return self._update(
+            f"UPDATE jobs SET state = ?, error = NULL, updated = ?{reset} "
+            f"WHERE id = ? AND state IN ({', '.join('?' * len(RESUMABLE_STATES))})",
+            (JOB_QUEUED, time.time(), job_id) + RESUMABLE_STATES
+        )
+
+    def _update(self, sql: str, params: Tuple) -> bool:
+        """Run a conditional update; True if it changed a row"""
+        with self._lock:
+            conn = self._connect()
+            changed = conn.execute(sql, params).rowcount > 0
+            conn.commit()
+        return changed
+
+    def delete(self, job_id: str) -> bool:
+        """Delete a job that is not queued or running; False if it is"""
+        return self._update(
+            "DELETE FROM jobs WHERE id = ? AND state NOT IN (?, ?, ?)",
+            (job_id, JOB_QUEUED, JOB_RUNNING, JOB_CANCELLING)
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+class JobLease:
+    """
+    Exclusive lock marking the one process that runs the job workers
+
+    The lock is held on an open file, so the operating system releases it
+    when the holder exits, however it exits.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def acquire(self) -> bool:
+        """Take the lease without waiting; True if this process holds it"""
+        if self._file is not None:
+            return True
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        lock_file = open(self.path, "a+b")
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            elif msvcrt is not None:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        return True
+
+    def release(self) -> None:
+        if self._file is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+class Job:
+    """In-memory state of one job"""
+    __slots__ = (
+        "id", "kind", "state", "params", "stages", "checkpoint", "error",
+        "attempts", "created", "updated", "saved", "task", "cancel_requested"
+    )
+
+    def __init__(self, kind: str, params: Dict, job_id: Optional[str] = None):
+        self.id = job_id or uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.state = JOB_QUEUED
+        self.params = params
+        self.stages: Dict[str, Dict[str, int]] = {}
+        self.checkpoint: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+        self.attempts = 0
+        self.created = self.updated = time.time()
+        self.saved = 0.0
+        self.task: Optional[asyncio.Task] = None
+        self.cancel_requested = False
+
+    @classmethod
+    def from_row(cls, row: Dict) -> "Job":
+        job = cls(row["kind"], json.loads(row["params"]), row["id"])
+        job.state = row["state"]
+        job.stages = json.loads(row["stages"])
+        job.checkpoint = json.loads(row["checkpoint"])
+        job.error = row["error"]
+        job.attempts = row["attempts"]
+        job.created = row["created"]
+        job.updated = job.saved = row["updated"]
+        job.cancel_requested = bool(row.get("cancel_requested"))
+        return job
+
+    def to_row(self) -> Dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "state": self.state,
+            "params": json.dumps(self.params, ensure_ascii=False),
+            "stages": json.dumps(self.stages),
+            "checkpoint": json.dumps(self.checkpoint, ensure_ascii=False),
+            "error": self.error,
+            "attempts": self.attempts,
+            "created": self.created,
+            "updated": self.updated
+        }
+
+    def to_dict(self, include_params: bool = False) -> Dict:
+        state = self.state
+        if state == JOB_RUNNING and self.cancel_requested:
+            # Cancelled through another worker process, still unwinding
+            state = JOB_CANCELLING
+        result = {
+            "id": self.id,
+            "kind": self.kind,
+            "state": state,
+            "stages": {stage: dict(counters) for stage, counters in self.stages.items()},
+            "error": self.error,
+            "attempts": self.attempts,
+            "created": self.created,
+            "updated": self.updated
+        }
+        if include_params:
+            result["params"] = self.params
+        return result
+
+class JobContext:
+    """What a job handler gets to read its parameters and report progress"""
+
+    def __init__(self, queue: "JobQueue", job: Job):
+        self._queue = queue
+        self._job = job
+
+    @property
+    def id(self) -> str:
+        return self._job.id
+
+    @property
+    def params(self) -> Dict:
+        return self._job.params
+
+    @property
+    def checkpoint(self) -> Dict[str, Any]:
+        """Values saved by an earlier attempt, empty on the first run or after a retry"""
+        return self._job.checkpoint
+
+    def progress(self, stage: str, done: int, total: Optional[int] = None) -> None:
+        """
+        Update the counters of a stage
+
+        Safe to call from executor threads; the update is handed to the
+        event loop.
+        """
+        self._queue._call_in_loop(self._queue._progress, self._job, stage, done, total)
+
+    def stage(self, stage: str) -> Callable[[int, int], None]:
+        """Progress callback (done, total) bound to one stage"""
+        return lambda done, total: self.progress(stage, done, total)
+
+    async def save_checkpoint(self, **values: Any) -> None:
+        """Persist values a resumed attempt needs to continue where this one stopped"""
+        self._job.checkpoint.update(values)
+        await self._queue._save(self._job)
+
+JobHandler = Callable[[JobContext], Awaitable[Any]]
+
+class JobQueue:
+    """
+    Runs registered kinds of jobs in the background with bounded concurrency
+
+    Jobs are persisted when submitted and on every state change, and their
+    stage counters at most once per PROGRESS_SAVE_INTERVAL. A fixed number of
+    workers take queued jobs in submission order. Jobs that were queued or
+    running when the server stopped are queued again on the next start and
+    see the checkpoint their last attempt saved, so handlers can continue
+    where they stopped. Every update is pushed to event subscribers.
+
+    When several worker processes serve the API, they share the job
+    database but only the process holding the JobLease runs jobs; when it
+    exits another process takes over and resumes its jobs. A job is claimed
+    with a conditional update before it runs, so it never runs twice. Every
+    process mirrors the jobs other processes submit or change by reading
+    the database every SYNC_INTERVAL, so any process can report on, stream,
+    cancel or requeue any job.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        concurrency: int = 2,
+        encode: Callable[[Any], bytes] = lambda result: json.dumps(result, ensure_ascii=False, default=str).encode("utf-8")
+    ):
+        """
+        Initialize the queue
+
+        Args:
+            store: Persistent job records
+            concurrency: Maximum number of jobs running at once
+            encode: Serializes a handler's return value to JSON bytes
+        """
+        self.store = store
+        self.concurrency = max(1, concurrency)
+        self.encode = encode
+        self._handlers: Dict[str, Tuple[JobHandler, Optional[Callable[[Dict], None]]]] = {}
+        self._jobs: Dict[str, Job] = {}
+        self._pending: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._subscribers: Set[Tuple[Optional[str], asyncio.Queue]] = set()
+        self._background: Set[asyncio.Future] = set()
+        self._save_lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self.lease = JobLease(store.db_path + ".lock")
+        self.leader = False
+        # Jobs being claimed or run by this process
+        self._active: Set[str] = set()
+        self._sync_task: Optional[asyncio.Task] = None
+        self.logger = logging.getLogger("jobs")
+
+    def register(self, kind: str, handler: JobHandler, validate: Optional[Callable[[Dict], None]] = None) -> None:
+        """
+        Register a kind of job
+
+        Args:
+            kind: Name clients submit jobs under
+            handler: Coroutine function running one attempt; its return value is the job result
+            validate: Raises ValueError for parameters the handler cannot run with
+        """
+        self._handlers[kind] = (handler, validate)
+
+    @property
+    def kinds(self) -> List[str]:
+        return sorted(self._handlers)
+
+    async def start(self) -> None:
+        """Load stored jobs and, if no other process runs them, queue the unfinished ones again and start the workers"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._pending = asyncio.Queue()
+        self._save_lock = asyncio.Lock()
+
+        if await run_io(self.lease.acquire):
+            await self._lead()
+        else:
+            for row in await run_io(self.store.load_all):
+                job = Job.from_row(row)
+                self._jobs[job.id] = job
+            self.logger.info("Another process runs the jobs; following its changes")
+        self._sync_task = asyncio.create_task(self._sync_loop(), name="aigua-job-sync")
+
+    async def _lead(self) -> None:
+        """Queue the unfinished jobs again and start the workers (holding the lease)"""
+        self.leader = True
+        for row in await run_io(self.store.load_all):
+            job = Job.from_row(row)
+            self._jobs[job.id] = job
+            if job.state == JOB_CANCELLING:
+                # The server stopped while the job was being cancelled
+                job.state = JOB_CANCELLED
+                await self._save(job)
+            elif job.state in (JOB_QUEUED, JOB_RUNNING, JOB_INTERRUPTED):
+                if job.kind in self._handlers:
+                    # Stopped mid-way; the next attempt resumes from the checkpoint
+                    await self._enqueue(job)
+                elif job.state != JOB_INTERRUPTED:
+                    job.state = JOB_INTERRUPTED
+                    await self._save(job)
+
+        self._workers = [
+            asyncio.create_task(self._work(), name=f"aigua-job-worker-{index}")
+            for index in range(self.concurrency)
+        ]
+
+    async def stop(self) -> None:
+        """Stop the workers; running jobs are marked interrupted and resume on the next start"""
+        tasks = self._workers + ([self._sync_task] if self._sync_task is not None else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._sync_task = None
+        await run_io(self.store.close)
+        await run_io(self.lease.release)
+        self.leader = False
+
+    async def submit(self, kind: str, params: Dict) -> Dict:
+        """Validate and queue a job"""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        _, validate = self._handlers[kind]
+        if validate is not None:
+            validate(params)
+        job = Job(kind, params)
+        self._jobs[job.id] = job
+        await self._enqueue(job)
+        return job.to_dict()
+
+    async def get_job(self, job_id: str, include_params: bool = False) -> Optional[Dict]:
+        """A job, read from the database unless this process runs the jobs"""
+        job = self._jobs.get(job_id)
+        if job is None or not self.leader:
+            job = await self._reload(job_id)
+        return job.to_dict(include_params) if job else None
+
+    def list_jobs(self, state: Optional[str] = None, kind: Optional[str] = None) -> List[Dict]:
+        """Jobs matching the filters, newest first"""
+        jobs = sorted(self._jobs.values(), key=lambda job: job.created, reverse=True)
+        return [
+            job.to_dict()
+            for job in jobs
+            if (state is None or job.state == state) and (kind is None or job.kind == kind)
+        ]
+
+    async def result(self, job_id: str) -> Optional[bytes]:
+        """JSON-encoded result of a succeeded job"""
+        job = self._jobs.get(job_id)
+        if job is None or not self.leader:
+            job = await self._reload(job_id)
+        if job is None or job.state != JOB_SUCCEEDED:
+            return None
+        return await run_io(self.store.get_result, job_id)
+
+    async def cancel(self, job_id: str) -> Optional[Dict]:
+        """Cancel a queued or running job; finished jobs are returned unchanged"""
+        job = self._jobs.get(job_id)
+        if job is None or (job_id not in self._active and not self.leader):
+            job = await self._reload(job_id)
+        if job is None:
+            return None
+        if job.state in (JOB_RUNNING, JOB_CANCELLING) and job.task is not None:
+            task = job.task
+            if job.state == JOB_RUNNING:
+                # Reported until the handler has unwound, including blocking
+                # calls that finish their current file before stopping
+                job.state = JOB_CANCELLING
+                job.cancel_requested = True
+                await self._save(job)
+                task.cancel()
+            # The worker records the cancellation as soon as the handler unwinds
+            await asyncio.wait({task})
+        elif job.state in (JOB_QUEUED, JOB_INTERRUPTED, JOB_RUNNING) and job_id not in self._active:
+            # Waiting, or running in another process, which sees the request
+            # on its next sync; a conditional update, so a worker claiming the
+            # job at the same time either runs it first or skips it
+            await run_io(self.store.request_cancel, job_id)
+            job = await self._reload(job_id) or job
+        return job.to_dict()
+
+    async def resume(self, job_id: str) -> Optional[Dict]:
+        """Queue a stopped job again, continuing from its checkpoint"""
+        return await self._requeue(job_id, restart=False)
+
+    async def retry(self, job_id: str) -> Optional[Dict]:
+        """Queue a stopped job again from the start"""
+        return await self._requeue(job_id, restart=True)
+
+    async def delete(self, job_id: str) -> Optional[Dict]:
+        """Forget a job that is not queued or running"""
+        job = self._jobs.get(job_id) or await self._reload(job_id)
+        if job is None:
+            return None
+        if job.state in (JOB_QUEUED, JOB_RUNNING, JOB_CANCELLING) or not await run_io(self.store.delete, job_id):
+            job = await self._reload(job_id) or job
+            raise ValueError(f"Job is {job.state}; cancel it first")
+        self._jobs.pop(job_id, None)
+        return job.to_dict()
+
+    async def events(self, job_id: Optional[str] = None, heartbeat: float = 15.0) -> AsyncIterator[Optional[Dict]]:
+        """
+        Stream job snapshots as they change
+
+        Starts with the current state of the job (or of every job when job_id
+        is None). A stream of one job ends once the job has finished. None is
+        yielded after `heartbeat` seconds without updates so callers can keep
+        idle connections alive.
+        """
+        updates: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_BACKLOG)
+        subscriber = (job_id, updates)
+        self._subscribers.add(subscriber)
+        try:
+            if job_id is not None:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return
+                yield job.to_dict()
+                if job.state in FINISHED_STATES:
+                    return
+            else:
+                for job in sorted(self._jobs.values(), key=lambda job: job.created):
+                    yield job.to_dict()
+            while True:
+                try:
+                    snapshot = await asyncio.wait_for(updates.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                yield snapshot
+                if job_id is not None and snapshot["state"] in FINISHED_STATES:
+                    return
+        finally:
+            self._subscribers.discard(subscriber)
+
+    async def _requeue(self, job_id: str, restart: bool) -> Optional[Dict]:
+        job = self._jobs.get(job_id)
+        if job is None or not self.leader:
+            job = await self._reload(job_id)
+        if job is None:
+            return None
+        if job.state not in RESUMABLE_STATES:
+            raise ValueError(f"Job is {job.state}")
+        if job.kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {job.kind}")
+        if not self.leader:
+            # The process running the jobs picks it up on its next sync
+            if not await run_io(self.store.requeue, job_id, restart):
+                job = await self._reload(job_id) or job
+                raise ValueError(f"Job is {job.state}")
+            return (await self._reload(job_id) or job).to_dict()
+        if restart:
+            job.checkpoint = {}
+            job.stages = {}
+        job.error = None
+        await self._enqueue(job)
+        return job.to_dict()
+
+    async def _enqueue(self, job: Job) -> None:
+        job.state = JOB_QUEUED
+        await self._save(job)
+        if self.leader:
+            self._pending.put_nowait(job.id)
+
+    async def _reload(self, job_id: str) -> Optional[Job]:
+        """Replace the mirror of a job not running here with its stored state"""
+        row = await run_io(self.store.load, job_id)
+        if job_id in self._active:
+            return self._jobs.get(job_id)
+        previous = self._jobs.get(job_id)
+        if row is None:
+            self._jobs.pop(job_id, None)
+            return None
+        job = self._jobs[job_id] = Job.from_row(row)
+        if previous is None or previous.updated != job.updated:
+            self._publish(job)
+            if self.leader and job.state == JOB_QUEUED:
+                # Submitted or requeued by another process
+                self._pending.put_nowait(job.id)
+        return job
+
+    async def _sync_loop(self) -> None:
+        while True:
+            await asyncio.sleep(SYNC_INTERVAL)
+            try:
+                if not self.leader and await run_io(self.lease.acquire):
+                    self.logger.info("Taking over the job workers")
+                    await self._lead()
+                await self._sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Failed to read job changes: {e}")
+
+    async def _sync(self) -> None:
+        """Mirror jobs submitted, changed or deleted by other processes"""
+        stored = set()
+        for job_id, updated, cancel_requested in await run_io(self.store.load_versions):
+            stored.add(job_id)
+            job = self._jobs.get(job_id)
+            if job_id in self._active:
+                if cancel_requested and job is not None and job.state == JOB_RUNNING:
+                    # Cancelled through another process
+                    future = asyncio.ensure_future(self.cancel(job_id))
+                    self._background.add(future)
+                    future.add_done_callback(self._background.discard)
+                continue
+            if job is not None and updated <= job.updated:
+                continue
+            await self._reload(job_id)
+        for job_id, job in list(self._jobs.items()):
+            # Jobs created here but not saved yet are not in the database
+            if job_id not in stored and job_id not in self._active and job.saved:
+                del self._jobs[job_id]
+
+    async def _work(self) -> None:
+        while True:
+            job = self._jobs.get(await self._pending.get())
+            # Skip jobs cancelled or deleted while they waited, here or in
+            # another process
+            if job is None or job.state != JOB_QUEUED:
+                continue
+            self._active.add(job.id)
+            try:
+                if await run_io(self.store.claim, job.id):
+                    await self._run(job)
+            finally:
+                self._active.discard(job.id)
+
+    async def _run(self, job: Job) -> None:
+        handler, _ = self._handlers[job.kind]
+        job.state = JOB_RUNNING
+        job.attempts += 1
+        job.cancel_requested = False
+        await self._save(job)
+
+        job.task = asyncio.create_task(handler(JobContext(self, job)))
+        result = None
+        try:
+            result = await job.task
+            job.state = JOB_SUCCEEDED
+        except asyncio.CancelledError:
+            if not job.cancel_requested:
+                # The queue is stopping; the job resumes on the next start
+                job.state = JOB_INTERRUPTED
+                await self._save(job)
+                raise
+            job.state = JOB_CANCELLED
+        except Exception as e:
+            self.logger.error(f"Job {job.id} ({job.kind}) failed: {e}")
+            job.state = JOB_FAILED
+            job.error = str(e)
+        finally:
+            job.task = None
+
+        if job.state == JOB_SUCCEEDED:
+            try:
+                await run_io(self.store.save_result, job.id, self.encode(result) if result is not None else None)
+            except Exception as e:
+                self.logger.error(f"Failed to store the result of job {job.id}: {e}")
+                job.state = JOB_FAILED
+                job.error = f"Failed to store result: {e}"
+        await self._save(job)
+
+    async def _save(self, job: Job) -> None:
+        """Persist a job and push it to subscribers"""
+        job.updated = time.time()
+        self._publish(job)
+        await self._persist(job)
+
+    async def _persist(self, job: Job) -> None:
+        # Serialized so a late progress write never overwrites a newer state
+        async with self._save_lock:
+            job.saved = time.time()
+            await run_io(self.store.save, job.to_row())
+
+    def _progress(self, job: Job, stage: str, done: int, total: Optional[int]) -> None:
+        counters = job.stages.setdefault(stage, {"done": 0, "total": 0})
+        counters["done"] = done
+        if total is not None:
+            counters["total"] = total
+        job.updated = time.time()
+        self._publish(job)
+        if job.state == JOB_RUNNING and job.updated - job.saved >= PROGRESS_SAVE_INTERVAL:
+            job.saved = job.updated
+            future = asyncio.ensure_future(self._persist(job))
+            self._background.add(future)
+            future.add_done_callback(self._background.discard)
+
+    def _publish(self, job: Job) -> None:
+        if not self._subscribers:
+            return
+        snapshot = job.to_dict()
+        for job_id, updates in self._subscribers:
+            if job_id is not None and job_id != job.id:
+                continue
+            if updates.full():
+                # A slow subscriber only misses intermediate progress
+                updates.get_nowait()
+            updates.put_nowait(snapshot)
+
+    def _call_in_loop(self, func: Callable, *args) -> None:
+        """Run func on the event loop, from its own thread or any other"""
+        if threading.get_ident() == self._loop_thread:
+            func(*args)
+            return
+        try:
+            self._loop.call_soon_threadsafe(func, *args)
+        except RuntimeError:
+            # The loop has closed; a blocking call outlived the server
+            pass
@@ -0,0 +1,187 @@
+"""In-process counters and histograms exposed in the Prometheus text format"""
+import bisect
+import os
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+# Latency buckets in seconds, from cached lookups to slow LLM batches
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Token counts of one LLM batch
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+# Items in one batch
+BATCH_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+# Directories whose mount point is remembered before the cache is cleared
+MOUNT_CACHE_SIZE = 4096
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Counter:
+    """Monotonic count per label combination"""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_number(value)}")
+        return lines
+
+class Histogram:
+    """Distribution of observations in cumulative buckets per label combination"""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # Label values -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._series.items())
+        for label_values, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, label_values, le)} {cumulative}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_number(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class Registry:
+    """The metrics rendered by the metrics endpoint"""
+
+    def __init__(self):
+        self._metrics: List = []
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        metric = Histogram(name, help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+# Upstream APIs
+TMDB_REQUEST_SECONDS = registry.histogram(
+    "aigua_tmdb_request_seconds", "TMDB request latency per attempt", ["endpoint"]
+)
+LLM_REQUEST_SECONDS = registry.histogram(
+    "aigua_llm_request_seconds", "LLM completion latency per attempt", ["provider"]
+)
+LLM_BATCH_TOKENS = registry.histogram(
+    "aigua_llm_batch_tokens", "Tokens used by one LLM batch", ["provider", "kind"], TOKEN_BUCKETS
+)
+LLM_BATCH_FILES = registry.histogram(
+    "aigua_llm_batch_files", "Filenames parsed in one LLM batch", ["provider"], BATCH_BUCKETS
+)
+RATE_LIMIT_WAIT_SECONDS = registry.histogram(
+    "aigua_rate_limit_wait_seconds", "Time spent waiting for a rate limiter token", ["limiter"]
+)
+UPSTREAM_RETRIES = registry.counter(
+    "aigua_upstream_retries_total", "Upstream requests retried after a failure", ["limiter"]
+)
+UPSTREAM_FAILURES = registry.counter(
+    "aigua_upstream_failures_total", "Upstream requests that failed after all retries", ["limiter"]
+)
+CACHE_REQUESTS = registry.counter(
+    "aigua_cache_requests_total", "Response cache lookups by result (hit or miss)", ["cache", "result"]
+)
+
+# Filesystem
+FS_OP_SECONDS = registry.histogram(
+    "aigua_fs_op_seconds", "Filesystem operation latency per mount", ["op", "mount"]
+)
+SCAN_FILES = registry.counter(
+    "aigua_scan_files_total", "Directory entries examined by scanners; rate() gives files per second", ["scanner"]
+)
+SCAN_SECONDS = registry.histogram(
+    "aigua_scan_seconds", "Duration of a complete scan", ["scanner"]
+)
+
+_mounts: Dict[str, str] = {}
+
+def mount_of(path: str) -> str:
+    """
+    Mount point holding path, cached per directory
+
+    The mount is looked up from the parent directory; end a directory path
+    with a separator to look it up from the directory itself.
+    """
+    directory = os.path.abspath(os.path.dirname(path))
+    mount = _mounts.get(directory)
+    if mount is None:
+        mount = directory
+        while not os.path.ismount(mount):
+            parent = os.path.dirname(mount)
+            if parent == mount:
+                break
+            mount = parent
+        if len(_mounts) >= MOUNT_CACHE_SIZE:
+            _mounts.clear()
+        _mounts[directory] = mount
+    return mount
+
+def observe_fs(op: str, path: str, seconds: float) -> None:
+    """Record the latency of a filesystem operation on path"""
+    FS_OP_SECONDS.observe(seconds, op, mount_of(path))
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    return registry.render()
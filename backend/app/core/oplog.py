@@ -0,0 +1,170 @@
+"""Structured, buffered log of file operations"""
+import atexit
+import itertools
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+DEFAULT_CAPACITY = 5000
+
+# Entries written to the log file per batch at most, and how long a batch may wait
+FLUSH_BATCH_SIZE = 512
+FLUSH_INTERVAL = 0.5
+
+class OperationLog:
+    """
+    Records what bulk operations did without slowing them down
+
+    `record` only appends a small dict to an in-memory ring buffer and a
+    queue, so hot loops pay no console or file I/O per operation. A
+    background thread writes queued entries to the log file as JSON lines in
+    batches. The ring buffer keeps the most recent entries for `query`.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, log_file: Optional[str] = None):
+        """
+        Initialize the log
+
+        Args:
+            capacity: Number of recent entries kept in memory
+            log_file: Optional JSON-lines file every entry is appended to
+        """
+        self._entries = deque(maxlen=capacity)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.log_file = log_file
+        self._queue: Optional[queue.SimpleQueue] = None
+        self._writer: Optional[threading.Thread] = None
+        self.logger = logging.getLogger("oplog")
+
+    def configure(self, capacity: int, log_file: Optional[str]) -> None:
+        """Resize the ring buffer and switch the log file (None writes no file)"""
+        if capacity != self._entries.maxlen:
+            with self._lock:
+                self._entries = deque(self._entries, maxlen=max(1, capacity))
+        if log_file != self.log_file:
+            self.flush()
+            self.log_file = log_file
+
+    def record(self, operation: str, status: str, **fields) -> Dict:
+        """
+        Record one operation
+
+        Args:
+            operation: What was done, e.g. "delete" or "rename"
+            status: Outcome, e.g. "success", "error" or "not_found"
+            **fields: Structured details such as path, size or error
+        """
+        entry = {"id": 0, "time": time.time(), "operation": operation, "status": status}
+        entry.update(fields)
+        with self._lock:
+            entry["id"] = next(self._ids)
+            self._entries.append(entry)
+            # Enqueue under the lock so a concurrent flush cannot put its
+            # sentinel ahead of this entry and leave it unwritten
+            if self.log_file:
+                self._writer_queue().put(entry)
+        return entry
+
+    def query(
+        self,
+        operation: Optional[str] = None,
+        status: Optional[str] = None,
+        since_id: int = 0,
+        limit: int = 100
+    ) -> List[Dict]:
+        """Recent entries matching the filters, newest first"""
+        with self._lock:
+            entries = list(self._entries)
+        results = []
+        for entry in reversed(entries):
+            if entry["id"] <= since_id:
+                break
+            if operation is not None and entry["operation"] != operation:
+                continue
+            if status is not None and entry["status"] != status:
+                continue
+            results.append(entry)
+            if len(results) >= limit:
+                break
+        return results
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Counts of buffered entries per operation and status"""
+        with self._lock:
+            entries = list(self._entries)
+        counts: Dict[str, Dict[str, int]] = {}
+        for entry in entries:
+            by_status = counts.setdefault(entry["operation"], {})
+            by_status[entry["status"]] = by_status.get(entry["status"], 0) + 1
+        return counts
+
+    def _writer_queue(self) -> queue.SimpleQueue:
+        """Queue of the writer thread, starting one if needed (caller holds the lock)"""
+        if self._queue is None:
+            self._queue = queue.SimpleQueue()
+            self._writer = threading.Thread(
+                target=self._write_loop,
+                args=(self._queue,),
+                name="aigua-oplog",
+                daemon=True
+            )
+            self._writer.start()
+        return self._queue
+
+    def _write_loop(self, entries: queue.SimpleQueue) -> None:
+        """Append queued entries to the log file in batches until a None arrives"""
+        while True:
+            entry = entries.get()
+            if entry is None:
+                return
+            batch = [entry]
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            stop = False
+            while len(batch) < FLUSH_BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    entry = entries.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stop = True
+                    break
+                batch.append(entry)
+            self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch: List[Dict]) -> None:
+        log_file = self.log_file
+        if not log_file:
+            return
+        try:
+            with open(log_file, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(entry, ensure_ascii=False, default=str) + "\n" for entry in batch))
+        except OSError as e:
+            self.logger.error(f"Failed to write operation log {log_file}: {e}")
+
+    def flush(self) -> None:
+        """Write out everything queued so far and stop the writer thread"""
+        with self._lock:
+            writer, entries = self._writer, self._queue
+            self._writer = self._queue = None
+            if entries is not None:
+                entries.put(None)
+        if writer is not None:
+            writer.join()
+
+# Create a global operation log instance
+oplog = OperationLog()
+atexit.register(oplog.flush)
+
+def record(operation: str, status: str, **fields) -> Dict:
+    """Record an operation in the shared log"""
+    return oplog.record(operation, status, **fields)
@@ -0,0 +1,181 @@
+"""Streaming pipeline of async stages connected by bounded queues"""
+import asyncio
+import time
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Union
+
+# Marks the end of the stream in a stage's input queue
+_END = object()
+
+class Stage:
+    """
+    One step of a pipeline
+
+    `func` receives one item, or a list of up to `batch_size` items for a
+    batched stage, and returns the item to pass on (a list of the same
+    length for a batched stage). Returning None drops the item.
+    """
+    __slots__ = ("name", "func", "concurrency", "batch_size", "processed", "emitted", "busy")
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[Any], Awaitable[Any]],
+        concurrency: int = 1,
+        batch_size: int = 0
+    ):
+        """
+        Initialize the stage
+
+        Args:
+            name: Name the stage reports progress under
+            func: Coroutine function applied to each item or batch
+            concurrency: Number of workers running func at once
+            batch_size: Hand func lists of up to this many items (0 for single items)
+        """
+        self.name = name
+        self.func = func
+        self.concurrency = max(1, concurrency)
+        self.batch_size = batch_size
+        self.processed = 0
+        self.emitted = 0
+        self.busy = 0.0
+
+    def stats(self) -> Dict:
+        return {
+            "processed": self.processed,
+            "emitted": self.emitted,
+            "dropped": self.processed - self.emitted,
+            "busy_seconds": round(self.busy, 3)
+        }
+
+class Pipeline:
+    """
+    Runs items through stages that all work at the same time
+
+    Each stage has its own workers and reads from a bounded queue filled by
+    the stage before it, so a 20k-item run overlaps the latencies of the
+    stages and takes roughly as long as its slowest stage instead of the sum
+    of all of them. When a stage falls behind, the queues in front of it fill
+    up and the earlier stages wait, so memory stays bounded by the queue
+    sizes no matter how many items the source produces. Items leave in
+    completion order. If a stage raises, every worker is cancelled and the
+    exception is propagated; closing the output early also cancels them.
+    """
+
+    def __init__(
+        self,
+        stages: List[Stage],
+        queue_size: int = 64,
+        progress: Optional[Callable[[str, int, int], None]] = None
+    ):
+        """
+        Initialize the pipeline
+
+        Args:
+            stages: Stages in processing order
+            queue_size: Maximum items waiting in front of each stage
+            progress: Called with (stage name, items processed, items handed to the stage so far)
+        """
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.progress = progress
+        self.fed = 0
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-stage counters; a stage with a high busy time is the bottleneck"""
+        return {stage.name: stage.stats() for stage in self.stages}
+
+    async def run(self, source: Union[AsyncIterable, Iterable]) -> AsyncIterator[Any]:
+        """Feed the source through all stages, yielding results as they come out"""
+        self.fed = 0
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        output: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        failure: asyncio.Queue = asyncio.Queue()
+
+        async def feed() -> None:
+            if hasattr(source, "__aiter__"):
+                async for item in source:
+                    self.fed += 1
+                    await queues[0].put(item)
+            else:
+                for item in source:
+                    self.fed += 1
+                    await queues[0].put(item)
+            await queues[0].put(_END)
+
+        tasks = [asyncio.create_task(feed())]
+        for index, stage in enumerate(self.stages):
+            downstream = queues[index + 1] if index + 1 < len(self.stages) else output
+            remaining = [stage.concurrency]
+            tasks.extend(
+                asyncio.create_task(self._work(index, queues[index], downstream, remaining))
+                for _ in range(stage.concurrency)
+            )
+        for task in tasks:
+            task.add_done_callback(
+                lambda task: failure.put_nowait(task.exception())
+                if not task.cancelled() and task.exception() is not None else None
+            )
+
+        try:
+            while True:
+                # Wait for the next result, or for a worker to fail
+                next_item = asyncio.ensure_future(output.get())
+                next_failure = asyncio.ensure_future(failure.get())
+                done, _ = await asyncio.wait({next_item, next_failure}, return_when=asyncio.FIRST_COMPLETED)
+                if next_failure in done:
+                    next_item.cancel()
+                    raise next_failure.result()
+                next_failure.cancel()
+                item = next_item.result()
+                if item is _END:
+                    return
+                yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _work(
+        self,
+        index: int,
+        upstream: asyncio.Queue,
+        downstream: asyncio.Queue,
+        remaining: List[int]
+    ) -> None:
+        stage = self.stages[index]
+        while True:
+            item = await upstream.get()
+            if item is _END:
+                # Let the sibling workers see the end too; the last one passes it on
+                await upstream.put(_END)
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    await downstream.put(_END)
+                return
+
+            if stage.batch_size:
+                batch = [item]
+                # Take whatever is already waiting; a slow stage gets full batches
+                while len(batch) < stage.batch_size and not upstream.empty():
+                    item = upstream.get_nowait()
+                    if item is _END:
+                        upstream.put_nowait(_END)
+                        break
+                    batch.append(item)
+                started = time.monotonic()
+                results = await stage.func(batch)
+                stage.busy += time.monotonic() - started
+            else:
+                started = time.monotonic()
+                results = [await stage.func(item)]
+                stage.busy += time.monotonic() - started
+            stage.processed += len(results)
+
+            for result in results:
+                if result is not None:
+                    stage.emitted += 1
+                    await downstream.put(result)
+            if self.progress is not None:
+                total = self.stages[index - 1].emitted if index else self.fed
+                self.progress(stage.name, stage.processed, total)
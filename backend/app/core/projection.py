@@ -0,0 +1,93 @@
+"""Sparse fieldsets for API responses"""
+from typing import Any, Dict, Mapping, Optional
+
+# Requesting this value for `fields` returns the complete objects
+ALL_FIELDS = "*"
+
+# Slim defaults for list endpoints: what a list view needs to render a row
+MOVIE_LIST_FIELDS = (
+    "tmdb_id,title,year,poster_path,directory_path,"
+    "files.file_path,files.file_name,files.file_size,files.subtitles"
+)
+TV_SHOW_LIST_FIELDS = (
+    "tmdb_id,title,year,poster_path,root_path,"
+    "seasons.season_number,seasons.directory_path,"
+    "seasons.episodes.file_path,seasons.episodes.file_name,"
+    "seasons.episodes.file_size,seasons.episodes.subtitles,"
+    "seasons.episodes.episode_info.episode_number,seasons.episodes.episode_info.name"
+)
+FILE_LIST_FIELDS = f"path,name,size,modified,{MOVIE_LIST_FIELDS},{TV_SHOW_LIST_FIELDS}"
+
+def parse_fields(fields: Optional[str], default: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Parse a comma-separated list of dotted field paths into a projection tree
+
+    Example: "title,files.file_name" -> {"title": {}, "files": {"file_name": {}}}
+    An empty subtree selects the whole value.
+
+    Args:
+        fields: Requested fields, "*" for everything, or None for the default
+        default: Fields used when none are requested (None means everything)
+
+    Returns:
+        The projection tree, or None when no projection should be applied
+    """
+    if fields is None:
+        fields = default
+    if fields is None or fields.strip() == ALL_FIELDS:
+        return None
+
+    tree: Dict[str, Any] = {}
+    for field in fields.split(","):
+        field = field.strip()
+        if not field:
+            continue
+        node = tree
+        parts = field.split(".")
+        for part in parts[:-1]:
+            if part in node and not node[part]:
+                # A bare parent field already selects everything beneath it
+                break
+            node = node.setdefault(part, {})
+        else:
+            # A bare field overrides any narrower paths selected before it
+            node[parts[-1]] = {}
+    return tree
+
+def project(value: Any, tree: Optional[Dict[str, Any]]) -> Any:
+    """
+    Reduce a value to the fields in a projection tree
+
+    Works on pydantic models, plain objects, dicts and lists. Lists, tuples and
+    mappings keyed by non-strings (e.g. seasons by number) are treated as
+    collections and projected element by element. Fields missing from a value
+    are skipped. Unselected nested payloads are never serialized.
+    """
+    if not tree:
+        return _dump(value)
+    if isinstance(value, (list, tuple)):
+        return [project(item, tree) for item in value]
+    if isinstance(value, Mapping):
+        if value and not any(isinstance(key, str) for key in value):
+            return {key: project(item, tree) for key, item in value.items()}
+        return {
+            name: project(value[name], subtree)
+            for name, subtree in tree.items()
+            if name in value
+        }
+    if value is None:
+        return None
+
+    projected = {}
+    for name, subtree in tree.items():
+        if hasattr(value, name):
+            projected[name] = project(getattr(value, name), subtree)
+    return projected
+
+def _dump(value: Any) -> Any:
+    """Convert a fully selected value to plain data"""
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if isinstance(value, (list, tuple)):
+        return [_dump(item) for item in value]
+    return value
@@ -0,0 +1,179 @@
+"""Write-ahead journal for batched renames"""
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Dict, IO, List, Optional, Set, Tuple
+
+# Batch states recorded in the journal
+STATE_PLANNED = "planned"
+STATE_APPLYING = "applying"
+STATE_APPLIED = "applied"
+STATE_UNDOING = "undoing"
+STATE_UNDONE = "undone"
+
+# Per-operation markers written between two fsyncs
+SYNC_INTERVAL = 64
+
+class RenameJournal:
+    """
+    Append-only JSON-lines journal for one rename batch
+
+    The first line holds the whole plan as compact [src, dst] pairs and is
+    fsynced before any file is touched. Later lines record state changes and
+    which operations completed or failed, so an interrupted batch can be
+    resumed and a completed batch undone. A torn last line (crash mid-write)
+    is ignored on load.
+
+    The file stays open while a batch runs. Markers are flushed per
+    operation and fsynced every SYNC_INTERVAL operations and on every state
+    change; a marker lost in a crash only means resume re-checks that
+    operation, which is idempotent.
+    """
+
+    def __init__(self, path: str, batch_id: str, ops: List[Tuple[str, str]], created: float):
+        self.path = path
+        self.batch_id = batch_id
+        self.ops = ops
+        self.created = created
+        self.state = STATE_PLANNED
+        self.done: Set[int] = set()
+        self.undone: Set[int] = set()
+        self.errors: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._file: Optional[IO[str]] = None
+        self._unsynced = 0
+
+    @classmethod
+    def create(cls, journal_dir: str, ops: List[Tuple[str, str]]) -> "RenameJournal":
+        """Write a new journal for a plan and return it"""
+        os.makedirs(journal_dir, exist_ok=True)
+        batch_id = time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:8]
+        journal = cls(os.path.join(journal_dir, f"{batch_id}.jsonl"), batch_id, list(ops), time.time())
+        header = {"batch": batch_id, "created": journal.created, "ops": journal.ops}
+        with open(journal.path, "x", encoding="utf-8") as f:
+            f.write(json.dumps(header, ensure_ascii=False, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        return journal
+
+    @classmethod
+    def load(cls, path: str) -> "RenameJournal":
+        """
+        Read a journal back from disk
+
+        A torn last line is cut off the file, so entries appended on resume
+        start on a fresh line instead of continuing the partial one.
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        lines = data.split(b"\n")
+        header = json.loads(lines[0])
+        journal = cls(path, header["batch"], [tuple(op) for op in header["ops"]], header["created"])
+        # End of the last complete entry; the final element has no newline
+        intact = len(lines[0]) + 1
+        for line in lines[1:-1]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # Torn write from a crash; everything before it is intact
+                break
+            journal._replay(entry)
+            intact += len(line) + 1
+        if intact < len(data):
+            with open(path, "r+b") as f:
+                f.truncate(intact)
+                os.fsync(f.fileno())
+        return journal
+
+    def _replay(self, entry: Dict) -> None:
+        if "state" in entry:
+            self.state = entry["state"]
+        if "done" in entry:
+            self.done.add(entry["done"])
+            self.errors.pop(entry["done"], None)
+        if "undone" in entry:
+            self.undone.add(entry["undone"])
+            self.done.discard(entry["undone"])
+        if "failed" in entry:
+            self.errors[entry["failed"]] = entry.get("error", "")
+
+    def _append(self, entry: Dict, sync: bool = False) -> None:
+        """Append an entry; state changes are fsynced, per-op markers in batches"""
+        with self._lock:
+            self._replay(entry)
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self._file.flush()
+            self._unsynced += 1
+            if sync or self._unsynced >= SYNC_INTERVAL:
+                os.fsync(self._file.fileno())
+                self._unsynced = 0
+
+    def close(self) -> None:
+        """Sync and close the journal file; a later append reopens it"""
+        with self._lock:
+            if self._file is None:
+                return
+            try:
+                if self._unsynced:
+                    os.fsync(self._file.fileno())
+            finally:
+                self._file.close()
+                self._file = None
+                self._unsynced = 0
+
+    def set_state(self, state: str) -> None:
+        self._append({"state": state}, sync=True)
+
+    def mark_done(self, index: int) -> None:
+        self._append({"done": index})
+
+    def mark_undone(self, index: int) -> None:
+        self._append({"undone": index})
+
+    def mark_failed(self, index: int, error: str) -> None:
+        self._append({"failed": index, "error": error})
+
+    def pending(self) -> List[int]:
+        """Indices of operations that have not completed"""
+        return [index for index in range(len(self.ops)) if index not in self.done]
+
+    def summary(self) -> Dict:
+        """Describe the batch without listing every operation"""
+        return {
+            "batch_id": self.batch_id,
+            "created": self.created,
+            "state": self.state,
+            "total": len(self.ops),
+            "done": len(self.done),
+            "undone": len(self.undone),
+            "failed": len(self.errors)
+        }
+
+    def results(self) -> List[Dict]:
+        """Per-operation results in the format the media services return"""
+        results = []
+        for index, (src, dst) in enumerate(self.ops):
+            result = {"success": index in self.done, "old_path": src, "new_path": dst}
+            if index in self.errors:
+                result["error"] = self.errors[index]
+            results.append(result)
+        return results
+
+def list_journals(journal_dir: str) -> List[str]:
+    """Paths of all journals in a directory, oldest first"""
+    if not os.path.isdir(journal_dir):
+        return []
+    return sorted(
+        os.path.join(journal_dir, name)
+        for name in os.listdir(journal_dir)
+        if name.endswith(".jsonl")
+    )
+
+def find_journal(journal_dir: str, batch_id: str) -> Optional[str]:
+    """Path of the journal for a batch, if it exists"""
+    path = os.path.join(journal_dir, f"{os.path.basename(batch_id)}.jsonl")
+    return path if os.path.exists(path) else None
@@ -0,0 +1,146 @@
+"""Fast JSON responses and negotiated compression for large payloads"""
+import gzip
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .executor import run_io
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the standard library encoder
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # optional: only gzip is offered without it
+    zstandard = None
+
+def _default(value: Any) -> Any:
+    """Encode values the JSON encoders do not handle natively"""
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    """Serialize content to JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content,
+        default=_default,
+        ensure_ascii=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """JSON response that serializes models and nested TMDB dicts in one pass
+
+    Returning this from an endpoint bypasses FastAPI's pure-Python
+    jsonable_encoder walk; pydantic models are dumped by the encoder directly.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+class CompressionMiddleware:
+    """Compress complete responses above a size threshold with zstd or gzip
+
+    The encoding is negotiated from Accept-Encoding by q-value, preferring
+    zstd on a tie when the zstandard package is available. Streaming
+    responses (such as NDJSON scans) and responses that already carry a
+    Content-Encoding pass through as-is.
+    Bodies of at least `offload_size` bytes are compressed on the IO executor
+    so large scan payloads do not block the event loop.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        zstd_level: int = 3,
+        offload_size: int = 256 * 1024
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+        self.gzip_level = gzip_level
+        self.zstd_level = zstd_level
+
+    def _negotiate(self, accept_encoding: str) -> Optional[str]:
+        """Pick the best supported encoding accepted by the client"""
+        accepted: Dict[str, float] = {}
+        for token in accept_encoding.split(","):
+            name, _, params = token.strip().partition(";")
+            quality = 1.0
+            params = params.strip()
+            if params.startswith("q="):
+                try:
+                    quality = float(params[2:])
+                except ValueError:
+                    quality = 0.0
+            if name:
+                accepted[name.strip().lower()] = quality
+        # Highest q wins; the list order makes zstd win a tie
+        supported = ("zstd", "gzip") if zstandard is not None else ("gzip",)
+        best = max(supported, key=lambda name: accepted.get(name, 0))
+        return best if accepted.get(best, 0) > 0 else None
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "zstd":
+            return zstandard.ZstdCompressor(level=self.zstd_level).compress(body)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self._negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        decided = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, decided
+            if decided:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                # Hold the headers until the first body chunk shows the size
+                start_message = message
+                return
+
+            decided = True
+            headers = MutableHeaders(raw=start_message["headers"])
+            body = message.get("body", b"")
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+            ):
+                await send(start_message)
+                await send(message)
+                return
+
+            if len(body) >= self.offload_size:
+                compressed = await run_io(self._compress, body, encoding)
+            else:
+                compressed = self._compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
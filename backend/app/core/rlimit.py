@@ -3,28 +3,95 @@ import asyncio
 import time
 import logging
 import random
-from typing import Optional, Callable, Any
+from typing import Optional, Callable, Any, Set
+from .executor import run_io
+from .metrics import RATE_LIMIT_WAIT_SECONDS, UPSTREAM_FAILURES, UPSTREAM_RETRIES
+from .shared_state import SharedStore
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Whether a failed upstream request may succeed when retried
+
+    HTTP errors carry a status code (requests' HTTPError on its response,
+    the OpenAI SDK's errors directly). Client errors such as 404 fail the
+    same way every time, so only 429, 5xx and errors without a status
+    (connection failures, timeouts) are retried.
+    """
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if not isinstance(status, int):
+        return True
+    return status == 429 or status >= 500
 
 class RateLimiter:
-    """Token bucket rate limiter with exponential backoff for API requests"""
+    """
+    Token bucket rate limiter with exponential backoff for API requests
     
-    def __init__(self, rate: float, burst: Optional[float] = None):
+    With a shared store the bucket lives in a file used by every worker
+    process, so several workers together stay within one upstream quota.
+    """
+    
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[float] = None,
+        store: Optional[SharedStore] = None,
+        name: str = "default"
+    ):
         """
         Initialize rate limiter
         
         Args:
             rate: Number of tokens per second
             burst: Maximum number of tokens (defaults to rate)
+            store: Shared store holding the bucket, or None for a per-process bucket
+            name: Bucket name in the shared store
         """
         self.rate = rate
         self.burst = burst if burst is not None else rate
+        self.store = store
+        self.name = name
         self.tokens = self.burst
         self.last_update = time.time()
         self.lock = asyncio.Lock()
+        self._refunds: Set[asyncio.Future] = set()
         self.logger = logging.getLogger("rate_limiter")
     
     async def wait_for_token(self) -> None:
         """Wait until a token is available"""
+        start = time.perf_counter()
+        if self.store is not None:
+            await self._wait_for_shared_token()
+        else:
+            await self._wait_for_local_token()
+        RATE_LIMIT_WAIT_SECONDS.observe(time.perf_counter() - start, self.name)
+    
+    async def _wait_for_shared_token(self) -> None:
+        """Reserve a token in the shared bucket, then wait out its debt"""
+        reservation = asyncio.ensure_future(run_io(self.store.reserve, self.name, self.rate, self.burst))
+        try:
+            wait_time = await asyncio.shield(reservation)
+            if wait_time > 0:
+                self.logger.debug(f"Rate limit reached, waiting {wait_time:.2f}s")
+                await asyncio.sleep(wait_time)
+        except asyncio.CancelledError:
+            # The token will not be used (e.g. the client disconnected); give it
+            # back so cancelled waits do not throttle every worker
+            refund = asyncio.ensure_future(self._refund(reservation))
+            self._refunds.add(refund)
+            refund.add_done_callback(self._refunds.discard)
+            raise
+    
+    async def _refund(self, reservation: asyncio.Future) -> None:
+        try:
+            await reservation
+            await run_io(self.store.refund, self.name, self.burst)
+        except Exception as e:
+            self.logger.warning(f"Failed to return a rate limit token: {str(e)}")
+    
+    async def _wait_for_local_token(self) -> None:
+        """Take a token from the per-process bucket, sleeping while it is empty"""
         async with self.lock:
             while self.tokens <= 0:
                 now = time.time()
@@ -53,6 +120,8 @@ class RateLimiter:
         """
         Execute a function with exponential backoff retry logic
         
+        Errors that a retry cannot fix (see is_retryable) are raised at once.
+        
         Args:
             func: Function to execute
             max_retries: Maximum number of retry attempts
@@ -68,8 +137,10 @@ class RateLimiter:
                 return await func(*args, **kwargs)
             except Exception as e:
                 last_exception = e
-                if attempt == max_retries:
+                if attempt == max_retries or not is_retryable(e):
+                    UPSTREAM_FAILURES.inc(self.name)
                     break
+                UPSTREAM_RETRIES.inc(self.name)
                 
                 # Calculate delay with exponential backoff and jitter
                 delay = base_delay * (2 ** attempt) + random.uniform(0, 0.1 * base_delay)
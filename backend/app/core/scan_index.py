@@ -0,0 +1,176 @@
+"""Persistent index of file fingerprints and their TMDB matches"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Dict, Optional
+from .fingerprint import compute_fingerprint
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_stats (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    fingerprint TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS matches (
+    fingerprint TEXT PRIMARY KEY,
+    media_type TEXT NOT NULL,
+    tmdb_id TEXT NOT NULL,
+    season_number INTEGER,
+    episode_number INTEGER
+);
+CREATE TABLE IF NOT EXISTS payloads (
+    key TEXT PRIMARY KEY,
+    info TEXT NOT NULL
+);
+"""
+
+class ScanIndex:
+    """
+    Fingerprint → TMDB match store backed by SQLite
+
+    Fingerprints are cached by (path, size, mtime) so unchanged files are never
+    re-hashed. Matches are keyed by fingerprint, so a file that was moved or
+    renamed keeps its identification. TMDB payloads are stored once per
+    movie/show/season/episode and shared by every file that references them.
+
+    All methods are blocking; call them through the IO executor.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger("scan_index")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use"""
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    @staticmethod
+    def movie_key(tmdb_id: str) -> str:
+        return f"movie:{tmdb_id}"
+
+    @staticmethod
+    def show_key(tmdb_id: str) -> str:
+        return f"tv:{tmdb_id}"
+
+    @staticmethod
+    def season_key(tmdb_id: str, season_number: int) -> str:
+        return f"tv:{tmdb_id}:s{season_number}"
+
+    @staticmethod
+    def episode_key(tmdb_id: str, season_number: int, episode_number: int) -> str:
+        return f"tv:{tmdb_id}:s{season_number}e{episode_number}"
+
+    def cached_fingerprint(self, path: str, size: int, mtime: float) -> Optional[str]:
+        """Get the stored fingerprint of a file if it is unchanged since last seen"""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT size, mtime, fingerprint FROM file_stats WHERE path = ?",
+                (path,)
+            ).fetchone()
+        if row and row[0] == size and row[1] == mtime:
+            return row[2]
+        return None
+
+    def fingerprint(self, path: str, size: int, mtime: float) -> Optional[str]:
+        """Get the fingerprint of a file, hashing it only if it changed since last seen"""
+        cached = self.cached_fingerprint(path, size, mtime)
+        if cached:
+            return cached
+
+        try:
+            fingerprint = compute_fingerprint(path)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Failed to fingerprint {path}: {e}")
+            return None
+
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO file_stats (path, size, mtime, fingerprint) VALUES (?, ?, ?, ?)",
+                (path, size, mtime, fingerprint)
+            )
+            conn.commit()
+        return fingerprint
+
+    def get_match(self, fingerprint: str) -> Optional[Dict]:
+        """Get the TMDB match recorded for a fingerprint"""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT media_type, tmdb_id, season_number, episode_number FROM matches WHERE fingerprint = ?",
+                (fingerprint,)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            "media_type": row[0],
+            "tmdb_id": row[1],
+            "season_number": row[2],
+            "episode_number": row[3]
+        }
+
+    def put_match(
+        self,
+        fingerprint: str,
+        media_type: str,
+        tmdb_id: str,
+        season_number: Optional[int] = None,
+        episode_number: Optional[int] = None
+    ) -> None:
+        """Record the TMDB match for a fingerprint"""
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO matches (fingerprint, media_type, tmdb_id, season_number, episode_number) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (fingerprint, media_type, str(tmdb_id), season_number, episode_number)
+            )
+            conn.commit()
+
+    def get_payload(self, key: str) -> Optional[Dict]:
+        """Get a stored TMDB payload"""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT info FROM payloads WHERE key = ?",
+                (key,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_payload(self, key: str, info: Dict) -> None:
+        """Store a TMDB payload"""
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO payloads (key, info) VALUES (?, ?)",
+                (key, json.dumps(info, ensure_ascii=False))
+            )
+            conn.commit()
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+_indexes: Dict[str, ScanIndex] = {}
+_indexes_lock = threading.Lock()
+
+def get_scan_index(db_path: str) -> ScanIndex:
+    """Get the shared index for a database path"""
+    with _indexes_lock:
+        index = _indexes.get(db_path)
+        if index is None:
+            index = _indexes[db_path] = ScanIndex(db_path)
+        return index
@@ -0,0 +1,191 @@
+"""Rate limit buckets and response caches shared by worker processes"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from .executor import run_io
+from .metrics import CACHE_REQUESTS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+"""
+
+# Expired cache rows are purged after this many writes
+PURGE_INTERVAL = 1000
+
+class SharedStore:
+    """
+    Token buckets and cache entries in a SQLite file shared by processes
+
+    When uvicorn runs several workers, every process opens the same file, so
+    together they stay within one upstream rate limit and share one warm
+    cache. Updates run in immediate transactions, which SQLite serializes
+    across processes; no external service is needed.
+
+    All methods are blocking; call them through the IO executor.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.logger = logging.getLogger("shared_state")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use"""
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Autocommit mode; transactions are opened explicitly
+            self._conn = sqlite3.connect(self.db_path, timeout=10.0, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def reserve(self, name: str, rate: float, burst: float) -> float:
+        """
+        Take a token from a bucket, borrowing against the future if it is empty
+
+        Returns:
+            Seconds to wait before using the token (0 if one was available)
+        """
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = conn.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (name,)).fetchone()
+                tokens = burst if row is None else min(burst, row[0] + max(0.0, now - row[1]) * rate)
+                tokens -= 1
+                conn.execute(
+                    "INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                    (name, tokens, now)
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return -tokens / rate if tokens < 0 else 0.0
+
+    def refund(self, name: str, burst: float) -> None:
+        """Return a reserved token that was not used"""
+        with self._lock:
+            self._connect().execute(
+                "UPDATE buckets SET tokens = MIN(?, tokens + 1) WHERE name = ?",
+                (burst, name)
+            )
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a cached value that has not expired"""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT value, expires FROM cache WHERE key = ?",
+                (key,)
+            ).fetchone()
+        if not row or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Any, ttl: float) -> None:
+        """Cache a JSON-serializable value for ttl seconds"""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now + ttl)
+            )
+            self._writes += 1
+            if self._writes % PURGE_INTERVAL == 0:
+                conn.execute("DELETE FROM cache WHERE expires < ?", (now,))
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+_stores: Dict[str, SharedStore] = {}
+_stores_lock = threading.Lock()
+
+def get_shared_store(db_path: Optional[str]) -> Optional[SharedStore]:
+    """Get the store for a database path, or None when sharing is not configured"""
+    if not db_path:
+        return None
+    with _stores_lock:
+        store = _stores.get(db_path)
+        if store is None:
+            store = _stores[db_path] = SharedStore(db_path)
+        return store
+
+class ResponseCache:
+    """
+    Time-limited cache of upstream responses
+
+    Entries live in the shared store when one is configured, so every worker
+    process sees them, and otherwise in a per-process LRU. Either way values
+    are stored serialized, so callers get their own copy to modify.
+    """
+
+    def __init__(self, namespace: str, ttl: float, capacity: int = 1024, store: Optional[SharedStore] = None):
+        """
+        Initialize the cache
+
+        Args:
+            namespace: Prefix separating this cache's keys in the shared store
+            ttl: Seconds an entry stays valid; 0 disables caching
+            capacity: Maximum number of entries kept in the per-process LRU
+            store: Shared store, or None for a per-process cache
+        """
+        self.namespace = namespace
+        self.ttl = ttl
+        self.capacity = capacity
+        self.store = store
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Any]:
+        if self.ttl <= 0:
+            return None
+        value = await self._get(key)
+        CACHE_REQUESTS.inc(self.namespace, "miss" if value is None else "hit")
+        return value
+
+    async def _get(self, key: str) -> Optional[Any]:
+        if self.store is not None:
+            return await run_io(self.store.get, f"{self.namespace}:{key}")
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return json.loads(entry[1])
+
+    async def put(self, key: str, value: Any) -> None:
+        if self.ttl <= 0:
+            return
+        if self.store is not None:
+            await run_io(self.store.put, f"{self.namespace}:{key}", value, self.ttl)
+            return
+        self._entries[key] = (time.time() + self.ttl, json.dumps(value, ensure_ascii=False))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
@@ -0,0 +1,96 @@
+"""Bounded-concurrency helpers for fanning out async work"""
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, List, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+async def gather_bounded(
+    func: Callable[[T], Awaitable[R]],
+    items: Iterable[T],
+    concurrency: int
+) -> List[R]:
+    """
+    Apply an async function to every item with at most `concurrency` calls in flight
+
+    A fixed pool of workers pulls items as earlier calls finish, so only
+    `concurrency` coroutines exist at any time regardless of the input size.
+    Results are returned in input order. If any call raises, the remaining
+    workers are cancelled and the exception is propagated.
+
+    Args:
+        func: Coroutine function to apply
+        items: Items to process
+        concurrency: Maximum number of concurrent calls
+    """
+    items = list(items)
+    results: List[Any] = [None] * len(items)
+    next_index = 0
+
+    async def worker() -> None:
+        nonlocal next_index
+        while next_index < len(items):
+            index = next_index
+            next_index += 1
+            results[index] = await func(items[index])
+
+    workers = [
+        asyncio.create_task(worker())
+        for _ in range(max(1, min(concurrency, len(items))))
+    ]
+    try:
+        await asyncio.gather(*workers)
+    except BaseException:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        raise
+    return results
+
+async def iter_bounded(
+    func: Callable[[T], Awaitable[R]],
+    items: Iterable[T],
+    concurrency: int
+) -> AsyncIterator[Tuple[T, R]]:
+    """
+    Apply an async function to every item, yielding (item, result) as calls finish
+
+    Like gather_bounded, but results are produced in completion order so the
+    caller can forward each one as soon as it is ready. If a call raises, the
+    remaining workers are cancelled and the exception is propagated. Closing
+    the iterator early also cancels outstanding work.
+
+    Args:
+        func: Coroutine function to apply
+        items: Items to process
+        concurrency: Maximum number of concurrent calls
+    """
+    items = list(items)
+    completed: asyncio.Queue = asyncio.Queue()
+    next_index = 0
+
+    async def worker() -> None:
+        nonlocal next_index
+        while next_index < len(items):
+            item = items[next_index]
+            next_index += 1
+            try:
+                outcome = (item, await func(item), None)
+            except Exception as e:
+                outcome = (item, None, e)
+            await completed.put(outcome)
+
+    workers = [
+        asyncio.create_task(worker())
+        for _ in range(max(1, min(concurrency, len(items))))
+    ]
+    try:
+        for _ in range(len(items)):
+            item, result, error = await completed.get()
+            if error is not None:
+                raise error
+            yield item, result
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
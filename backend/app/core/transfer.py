@@ -0,0 +1,257 @@
+"""Concurrent engine for moving downloaded titles into media libraries"""
+import os
+import shutil
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from .initials import BUCKETS, initial_bucket
+from .oplog import record
+from .transfer_ops import MODE_MOVE, TRANSFER_MODES, device_of, is_partial_tree, place_tree
+
+# Content types understood by the engine
+CONTENT_MOVIE = "movie"
+CONTENT_TV_SERIES = "tv_series"
+
+# Item states
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+
+class TransferItem:
+    """One title (movie directory or TV series directory) to move"""
+    __slots__ = ("src", "dst", "content_type", "status", "error", "started", "finished", "methods")
+
+    def __init__(self, src: str, dst: str, content_type: str):
+        self.src = src
+        self.dst = dst
+        self.content_type = content_type
+        self.status = STATUS_PENDING
+        self.error: Optional[str] = None
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.methods = Counter()
+
+    def to_dict(self) -> Dict:
+        result = {"src": self.src, "dst": self.dst, "status": self.status, "methods": dict(self.methods)}
+        if self.error:
+            result["error"] = self.error
+        return result
+
+class TransferEngine:
+    """
+    Moves titles with bounded parallelism per device
+
+    Items are dispatched as soon as their (source device, target device) pair
+    has a free slot, so a slow disk never holds up moves between other disks
+    while a single disk is never hit by more than `parallel_per_device`
+    concurrent moves. Files are placed with the cheapest mechanism the
+    transfer mode allows (see transfer_ops): a same-filesystem move is one
+    rename, and a full copy only happens when nothing else works. Progress
+    is reported through a callback after every state change. All methods
+    are blocking; the backend runs `run` on a thread of its own and the
+    command-line script calls it directly.
+    """
+
+    def __init__(
+        self,
+        parallel_per_device: int = 2,
+        max_parallel: int = 8,
+        mode: str = MODE_MOVE,
+        verify: bool = False,
+        progress_callback: Optional[Callable[[Dict], None]] = None
+    ):
+        """
+        Initialize the engine
+
+        Args:
+            parallel_per_device: Maximum concurrent moves per source/target device pair
+            max_parallel: Maximum concurrent moves overall
+            mode: Transfer mode (move, hardlink, reflink or copy)
+            verify: Checksum-verify files that have to be fully copied
+            progress_callback: Called with a progress snapshot after every state change
+        """
+        if mode not in TRANSFER_MODES:
+            raise ValueError(f"Unsupported transfer mode: {mode}")
+        self.parallel_per_device = max(1, parallel_per_device)
+        self.max_parallel = max(1, max_parallel)
+        self.mode = mode
+        self.verify = verify
+        self.progress_callback = progress_callback
+        self.items: List[TransferItem] = []
+        self._condition = threading.Condition()
+
+    def plan(
+        self,
+        source_root: str,
+        target_root: str,
+        content_type: str,
+        organize_by_initial: bool = False
+    ) -> List[TransferItem]:
+        """Compute the items for moving every entry of source_root into target_root"""
+        if content_type not in (CONTENT_MOVIE, CONTENT_TV_SERIES):
+            raise ValueError(f"Unsupported content type: {content_type}")
+
+        if organize_by_initial:
+            for folder in BUCKETS:
+                os.makedirs(os.path.join(target_root, folder), exist_ok=True)
+
+        items = []
+        for entry in sorted(os.listdir(source_root)):
+            src = os.path.join(source_root, entry)
+            if organize_by_initial:
+                initial_char = initial_bucket(entry)
+                if initial_char is None:
+                    self.note(src, "No initial folder")
+                    continue
+                dst = os.path.join(target_root, initial_char, entry)
+            else:
+                dst = os.path.join(target_root, entry)
+
+            if os.path.isdir(src) and "tmdb" not in entry.lower():
+                self.note(src, "Directory without 'tmdb'")
+            items.append(TransferItem(src, dst, content_type))
+        return items
+
+    def note(self, path: str, message: str) -> None:
+        """Record a title that needs attention in the operation log"""
+        record("transfer", "attention", src=path, message=message)
+
+    def progress(self) -> Dict:
+        """Snapshot of the transfer progress"""
+        counts = defaultdict(int)
+        for item in self.items:
+            counts[item.status] += 1
+        return {
+            "total": len(self.items),
+            "pending": counts[STATUS_PENDING],
+            "running": counts[STATUS_RUNNING],
+            "done": counts[STATUS_DONE],
+            "failed": counts[STATUS_FAILED],
+            "cancelled": counts[STATUS_CANCELLED],
+            "current": [item.src for item in self.items if item.status == STATUS_RUNNING]
+        }
+
+    def report(self) -> Dict:
+        """Progress plus per-item results"""
+        report = self.progress()
+        report["items"] = [item.to_dict() for item in self.items]
+        return report
+
+    def run(self, items: List[TransferItem], cancel_event: Optional[threading.Event] = None) -> Dict:
+        """
+        Move all items and return the report
+
+        Setting cancel_event stops dispatching; moves already running finish.
+        """
+        self.items = items
+        queues: Dict[Tuple, List[TransferItem]] = defaultdict(list)
+        for item in items:
+            queues[self._device_key(item)].append(item)
+        for queue in queues.values():
+            queue.reverse()  # pop() from the end keeps the planned order
+
+        active: Dict[Tuple, int] = defaultdict(int)
+        running = 0
+
+        def finished(key: Tuple) -> None:
+            nonlocal running
+            with self._condition:
+                active[key] -= 1
+                running -= 1
+                self._condition.notify()
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix="aigua-transfer") as pool:
+            with self._condition:
+                while any(queues.values()) or running:
+                    if cancel_event is not None and cancel_event.is_set():
+                        break
+                    dispatched = False
+                    for key, queue in queues.items():
+                        if running >= self.max_parallel:
+                            break
+                        if queue and active[key] < self.parallel_per_device:
+                            item = queue.pop()
+                            active[key] += 1
+                            running += 1
+                            pool.submit(self._run_item, item, key, finished)
+                            dispatched = True
+                    if not dispatched:
+                        # Woken when a move finishes; the timeout polls cancellation
+                        self._condition.wait(timeout=0.5)
+
+            for queue in queues.values():
+                for item in queue:
+                    item.status = STATUS_CANCELLED
+
+        self._notify()
+        return self.report()
+
+    def _device_key(self, item: TransferItem) -> Tuple:
+        """Device pair a move touches; the target may not exist yet"""
+        return (device_of(item.src), device_of(os.path.dirname(item.dst)))
+
+    def _run_item(self, item: TransferItem, key: Tuple, finished: Callable[[Tuple], None]) -> None:
+        item.status = STATUS_RUNNING
+        item.started = time.time()
+        self._notify()
+        try:
+            if item.content_type == CONTENT_MOVIE:
+                self._move_movie(item)
+            else:
+                self._move_tv_series(item)
+            item.status = STATUS_DONE
+        except Exception as e:
+            item.status = STATUS_FAILED
+            item.error = str(e)
+        finally:
+            item.finished = time.time()
+            record(
+                "transfer",
+                "success" if item.status == STATUS_DONE else "error",
+                src=item.src,
+                dst=item.dst,
+                mode=self.mode,
+                methods=dict(item.methods),
+                seconds=round(item.finished - item.started, 3),
+                error=item.error
+            )
+            finished(key)
+            self._notify()
+
+    def _notify(self) -> None:
+        if self.progress_callback is not None:
+            self.progress_callback(self.progress())
+
+    def _place(self, item: TransferItem, src: str, dst: str) -> None:
+        item.methods.update(place_tree(src, dst, self.mode, self.verify))
+
+    def _move_movie(self, item: TransferItem) -> None:
+        """Replace an existing movie directory with the new one"""
+        src, dst = item.src, item.dst
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        if os.path.exists(dst) and not is_partial_tree(dst):
+            shutil.rmtree(dst)
+            record("delete_tree", "success", directory=dst, reason="replaced")
+        self._place(item, src, dst)
+
+    def _move_tv_series(self, item: TransferItem) -> None:
+        """Transfer a series, replacing existing seasons one by one"""
+        src, dst = item.src, item.dst
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        if not os.path.exists(dst) or is_partial_tree(dst):
+            self._place(item, src, dst)
+            return
+
+        for season in os.listdir(src):
+            src_season_path = os.path.join(src, season)
+            dst_season_path = os.path.join(dst, season)
+            if not os.path.isdir(src_season_path):
+                continue
+            if os.path.exists(dst_season_path) and not is_partial_tree(dst_season_path):
+                shutil.rmtree(dst_season_path)
+                record("delete_tree", "success", directory=dst_season_path, reason="replaced")
+            self._place(item, src_season_path, dst_season_path)
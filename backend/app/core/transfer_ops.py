@@ -0,0 +1,440 @@
+"""File placement primitives used by the transfer engine
+
+Each function places a file or tree at its destination using the cheapest
+mechanism that works: a rename within one filesystem, a hard link, a
+copy-on-write reflink, and a full copy only as the last resort.
+"""
+import errno
+import os
+import queue
+import shutil
+import threading
+import time
+from collections import Counter
+from typing import Optional, Tuple
+from .fingerprint import compute_full_hash, new_full_hasher
+from .io_scheduler import throttle
+from .metrics import observe_fs
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+# Transfer modes
+MODE_MOVE = "move"          # rename on one filesystem, otherwise copy then delete the source
+MODE_HARDLINK = "hardlink"  # keep the source (e.g. for seeding) and link the files
+MODE_REFLINK = "reflink"    # keep the source and clone file data copy-on-write
+MODE_COPY = "copy"          # keep the source and write an independent full copy
+TRANSFER_MODES = (MODE_MOVE, MODE_HARDLINK, MODE_REFLINK, MODE_COPY)
+
+# Placement methods, as counted in transfer reports
+METHOD_RENAME = "rename"
+METHOD_HARDLINK = "hardlink"
+METHOD_REFLINK = "reflink"
+METHOD_COPY = "copy"
+METHOD_SYMLINK = "symlink"
+
+# Linux ioctl cloning a whole file (btrfs, XFS with reflink=1, bcachefs, ...)
+FICLONE = 0x40049409
+
+# Errors meaning "this mechanism is not possible here", as opposed to real failures
+_UNSUPPORTED_ERRNOS = {
+    errno.EXDEV,
+    errno.EPERM,
+    errno.EMLINK,
+    errno.ENOTSUP,
+    errno.EOPNOTSUPP,
+    errno.EINVAL,
+    errno.ENOTTY,
+    errno.ENOSYS
+}
+
+# Full copies move data in large chunks; resumed copies restart at a block boundary
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+RESUME_ALIGNMENT = 1024 * 1024
+PIPELINE_BUFFERS = 3
+
+# Suffix of partially copied files; renamed into place once complete
+PART_SUFFIX = ".aigua-part"
+
+# Present in a destination tree while it is being filled file by file
+TRANSFER_MARKER = ".aigua-transfer"
+
+# Device pairs on which reflinks failed; not retried for every file
+_no_reflink = set()
+
+class ChecksumMismatch(OSError):
+    """The copy read back from disk does not match the source"""
+
+def device_of(path: str) -> int:
+    """Device of the nearest existing ancestor of a path"""
+    while True:
+        try:
+            return os.stat(path).st_dev
+        except OSError:
+            parent = os.path.dirname(path)
+            if parent == path:
+                return -1
+            path = parent
+
+def _devices(src: str, dst: str) -> Tuple[int, int]:
+    return (device_of(src), device_of(os.path.dirname(dst)))
+
+def try_rename(src: str, dst: str) -> bool:
+    """Rename if source and target are on one filesystem; False on EXDEV"""
+    try:
+        os.rename(src, dst)
+        return True
+    except OSError as e:
+        if e.errno == errno.EXDEV:
+            return False
+        raise
+
+def try_hardlink(src: str, dst: str) -> bool:
+    """Hard link a file; False if links are not possible between the two paths"""
+    try:
+        os.link(src, dst)
+        return True
+    except OSError as e:
+        if e.errno in _UNSUPPORTED_ERRNOS:
+            return False
+        raise
+
+def try_reflink(src: str, dst: str) -> bool:
+    """Clone a file copy-on-write; False if the filesystem does not support it"""
+    if fcntl is None:
+        return False
+    devices = _devices(src, dst)
+    if devices in _no_reflink:
+        return False
+    with open(src, "rb") as src_file, open(dst, "xb") as dst_file:
+        try:
+            fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+            cloned = True
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED_ERRNOS:
+                # Do not leave the empty target behind to block a retry
+                dst_file.close()
+                os.remove(dst)
+                raise
+            cloned = False
+    if not cloned:
+        _no_reflink.add(devices)
+        os.remove(dst)
+        return False
+    shutil.copystat(src, dst)
+    return True
+
+def copy_file(src: str, dst: str, verify: bool = False) -> Optional[str]:
+    """
+    Full copy of file data and metadata
+
+    Data goes to `dst + PART_SUFFIX` and is renamed into place only after it
+    is complete and fsynced, so dst never holds a partial file. A part file
+    left by an interrupted copy is resumed after checking that its last
+    block matches the source.
+
+    Without verification the kernel copies the data (copy_file_range, then
+    sendfile) without passing it through Python. With verification the
+    source is hashed while it is copied, reads overlapping writes, and the
+    copy is hashed again from disk before it is renamed into place.
+
+    Returns the BLAKE2b hash of the data when verifying, otherwise None.
+    """
+    part = dst + PART_SUFFIX
+    with open(src, "rb", buffering=0) as src_file:
+        size = os.fstat(src_file.fileno()).st_size
+        offset = _resume_offset(src_file, part, size)
+        with open(part, "r+b" if offset else "wb", buffering=0) as dst_file:
+            dst_file.truncate(offset)
+            charge = _charger(src, dst)
+            if verify:
+                digest = _copy_hashed(src_file, dst_file, offset, size, charge)
+            else:
+                digest = None
+                _copy_kernel(src_file.fileno(), dst_file.fileno(), offset, size, charge)
+            os.fsync(dst_file.fileno())
+            if verify and hasattr(os, "posix_fadvise"):
+                # Drop the copy from the page cache so verification reads the disk
+                os.posix_fadvise(dst_file.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+    if verify and compute_full_hash(part) != digest:
+        os.remove(part)
+        raise ChecksumMismatch(errno.EIO, f"Copy does not match source: {src}")
+    shutil.copystat(src, part)
+    os.replace(part, dst)
+    return digest
+
+def _resume_offset(src_file, part: str, size: int) -> int:
+    """Where to continue an interrupted copy; 0 if the part file is unusable"""
+    try:
+        part_size = os.path.getsize(part)
+    except OSError:
+        return 0
+    offset = min(part_size, size)
+    offset -= offset % RESUME_ALIGNMENT
+    if offset == 0:
+        return 0
+    # The last kept block must match, otherwise the part belongs to another file
+    check = min(offset, RESUME_ALIGNMENT)
+    with open(part, "rb", buffering=0) as part_file:
+        part_file.seek(offset - check)
+        tail = part_file.read(check)
+    src_file.seek(offset - check)
+    return offset if src_file.read(check) == tail else 0
+
+def _charger(src: str, dst: str):
+    """Account a chunk as read from the source mount and written to the target mount"""
+    def charge(nbytes: int) -> None:
+        throttle(src, nbytes)
+        throttle(dst, nbytes)
+    return charge
+
+def _copy_kernel(src_fd: int, dst_fd: int, offset: int, size: int, charge) -> None:
+    """Copy [offset, size) without user-space buffers where the OS allows it"""
+    if hasattr(os, "copy_file_range"):
+        try:
+            while offset < size:
+                copied = os.copy_file_range(src_fd, dst_fd, min(COPY_CHUNK_SIZE, size - offset), offset, offset)
+                if copied == 0:
+                    return
+                offset += copied
+                charge(copied)
+            return
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED_ERRNOS:
+                raise
+
+    if hasattr(os, "sendfile"):
+        try:
+            os.lseek(dst_fd, offset, os.SEEK_SET)
+            while offset < size:
+                copied = os.sendfile(dst_fd, src_fd, offset, min(COPY_CHUNK_SIZE, size - offset))
+                if copied == 0:
+                    return
+                offset += copied
+                charge(copied)
+            return
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED_ERRNOS:
+                raise
+
+    os.lseek(src_fd, offset, os.SEEK_SET)
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    buffer = bytearray(COPY_CHUNK_SIZE)
+    view = memoryview(buffer)
+    while offset < size:
+        read = os.readv(src_fd, [view[:min(COPY_CHUNK_SIZE, size - offset)]])
+        if read == 0:
+            return
+        _write_all(dst_fd, view[:read])
+        offset += read
+        charge(read)
+
+def _write_all(fd: int, data: memoryview) -> None:
+    while data:
+        data = data[os.write(fd, data):]
+
+def _copy_hashed(src_file, dst_file, offset: int, size: int, charge) -> str:
+    """
+    Copy [offset, size) while hashing the whole source
+
+    This thread reads and hashes; a writer thread drains filled buffers, so
+    hashing and writing overlap the next read.
+    """
+    hasher = new_full_hasher()
+    if offset:
+        # Resumed copy: the kept prefix still has to be part of the hash
+        src_file.seek(0)
+        remaining = offset
+        buffer = bytearray(COPY_CHUNK_SIZE)
+        while remaining:
+            read = src_file.readinto(memoryview(buffer)[:min(COPY_CHUNK_SIZE, remaining)])
+            if not read:
+                break
+            hasher.update(memoryview(buffer)[:read])
+            remaining -= read
+
+    free = queue.Queue()
+    filled = queue.Queue()
+    for _ in range(PIPELINE_BUFFERS):
+        free.put(bytearray(COPY_CHUNK_SIZE))
+    errors = []
+
+    def writer() -> None:
+        dst_fd = dst_file.fileno()
+        while True:
+            chunk = filled.get()
+            if chunk is None:
+                return
+            buffer, length = chunk
+            if not errors:
+                try:
+                    _write_all(dst_fd, memoryview(buffer)[:length])
+                except OSError as e:
+                    errors.append(e)
+            free.put(buffer)
+
+    src_file.seek(offset)
+    dst_file.seek(offset)
+    thread = threading.Thread(target=writer, name="aigua-copy-writer", daemon=True)
+    thread.start()
+    try:
+        while offset < size and not errors:
+            buffer = free.get()
+            read = src_file.readinto(memoryview(buffer)[:min(COPY_CHUNK_SIZE, size - offset)])
+            if not read:
+                free.put(buffer)
+                break
+            charge(read)
+            hasher.update(memoryview(buffer)[:read])
+            filled.put((buffer, read))
+            offset += read
+    finally:
+        filled.put(None)
+        thread.join()
+    if errors:
+        raise errors[0]
+    return hasher.hexdigest()
+
+def is_partial_tree(path: str) -> bool:
+    """Whether a destination tree is an interrupted transfer that can be resumed"""
+    return os.path.exists(os.path.join(path, TRANSFER_MARKER))
+
+def _already_placed(src: str, dst: str, resuming: bool) -> bool:
+    """
+    Whether the existing dst already holds the contents of src
+
+    Matching size and mtime are trusted only inside a tree this engine was
+    filling when it was interrupted (copies carry the source mtime); any
+    other existing file must match the full content hash.
+    """
+    src_stat = os.stat(src)
+    dst_stat = os.stat(dst)
+    if os.path.samestat(src_stat, dst_stat):
+        return True
+    if src_stat.st_size != dst_stat.st_size:
+        return False
+    if resuming and src_stat.st_mtime_ns == dst_stat.st_mtime_ns:
+        return True
+    return compute_full_hash(src) == compute_full_hash(dst)
+
+def place_file(
+    src: str,
+    dst: str,
+    mode: str,
+    methods: Counter,
+    verify: bool = False,
+    resuming: bool = False
+) -> None:
+    """
+    Place one file at dst using the cheapest mechanism the mode allows
+
+    `resuming` marks dst as part of an interrupted transfer of this engine
+    being resumed. An existing dst with different content is a collision and
+    raises FileExistsError; the source is never removed in that case.
+    """
+    throttle(dst, ops=1)
+    start = time.perf_counter()
+    try:
+        _place_file(src, dst, mode, methods, verify, resuming)
+    finally:
+        observe_fs("place", dst, time.perf_counter() - start)
+
+def _place_file(src: str, dst: str, mode: str, methods: Counter, verify: bool, resuming: bool) -> None:
+    if os.path.lexists(dst):
+        if not _already_placed(src, dst, resuming):
+            raise FileExistsError(errno.EEXIST, "Target exists with different content", dst)
+        if mode == MODE_MOVE:
+            os.remove(src)
+        return
+    if mode == MODE_MOVE and try_rename(src, dst):
+        methods[METHOD_RENAME] += 1
+        return
+    if mode == MODE_HARDLINK and try_hardlink(src, dst):
+        methods[METHOD_HARDLINK] += 1
+        return
+    if mode != MODE_COPY and try_reflink(src, dst):
+        methods[METHOD_REFLINK] += 1
+    else:
+        copy_file(src, dst, verify)
+        methods[METHOD_COPY] += 1
+    if mode == MODE_MOVE:
+        os.remove(src)
+
+def place_link(src: str, dst: str, mode: str, methods: Counter) -> None:
+    """
+    Recreate the symlink src at dst with the same (possibly relative) target
+
+    An existing dst must already be the same link, otherwise it is a
+    collision and raises FileExistsError. In move mode the source link is
+    removed afterwards.
+    """
+    target = os.readlink(src)
+    if os.path.lexists(dst):
+        if not os.path.islink(dst) or os.readlink(dst) != target:
+            raise FileExistsError(errno.EEXIST, "Target exists with different content", dst)
+    else:
+        os.symlink(target, dst)
+        methods[METHOD_SYMLINK] += 1
+    if mode == MODE_MOVE:
+        os.remove(src)
+
+def _remove_moved_tree(src: str) -> None:
+    """Remove the emptied directories of a moved tree, failing on anything left behind"""
+    for root, dirs, files in os.walk(src, topdown=False):
+        os.rmdir(root)
+
+def place_tree(src: str, dst: str, mode: str, verify: bool = False) -> Counter:
+    """
+    Place a file or directory tree at dst (which must not exist, unless it is
+    an interrupted transfer of the same tree being resumed)
+
+    In move mode a whole tree on one filesystem is a single rename. Otherwise
+    the tree is recreated and every file placed individually, so links and
+    clones are used per file wherever they work. Symlinks to anything but a
+    regular file (directories, dangling links) are recreated as symlinks
+    rather than followed.
+
+    Full copies are checksum-verified when `verify` is set. Returns how many
+    files were placed with each method.
+    """
+    if mode not in TRANSFER_MODES:
+        raise ValueError(f"Unsupported transfer mode: {mode}")
+    methods = Counter()
+    throttle(dst, ops=1)
+    # An existing dst (a resumed tree) is filled file by file, never renamed over
+    if mode == MODE_MOVE and not os.path.lexists(dst) and try_rename(src, dst):
+        methods[METHOD_RENAME] += 1
+        return methods
+    if os.path.islink(src) and not os.path.isfile(src):
+        place_link(src, dst, mode, methods)
+        return methods
+    if not os.path.isdir(src):
+        place_file(src, dst, mode, methods, verify)
+        return methods
+
+    # Only a tree that already carries the marker was filled by this engine
+    resuming = is_partial_tree(dst)
+    os.makedirs(dst, exist_ok=True)
+    marker = os.path.join(dst, TRANSFER_MARKER)
+    open(marker, "a").close()
+    for root, dirs, files in os.walk(src):
+        target_root = os.path.join(dst, os.path.relpath(root, src))
+        os.makedirs(target_root, exist_ok=True)
+        # Symlinks to directories are listed in dirs; recreate them, never enter them
+        links = [name for name in dirs if os.path.islink(os.path.join(root, name))]
+        for name in links:
+            place_link(os.path.join(root, name), os.path.join(target_root, name), mode, methods)
+        dirs[:] = [name for name in dirs if name not in links]
+        for file in files:
+            path = os.path.join(root, file)
+            if os.path.islink(path) and not os.path.isfile(path):
+                place_link(path, os.path.join(target_root, file), mode, methods)
+            else:
+                place_file(path, os.path.join(target_root, file), mode, methods, verify, resuming)
+    os.remove(marker)
+    if mode == MODE_MOVE:
+        _remove_moved_tree(src)
+    return methods
@@ -1,9 +1,18 @@
+import asyncio
+import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .core.config import config_manager
-from .routers import config, media, tmdb
+from .core.disconnect import CancelOnDisconnectMiddleware
+from .core.executor import io_executor
+from .core.io_scheduler import io_scheduler
+from .core.oplog import oplog
+from .core.responses import FastJSONResponse, CompressionMiddleware
+from .routers import config, media, tmdb, operations, jobs, metrics
+from .services.container import services
+from .services.job_service import JobService
 
-app = FastAPI(title="AIGua API")
+app = FastAPI(title="AIGua API", default_response_class=FastJSONResponse)
 
 # Configure CORS
 app.add_middleware(
@@ -14,6 +23,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large responses (scan results, TMDB details) for clients that accept it
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+# Stop TMDB lookups and LLM batches of read requests whose client has gone away
+app.add_middleware(CancelOnDisconnectMiddleware)
+
 # Include routers with clear organization
 # 1. Configuration endpoints
 app.include_router(config.router, prefix="/api/config", tags=["config"])
@@ -24,20 +39,65 @@ app.include_router(media.router, prefix="/api/media", tags=["media"])
 # 3. External API endpoints (TMDB)
 app.include_router(tmdb.router, prefix="/api/tmdb", tags=["tmdb"])
 
+# 4. Operation log
+app.include_router(operations.router, prefix="/api/operations", tags=["operations"])
+
+# 5. Background jobs
+app.include_router(jobs.router, prefix="/api/jobs", tags=["jobs"])
+
+# 6. Metrics for Prometheus
+app.include_router(metrics.router, prefix="/api/metrics", tags=["metrics"])
+
+def configure_runtime(basic_config) -> None:
+    """Apply the basic settings to the shared IO executor, scheduler and log"""
+    # Size the executor used for blocking filesystem work
+    io_executor.configure(basic_config.io_workers)
+    
+    # Throttle transfers, hashing and scans on busy mounts
+    io_scheduler.configure(basic_config.io_limits)
+    
+    # Keep recent file operations in memory and append them to the log file
+    oplog.configure(basic_config.operation_log_size, basic_config.operation_log_file)
+
+def on_settings_changed(old, new, changed) -> None:
+    """Reconfigure the shared runtime when the basic settings change"""
+    if "basic_config" not in changed:
+        return
+    configure_runtime(new.basic_config)
+    if (old.basic_config.job_workers, old.basic_config.job_db_path) != (new.basic_config.job_workers, new.basic_config.job_db_path):
+        logging.getLogger("main").warning("Job worker settings take effect after a restart")
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup"""
     # Load settings
     settings = config_manager.load_settings()
+    # Services dropped by a settings change are closed on this loop
+    services.attach(asyncio.get_running_loop())
+    configure_runtime(settings.basic_config)
+    
+    # Follow later settings changes without a restart
+    config_manager.subscribe(on_settings_changed)
+    
+    # Resume jobs left unfinished by the last run and start the job workers
+    await services.get(JobService).start()
     
-    # Initialize services with config
-    # Services will be initialized when needed by the routers
+    # Other services are created on first use by the routers
     
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
     # Close any open connections
-    pass
+    # Interrupt running jobs; they resume on the next start
+    job_service = services.created(JobService)
+    if job_service is not None:
+        await job_service.stop()
+    # Close the clients of the shared services
+    await services.aclose()
+    # Drop queued filesystem work so shutdown is not held up by a long scan
+    io_executor.shutdown(cancel_futures=True)
+    # Write out buffered operation log entries
+    oplog.flush()
 
 @app.get("/")
 async def root():
@@ -1,6 +1,7 @@
 from .llm_config import LLMConfig
 from .tmdb_config import TMDBConfig
 from .media_config import MediaConfig, MediaLibrary
-from .basic_config import BasicConfig
+from .basic_config import BasicConfig, IOLimit
+from .transfer_config import TransferConfig
 
-__all__ = ['LLMConfig', 'TMDBConfig', 'MediaConfig', 'MediaLibrary', 'BasicConfig'] 
\ No newline at end of file
+__all__ = ['LLMConfig', 'TMDBConfig', 'MediaConfig', 'MediaLibrary', 'BasicConfig', 'IOLimit', 'TransferConfig'] 
\ No newline at end of file
@@ -1,11 +1,31 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional
+
+class IOLimit(BaseModel):
+    """I/O throttling for one mount point"""
+    model_config = ConfigDict(frozen=True)
+    
+    mount: str = Field(..., description="Mount point or directory the limits apply to")
+    bytes_per_second: float = Field(default=0, description="Maximum bytes read or written per second, 0 for unlimited")
+    ops_per_second: float = Field(default=0, description="Maximum file operations per second, 0 for unlimited")
 
 class BasicConfig(BaseModel):
     """Basic application configuration"""
+    model_config = ConfigDict(frozen=True)
+    
     proxy_url: Optional[str] = None
     debug_mode: bool = False
     log_level: str = "INFO"
+    io_workers: int = 8
+    io_limits: List[IOLimit] = []
+    operation_log_size: int = 5000
+    operation_log_file: Optional[str] = "operations.log"
+    job_workers: int = 2
+    job_db_path: str = "jobs.db"
+    shared_state_path: Optional[str] = Field(
+        default=None,
+        description="SQLite file sharing rate limits and response caches between worker processes; None keeps them per process"
+    )
     
     @classmethod
     def get_default_config(cls) -> "BasicConfig":
@@ -13,5 +33,12 @@ class BasicConfig(BaseModel):
         return cls(
             proxy_url="",
             debug_mode=False,
-            log_level="INFO"
+            log_level="INFO",
+            io_workers=8,
+            io_limits=[],
+            operation_log_size=5000,
+            operation_log_file="operations.log",
+            job_workers=2,
+            job_db_path="jobs.db",
+            shared_state_path=None
         ) 
\ No newline at end of file
@@ -1,8 +1,10 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, Dict, List
 
 class LLMConfig(BaseModel):
     """Configuration for LLM services"""
+    model_config = ConfigDict(frozen=True)
+    
     provider: str = Field(..., description="LLM provider (grok, gemini, openai, deepseek, etc.)")
     model: str = Field(..., description="Model name to use")
     api_key: str = Field(..., description="API key for the LLM service")
@@ -1,13 +1,17 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional
 
 class MediaLibrary(BaseModel):
     """Media library configuration"""
+    model_config = ConfigDict(frozen=True)
+    
     path: str = Field(..., description="Path to the media library")
     type: str = Field(..., description="Type of media (movie or tv)")
 
 class MediaConfig(BaseModel):
     """Configuration for media libraries"""
+    model_config = ConfigDict(frozen=True)
+    
     libraries: List[MediaLibrary] = Field(default_factory=list, description="List of media libraries")
     media_extension: str = Field(
         default=".iso;.mkv;.mp4;.ts;.m2ts;.avi;.mov;.mpeg",
@@ -17,6 +21,39 @@ class MediaConfig(BaseModel):
         default=".srt;.ass;.ssa",
         description="Supported subtitle file extensions, semicolon-separated"
     )
+    scan_index_path: str = Field(
+        default="scan_index.db",
+        description="Path to the fingerprint index used to reuse TMDB matches for moved files"
+    )
+    rename_journal_dir: str = Field(
+        default="rename_journal",
+        description="Directory holding write-ahead journals of rename batches"
+    )
+    
+    @staticmethod
+    def _split_extensions(extensions: str) -> List[str]:
+        """Split a semicolon-separated extension string into a list"""
+        return [ext.strip().lower() for ext in extensions.split(";") if ext.strip()]
+    
+    @property
+    def supported_extensions(self) -> List[str]:
+        """Supported media file extensions as a list"""
+        return self._split_extensions(self.media_extension)
+    
+    @property
+    def movie_extensions(self) -> List[str]:
+        """Media file extensions recognised in movie directories"""
+        return self.supported_extensions
+    
+    @property
+    def tv_extensions(self) -> List[str]:
+        """Media file extensions recognised in season directories"""
+        return self.supported_extensions
+    
+    @property
+    def subtitle_extensions(self) -> List[str]:
+        """Supported subtitle file extensions as a list"""
+        return self._split_extensions(self.subtitle_extension)
     
     @classmethod
     def get_default_config(cls) -> "MediaConfig":
@@ -24,5 +61,7 @@ class MediaConfig(BaseModel):
         return cls(
             libraries=[],
             media_extension=".iso;.mkv;.mp4;.ts;.m2ts;.avi;.mov;.mpeg",
-            subtitle_extension=".srt;.ass;.ssa"
+            subtitle_extension=".srt;.ass;.ssa",
+            scan_index_path="scan_index.db",
+            rename_journal_dir="rename_journal"
         ) 
\ No newline at end of file
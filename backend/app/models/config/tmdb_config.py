@@ -1,11 +1,15 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional
 
 class TMDBConfig(BaseModel):
     """Configuration for TMDB API"""
+    model_config = ConfigDict(frozen=True)
+    
     api_key: str = Field(..., description="TMDB API key")
     rate_limit: int = Field(default=50, description="Rate limit in requests per second")
     language: str = Field(default="en-US", description="Language for API responses")
+    concurrency: int = Field(default=10, description="Maximum number of concurrent TMDB lookups")
+    cache_ttl: int = Field(default=86400, description="Seconds TMDB searches and details are cached, 0 to disable")
     
     @classmethod
     def get_default_config(cls) -> "TMDBConfig":
@@ -13,5 +17,7 @@ class TMDBConfig(BaseModel):
         return cls(
             api_key="",
             rate_limit=50,
-            language="en-US"
+            language="en-US",
+            concurrency=10,
+            cache_ttl=86400
         ) 
\ No newline at end of file
@@ -0,0 +1,23 @@
+from pydantic import BaseModel, ConfigDict, Field
+
+class TransferConfig(BaseModel):
+    """Configuration for moving titles from a download area into the libraries"""
+    model_config = ConfigDict(frozen=True)
+    
+    parallel_per_device: int = Field(default=2, description="Maximum number of concurrent moves per source/target device pair")
+    max_parallel: int = Field(default=8, description="Maximum number of concurrent moves overall")
+    mode: str = Field(
+        default="move",
+        description="Transfer mode: move, hardlink (keep the source for seeding), reflink or copy"
+    )
+    verify: bool = Field(default=False, description="Checksum-verify files that have to be fully copied")
+    
+    @classmethod
+    def get_default_config(cls) -> "TransferConfig":
+        """Get default transfer configuration"""
+        return cls(
+            parallel_per_device=2,
+            max_parallel=8,
+            mode="move",
+            verify=False
+        )
\ No newline at end of file
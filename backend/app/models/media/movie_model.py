@@ -10,6 +10,7 @@ class MovieFile(BaseModel):
     modified_time: datetime
     selected: bool = True
     new_name: str = ""
+    fingerprint: Optional[str] = None  # Size + partial content hash
     movie_info: Optional[Dict] = None  # TMDB movie info
     subtitles: List[str] = []  # Associated subtitle files
 
@@ -25,4 +26,5 @@ class Movie(BaseModel):
     files: List[MovieFile] = []
     selected: bool = True
     new_name: str = ""
+    fingerprint: Optional[str] = None  # Size + partial content hash
     movie_info: Optional[Dict] = None  # TMDB movie info 
\ No newline at end of file
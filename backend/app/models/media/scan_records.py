@@ -0,0 +1,255 @@
+"""Compact internal representation of scan results
+
+Scanning a large library used to build one pydantic model per file. The
+records here are slotted objects instead: directory paths are interned once in
+a PathTable and referenced by integer id, modification times stay as floats,
+and TMDB payloads are held by reference rather than validated (and copied)
+into each model. Results leaving the API are serialized straight from the
+records as plain dicts shaped like the models' dumps (`to_dict`); pydantic
+models are only built where a caller needs them (`to_model`).
+"""
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from .movie_model import Movie, MovieFile
+from .tv_show_model import TVShow, TVSeason, TVEpisode
+
+class PathTable:
+    """Interns directory paths so each one is stored once and referenced by id"""
+    __slots__ = ("_ids", "_paths")
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._paths: List[str] = []
+
+    def intern(self, path: str) -> int:
+        """Return the id of a path, adding it to the table if needed"""
+        path_id = self._ids.get(path)
+        if path_id is None:
+            path_id = len(self._paths)
+            path = sys.intern(path)
+            self._ids[path] = path_id
+            self._paths.append(path)
+        return path_id
+
+    def __getitem__(self, path_id: int) -> str:
+        return self._paths[path_id]
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+class FileRecord:
+    """A media file and its subtitles; used for both movie files and episodes"""
+    __slots__ = (
+        "dir_id", "file_name", "file_size", "modified_time", "subtitles",
+        "fingerprint", "movie_info", "episode_info"
+    )
+
+    def __init__(
+        self,
+        dir_id: int,
+        file_name: str,
+        file_size: int,
+        modified_time: float,
+        subtitles: Tuple[str, ...] = (),
+        fingerprint: Optional[str] = None
+    ):
+        self.dir_id = dir_id
+        self.file_name = file_name
+        self.file_size = file_size
+        self.modified_time = modified_time
+        self.subtitles = subtitles
+        self.fingerprint = fingerprint
+        self.movie_info: Optional[Dict] = None
+        self.episode_info: Optional[Dict] = None
+
+    def file_path(self, paths: PathTable) -> str:
+        """Full path of the file"""
+        return os.path.join(paths[self.dir_id], self.file_name)
+
+    def to_movie_file(self, paths: PathTable) -> MovieFile:
+        """Build the API model for a movie file"""
+        return MovieFile(
+            file_path=self.file_path(paths),
+            file_name=self.file_name,
+            file_size=self.file_size,
+            modified_time=datetime.fromtimestamp(self.modified_time),
+            fingerprint=self.fingerprint,
+            movie_info=self.movie_info,
+            subtitles=list(self.subtitles)
+        )
+
+    def _file_dict(self, paths: PathTable, info_field: str, info: Optional[Dict]) -> Dict[str, Any]:
+        return {
+            "file_path": self.file_path(paths),
+            "file_name": self.file_name,
+            "file_size": self.file_size,
+            "modified_time": datetime.fromtimestamp(self.modified_time),
+            "selected": True,
+            "new_name": "",
+            "fingerprint": self.fingerprint,
+            info_field: info,
+            "subtitles": list(self.subtitles)
+        }
+
+    def to_movie_file_dict(self, paths: PathTable) -> Dict[str, Any]:
+        """The movie file as a MovieFile dump, without building the model"""
+        return self._file_dict(paths, "movie_info", self.movie_info)
+
+    def to_episode_dict(self, paths: PathTable) -> Dict[str, Any]:
+        """The episode as a TVEpisode dump, without building the model"""
+        return self._file_dict(paths, "episode_info", self.episode_info)
+
+    def to_episode(self, paths: PathTable) -> TVEpisode:
+        """Build the API model for an episode"""
+        return TVEpisode(
+            file_path=self.file_path(paths),
+            file_name=self.file_name,
+            file_size=self.file_size,
+            modified_time=datetime.fromtimestamp(self.modified_time),
+            fingerprint=self.fingerprint,
+            episode_info=self.episode_info,
+            subtitles=list(self.subtitles)
+        )
+
+class MovieRecord:
+    """A movie directory with its files"""
+    __slots__ = ("dir_id", "tmdb_id", "title", "year", "movie_info", "files")
+
+    def __init__(self, dir_id: int, tmdb_id: Optional[str], title: str, year: Optional[str], movie_info: Optional[Dict]):
+        self.dir_id = dir_id
+        self.tmdb_id = tmdb_id
+        self.title = title
+        self.year = year
+        self.movie_info = movie_info
+        self.files: List[FileRecord] = []
+
+    def to_model(self, paths: PathTable) -> Movie:
+        """Build the API model for the movie"""
+        return Movie(
+            tmdb_id=self.tmdb_id,
+            title=self.title,
+            year=self.year,
+            poster_path=self.movie_info.get('poster_path') if self.movie_info else None,
+            directory_path=paths[self.dir_id],
+            movie_info=self.movie_info,
+            files=[record.to_movie_file(paths) for record in self.files]
+        )
+
+    def to_dict(self, paths: PathTable) -> Dict[str, Any]:
+        """The movie as a Movie dump, without building the models"""
+        return {
+            "tmdb_id": self.tmdb_id,
+            "title": self.title,
+            "original_title": None,
+            "year": self.year,
+            "overview": None,
+            "poster_path": self.movie_info.get('poster_path') if self.movie_info else None,
+            "directory_path": paths[self.dir_id],
+            "files": [record.to_movie_file_dict(paths) for record in self.files],
+            "selected": True,
+            "new_name": "",
+            "fingerprint": None,
+            "movie_info": self.movie_info
+        }
+
+class SeasonRecord:
+    """A season directory with its episodes"""
+    __slots__ = ("season_number", "dir_id", "season_info", "episodes")
+
+    def __init__(self, season_number: int, dir_id: int):
+        self.season_number = season_number
+        self.dir_id = dir_id
+        self.season_info: Optional[Dict] = None
+        self.episodes: List[FileRecord] = []
+
+    def to_model(self, paths: PathTable) -> TVSeason:
+        """Build the API model for the season"""
+        return TVSeason(
+            season_number=self.season_number,
+            directory_path=paths[self.dir_id],
+            season_info=self.season_info,
+            episodes=[record.to_episode(paths) for record in self.episodes]
+        )
+
+    def to_dict(self, paths: PathTable) -> Dict[str, Any]:
+        """The season as a TVSeason dump, without building the models"""
+        return {
+            "season_number": self.season_number,
+            "directory_path": paths[self.dir_id],
+            "episodes": [record.to_episode_dict(paths) for record in self.episodes],
+            "selected": True,
+            "new_name": "",
+            "season_info": self.season_info
+        }
+
+class ShowRecord:
+    """A TV show root directory with its seasons"""
+    __slots__ = ("root_id", "tmdb_id", "title", "year", "show_info", "seasons")
+
+    def __init__(self, root_id: int, title: str):
+        self.root_id = root_id
+        self.tmdb_id: Optional[str] = None
+        self.title = title
+        self.year: Optional[str] = None
+        self.show_info: Optional[Dict] = None
+        self.seasons: Dict[int, SeasonRecord] = {}
+
+    def to_model(self, paths: PathTable) -> TVShow:
+        """Build the API model for the show"""
+        return TVShow(
+            tmdb_id=self.tmdb_id,
+            title=self.title,
+            year=self.year,
+            poster_path=self.show_info.get('poster_path') if self.show_info else None,
+            root_path=paths[self.root_id],
+            show_info=self.show_info,
+            seasons={
+                number: season.to_model(paths)
+                for number, season in self.seasons.items()
+            }
+        )
+
+    def to_dict(self, paths: PathTable) -> Dict[str, Any]:
+        """The show as a TVShow dump, without building the models"""
+        return {
+            "tmdb_id": self.tmdb_id,
+            "title": self.title,
+            "original_title": None,
+            "year": self.year,
+            "overview": None,
+            "poster_path": self.show_info.get('poster_path') if self.show_info else None,
+            "root_path": paths[self.root_id],
+            "seasons": {
+                number: season.to_dict(paths)
+                for number, season in self.seasons.items()
+            },
+            "selected": True,
+            "new_name": "",
+            "show_info": self.show_info
+        }
+
+class ScanResult:
+    """Records produced by a scan together with the path table they reference"""
+    __slots__ = ("paths", "records")
+
+    def __init__(self, paths: Optional[PathTable] = None):
+        self.paths = paths if paths is not None else PathTable()
+        self.records: List[Union[MovieRecord, ShowRecord]] = []
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def iter_models(self) -> Iterator[Union[Movie, TVShow]]:
+        """Build API models one record at a time"""
+        for record in self.records:
+            yield record.to_model(self.paths)
+
+    def to_models(self) -> List[Union[Movie, TVShow]]:
+        """Build API models for all records"""
+        return list(self.iter_models())
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Serialize all records as model dumps without building the models"""
+        return [record.to_dict(self.paths) for record in self.records]
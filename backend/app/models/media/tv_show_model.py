@@ -10,6 +10,7 @@ class TVEpisode(BaseModel):
     modified_time: datetime
     selected: bool = True
     new_name: str = ""
+    fingerprint: Optional[str] = None  # Size + partial content hash
     episode_info: Optional[Dict] = None  # TMDB episode info
     subtitles: List[str] = []  # Associated subtitle files
 
@@ -1,9 +1,11 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import List, Optional, Dict
-from .config import LLMConfig, TMDBConfig, MediaConfig, BasicConfig
+from .config import LLMConfig, TMDBConfig, MediaConfig, MediaLibrary, BasicConfig, TransferConfig
 
 class Settings(BaseModel):
     """Settings model for the application."""
+    model_config = ConfigDict(frozen=True)
+    
     # LLM Settings
     llm_config: LLMConfig = LLMConfig.get_default_configs()["openai"]
     
@@ -16,6 +18,9 @@ class Settings(BaseModel):
     # General Settings
     basic_config: BasicConfig = BasicConfig.get_default_config()
     
+    # Transfer Settings
+    transfer_config: TransferConfig = TransferConfig.get_default_config()
+    
     # TMDB Settings
     tmdb_api_key: Optional[str] = None
     tmdb_rate_limit: Optional[int] = 50
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Dict
+from ..services.bucket_service import BucketService
+from ..services.container import services
+
+router = APIRouter(prefix="/buckets", tags=["buckets"])
+get_bucket_service = services.provider(BucketService)
+
+@router.get("")
+async def get_buckets(bucket_service: BucketService = Depends(get_bucket_service)) -> List[str]:
+    """List the initial-letter buckets"""
+    return bucket_service.get_buckets()
+
+@router.post("/classify")
+async def classify_titles(titles: List[str], bucket_service: BucketService = Depends(get_bucket_service)) -> Dict[str, str]:
+    """Map each title to its initial-letter bucket"""
+    return bucket_service.classify(titles)
+
+@router.get("/directory")
+async def group_directory(directory: str, bucket_service: BucketService = Depends(get_bucket_service)) -> Dict[str, List[str]]:
+    """Group the entries of a directory by initial-letter bucket"""
+    try:
+        groups = await bucket_service.group_directory(directory)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if groups is None:
+        raise HTTPException(status_code=404, detail="Directory not found")
+    return groups
\ No newline at end of file
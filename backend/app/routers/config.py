@@ -1,10 +1,11 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
 from typing import List, Dict, Optional
 from pydantic import BaseModel
-from ..core.config import config_manager, settings
+from ..core.config import config_manager
 from ..models.settings import Settings
 from ..models.config import LLMConfig, TMDBConfig, MediaConfig, BasicConfig, MediaLibrary
 from ..services.llm_service import LLMService
+from ..services.container import services
 
 router = APIRouter()
 
@@ -15,32 +16,36 @@ class ConfigUpdate(BaseModel):
     basic_config: Optional[BasicConfig] = None
 
 @router.get("/", response_model=Settings)
-async def get_config():
-    """Get current configuration"""
+async def get_config(response: Response):
+    """Get current configuration; the X-Config-Version header carries its version"""
+    settings = config_manager.get_settings()
+    response.headers["X-Config-Version"] = str(config_manager.version)
     return settings
 
 @router.post("/", response_model=Settings)
-async def update_config(config: ConfigUpdate):
-    """Update configuration"""
+async def update_config(config: ConfigUpdate, response: Response):
+    """
+    Update configuration
+    
+    Takes effect without a restart: services built from the changed sections
+    (TMDB and LLM clients, rate limiters, the IO pool) are rebuilt on next use.
+    """
     try:
-        # Update LLM config if provided
-        if config.llm_config:
-            settings.llm_config = config.llm_config
+        # Replace only the sections provided
+        updates = {
+            name: section
+            for name, section in (
+                ("llm_config", config.llm_config),
+                ("tmdb_config", config.tmdb_config),
+                ("media_config", config.media_config),
+                ("basic_config", config.basic_config)
+            )
+            if section
+        }
         
-        # Update TMDB config if provided
-        if config.tmdb_config:
-            settings.tmdb_config = config.tmdb_config
-            
-        # Update media config if provided
-        if config.media_config:
-            settings.media_config = config.media_config
-            
-        # Update basic config if provided
-        if config.basic_config:
-            settings.basic_config = config.basic_config
-            
-        # Save the updated settings
-        config_manager.save_settings(settings)
+        # Save the updated settings as a new snapshot
+        settings = config_manager.update_settings(**updates)
+        response.headers["X-Config-Version"] = str(config_manager.version)
         
         return settings
     except Exception as e:
@@ -64,7 +69,7 @@ async def test_connection():
     """Test API connections"""
     try:
         # Test LLM connection
-        llm_service = LLMService(config_manager)
+        llm_service = services.get(LLMService)
         await llm_service.chat_completion([
             {"role": "system", "content": "You are a helpful assistant."},
             {"role": "user", "content": "Test connection"}
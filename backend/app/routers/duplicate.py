@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Dict
+from ..services.duplicate_service import DuplicateService
+from ..services.container import services
+from ..core.responses import FastJSONResponse
+
+router = APIRouter(prefix="/duplicates", tags=["duplicates"])
+get_duplicate_service = services.provider(DuplicateService)
+
+@router.get("", response_class=FastJSONResponse)
+async def find_duplicates(duplicate_service: DuplicateService = Depends(get_duplicate_service)) -> FastJSONResponse:
+    """Find duplicate media files across all configured libraries"""
+    try:
+        return FastJSONResponse(await duplicate_service.find_duplicates())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/remove")
+async def remove_duplicates(paths: List[str], duplicate_service: DuplicateService = Depends(get_duplicate_service)) -> Dict:
+    """Delete duplicate files in one batch and prune directories left empty"""
+    try:
+        return await duplicate_service.remove_files(paths)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,26 +1,33 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict
+from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Dict, Optional
 from ..services.file_service import FileService
-from ..core.config import config_manager
+from ..services.container import services
+from ..core.projection import parse_fields, project, FILE_LIST_FIELDS
+from ..core.responses import FastJSONResponse
 
 router = APIRouter(prefix="/files", tags=["files"])
-file_service = FileService(config_manager)
+get_file_service = services.provider(FileService)
 
 @router.get("/extensions")
-async def get_supported_extensions() -> List[str]:
+async def get_supported_extensions(file_service: FileService = Depends(get_file_service)) -> List[str]:
     """Get list of supported media file extensions"""
     return file_service.get_supported_extensions()
 
 @router.get("/libraries")
-async def get_media_libraries() -> List[Dict]:
+async def get_media_libraries(file_service: FileService = Depends(get_file_service)) -> List[Dict]:
     """Get list of configured media libraries"""
     libraries = file_service.get_media_libraries()
     return [library.dict() for library in libraries]
 
-@router.get("/scan")
-async def scan_directory(directory: str) -> List[Dict]:
-    """Scan a directory for media files"""
+@router.get("/scan", response_class=FastJSONResponse)
+async def scan_directory(directory: str, fields: Optional[str] = None, file_service: FileService = Depends(get_file_service)) -> FastJSONResponse:
+    """Scan a directory for media files
+    
+    `fields` selects the returned attributes as comma-separated dotted paths;
+    "*" returns complete objects.
+    """
     try:
-        return await file_service.scan_directory(directory)
+        results = await file_service.scan_directory(directory)
+        return FastJSONResponse(project(results, parse_fields(fields, FILE_LIST_FIELDS)))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
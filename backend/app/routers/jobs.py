@@ -0,0 +1,119 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+from typing import Any, AsyncIterator, Dict, List, Optional
+from ..core.responses import dumps
+from ..services.job_service import JobService
+from ..services.container import services
+
+router = APIRouter()
+get_job_service = services.provider(JobService)
+
+class JobRequest(BaseModel):
+    kind: str  # scan, identify, rename 或 transfer
+    params: Dict[str, Any] = {}
+
+async def _event_stream(job_service: JobService, job_id: Optional[str] = None) -> AsyncIterator[bytes]:
+    """Format job snapshots as server-sent events"""
+    async for snapshot in job_service.queue.events(job_id):
+        if snapshot is None:
+            yield b": keepalive\n\n"
+        else:
+            yield b"event: job\ndata: " + dumps(snapshot) + b"\n\n"
+
+def _event_response(job_service: JobService, job_id: Optional[str] = None) -> StreamingResponse:
+    return StreamingResponse(
+        _event_stream(job_service, job_id),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("")
+async def submit_job(request: JobRequest, job_service: JobService = Depends(get_job_service)) -> Dict:
+    """Queue a job and return it immediately; follow it with GET or the event stream"""
+    try:
+        return await job_service.queue.submit(request.kind, request.params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("")
+async def list_jobs(state: Optional[str] = None, kind: Optional[str] = None, job_service: JobService = Depends(get_job_service)) -> List[Dict]:
+    """List jobs with their stage progress, newest first"""
+    return job_service.queue.list_jobs(state, kind)
+
+@router.get("/kinds")
+async def list_job_kinds(job_service: JobService = Depends(get_job_service)) -> List[str]:
+    """Kinds of jobs that can be submitted"""
+    return job_service.queue.kinds
+
+@router.get("/events")
+async def stream_all_job_events(job_service: JobService = Depends(get_job_service)) -> StreamingResponse:
+    """Server-sent events with a snapshot of every job, then one per change"""
+    return _event_response(job_service)
+
+@router.get("/{job_id}")
+async def get_job(job_id: str, params: bool = False, job_service: JobService = Depends(get_job_service)) -> Dict:
+    """Get the state and stage progress of a job, optionally with its parameters"""
+    job = await job_service.queue.get_job(job_id, include_params=params)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/{job_id}/result")
+async def get_job_result(job_id: str, job_service: JobService = Depends(get_job_service)) -> Response:
+    """Get the result of a succeeded job"""
+    result = await job_service.queue.result(job_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Job result not found")
+    return Response(content=result, media_type="application/json")
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: str, job_service: JobService = Depends(get_job_service)) -> StreamingResponse:
+    """Server-sent events for one job, ending when it finishes"""
+    if not await job_service.queue.get_job(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _event_response(job_service, job_id)
+
+@router.post("/{job_id}/cancel")
+async def cancel_job(job_id: str, job_service: JobService = Depends(get_job_service)) -> Dict:
+    """Cancel a queued or running job"""
+    job = await job_service.queue.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("/{job_id}/resume")
+async def resume_job(job_id: str, job_service: JobService = Depends(get_job_service)) -> Dict:
+    """Queue a failed, cancelled or interrupted job again, continuing where it stopped"""
+    try:
+        job = await job_service.queue.resume(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("/{job_id}/retry")
+async def retry_job(job_id: str, job_service: JobService = Depends(get_job_service)) -> Dict:
+    """Queue a failed, cancelled or interrupted job again from the start"""
+    try:
+        job = await job_service.queue.retry(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.delete("/{job_id}")
+async def delete_job(job_id: str, job_service: JobService = Depends(get_job_service)) -> Dict:
+    """Forget a job that is no longer queued or running"""
+    try:
+        job = await job_service.queue.delete(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
\ No newline at end of file
@@ -2,6 +2,10 @@ from fastapi import APIRouter
 from .file import router as file_router
 from .tv_show import router as tv_router
 from .movie import router as movie_router
+from .duplicate import router as duplicate_router
+from .rename import router as rename_router
+from .transfer import router as transfer_router
+from .bucket import router as bucket_router
 
 # This is the media router that aggregates all media-related routers
 router = APIRouter()
@@ -9,4 +13,8 @@ router = APIRouter()
 # Include routers with their specific prefixes
 router.include_router(file_router)
 router.include_router(tv_router)
-router.include_router(movie_router) 
\ No newline at end of file
+router.include_router(movie_router)
+router.include_router(duplicate_router)
+router.include_router(rename_router)
+router.include_router(transfer_router)
+router.include_router(bucket_router) 
\ No newline at end of file
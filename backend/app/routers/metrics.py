@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from ..core import metrics
+
+router = APIRouter()
+
+@router.get("", response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+    """Upstream, rate limiter, cache, filesystem and scan metrics in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
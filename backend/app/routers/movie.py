@@ -1,21 +1,29 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict
+from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Dict, Optional
 from ..services.movie_service import MovieService
-from ..core.config import config_manager
+from ..services.container import services
+from ..models.media.movie_model import Movie
+from ..core.projection import parse_fields, project, MOVIE_LIST_FIELDS
+from ..core.responses import FastJSONResponse
 
 router = APIRouter(prefix="/movies", tags=["movies"])
-movie_service = MovieService(config_manager)
+get_movie_service = services.provider(MovieService)
 
-@router.get("/scan")
-async def scan_movies(directory: str) -> List[Dict]:
-    """Scan a directory for movie files"""
+@router.get("/scan", response_class=FastJSONResponse)
+async def scan_movies(directory: str, fields: Optional[str] = None, movie_service: MovieService = Depends(get_movie_service)) -> FastJSONResponse:
+    """Scan a directory for movie files
+    
+    `fields` selects the returned attributes as comma-separated dotted paths
+    (e.g. "title,movie_info.overview"); "*" returns complete objects.
+    """
     try:
-        return await movie_service.scan_directory(directory)
+        movies = await movie_service.scan_directory(directory)
+        return FastJSONResponse(project(movies, parse_fields(fields, MOVIE_LIST_FIELDS)))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/identify")
-async def identify_movie(file_path: str) -> Dict:
+async def identify_movie(file_path: str, movie_service: MovieService = Depends(get_movie_service)) -> Dict:
     """Identify a movie file using TMDB"""
     try:
         result = await movie_service.identify_media(file_path)
@@ -23,4 +31,28 @@ async def identify_movie(file_path: str) -> Dict:
             raise HTTPException(status_code=404, detail="Movie not found")
         return result
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/rename")
+async def rename_movies(movies: List[Movie], movie_service: MovieService = Depends(get_movie_service)) -> Dict:
+    """Rename selected movie files as one journaled batch"""
+    try:
+        return await movie_service.rename_movies(movies)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/rename/preview")
+async def preview_movie_renames(movies: List[Movie], movie_service: MovieService = Depends(get_movie_service)) -> Dict:
+    """Dry-run the rename of selected movie files and report collisions"""
+    try:
+        return await movie_service.preview_renames(movies)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/rename/plan", response_class=FastJSONResponse)
+async def plan_movie_library(directory: str, use_llm: bool = False, movie_service: MovieService = Depends(get_movie_service)) -> FastJSONResponse:
+    """Scan, identify and dry-run the renames of every movie under a directory in one pipelined pass"""
+    try:
+        return FastJSONResponse(await movie_service.plan_library(directory, use_llm))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
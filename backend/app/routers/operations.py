@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+from typing import List, Dict, Optional
+from ..core.oplog import oplog
+
+router = APIRouter()
+
+@router.get("")
+async def query_operations(
+    operation: Optional[str] = None,
+    status: Optional[str] = None,
+    since_id: int = 0,
+    limit: int = 100
+) -> List[Dict]:
+    """Recent file operations, newest first
+
+    Pass the highest id already seen as `since_id` to poll for new entries.
+    """
+    return oplog.query(operation, status, since_id, min(max(limit, 1), 1000))
+
+@router.get("/stats")
+async def operation_stats() -> Dict[str, Dict[str, int]]:
+    """Counts of recent operations per operation and status"""
+    return oplog.stats()
\ No newline at end of file
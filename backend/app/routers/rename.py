@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Dict
+from ..services.rename_service import RenameService
+from ..services.container import services
+
+router = APIRouter(prefix="/renames", tags=["renames"])
+get_rename_service = services.provider(RenameService)
+
+@router.get("")
+async def list_rename_batches(rename_service: RenameService = Depends(get_rename_service)) -> List[Dict]:
+    """List journaled rename batches, newest first"""
+    try:
+        return await rename_service.list_batches()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{batch_id}")
+async def get_rename_batch(batch_id: str, rename_service: RenameService = Depends(get_rename_service)) -> Dict:
+    """Get the state and results of a rename batch"""
+    batch = await rename_service.get_batch(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Rename batch not found")
+    return batch
+
+@router.post("/{batch_id}/resume")
+async def resume_rename_batch(batch_id: str, rename_service: RenameService = Depends(get_rename_service)) -> Dict:
+    """Finish applying an interrupted rename batch"""
+    batch = await rename_service.resume(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Rename batch not found")
+    return batch
+
+@router.post("/{batch_id}/undo")
+async def undo_rename_batch(batch_id: str, rename_service: RenameService = Depends(get_rename_service)) -> Dict:
+    """Revert a rename batch"""
+    batch = await rename_service.undo(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Rename batch not found")
+    return batch
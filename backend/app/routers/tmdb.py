@@ -1,13 +1,15 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from typing import List, Dict, Optional
 from ..services.tmdb_service import TMDBService
-from ..core.config import config_manager
+from ..services.container import services
+from ..core.projection import parse_fields, project
+from ..core.responses import FastJSONResponse
 
 router = APIRouter()
-tmdb_service = TMDBService(config_manager)
+get_tmdb_service = services.provider(TMDBService)
 
 @router.get("/search/movie")
-async def search_movie(query: str) -> List[Dict]:
+async def search_movie(query: str, tmdb_service: TMDBService = Depends(get_tmdb_service)) -> List[Dict]:
     """Search for movies using TMDB API"""
     try:
         return await tmdb_service.search_movie(query)
@@ -15,59 +17,59 @@ async def search_movie(query: str) -> List[Dict]:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/search/tv")
-async def search_tv_show(query: str) -> List[Dict]:
+async def search_tv_show(query: str, tmdb_service: TMDBService = Depends(get_tmdb_service)) -> List[Dict]:
     """Search for TV shows using TMDB API"""
     try:
         return await tmdb_service.search_tv_show(query)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/movie/{movie_id}")
-async def get_movie(movie_id: str) -> Dict:
+@router.get("/movie/{movie_id}", response_class=FastJSONResponse)
+async def get_movie(movie_id: str, fields: Optional[str] = None, tmdb_service: TMDBService = Depends(get_tmdb_service)) -> FastJSONResponse:
     """Get movie details from TMDB"""
     try:
         movie = await tmdb_service.get_movie(movie_id)
         if not movie:
             raise HTTPException(status_code=404, detail="Movie not found")
-        return movie
+        return FastJSONResponse(project(movie, parse_fields(fields)))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/tv/{show_id}")
-async def get_tv_show(show_id: str) -> Dict:
+@router.get("/tv/{show_id}", response_class=FastJSONResponse)
+async def get_tv_show(show_id: str, fields: Optional[str] = None, tmdb_service: TMDBService = Depends(get_tmdb_service)) -> FastJSONResponse:
     """Get TV show details from TMDB"""
     try:
         show = await tmdb_service.get_tv_show(show_id)
         if not show:
             raise HTTPException(status_code=404, detail="TV show not found")
-        return show
+        return FastJSONResponse(project(show, parse_fields(fields)))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/tv/{show_id}/season/{season_number}")
-async def get_tv_season(show_id: str, season_number: int) -> Dict:
+@router.get("/tv/{show_id}/season/{season_number}", response_class=FastJSONResponse)
+async def get_tv_season(show_id: str, season_number: int, fields: Optional[str] = None, tmdb_service: TMDBService = Depends(get_tmdb_service)) -> FastJSONResponse:
     """Get TV show season details from TMDB"""
     try:
         season = await tmdb_service.get_tv_season(show_id, season_number)
         if not season:
             raise HTTPException(status_code=404, detail="Season not found")
-        return season
+        return FastJSONResponse(project(season, parse_fields(fields)))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/tv/{show_id}/season/{season_number}/episode/{episode_number}")
-async def get_tv_episode(show_id: str, season_number: int, episode_number: int) -> Dict:
+@router.get("/tv/{show_id}/season/{season_number}/episode/{episode_number}", response_class=FastJSONResponse)
+async def get_tv_episode(show_id: str, season_number: int, episode_number: int, fields: Optional[str] = None, tmdb_service: TMDBService = Depends(get_tmdb_service)) -> FastJSONResponse:
     """Get TV show episode details from TMDB"""
     try:
         episode = await tmdb_service.get_tv_episode(show_id, season_number, episode_number)
         if not episode:
             raise HTTPException(status_code=404, detail="Episode not found")
-        return episode
+        return FastJSONResponse(project(episode, parse_fields(fields)))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/identify")
-async def identify_media(name: str, media_type: str = "auto") -> Dict:
+async def identify_media(name: str, media_type: str = "auto", tmdb_service: TMDBService = Depends(get_tmdb_service)) -> Dict:
     """Identify media from name using TMDB"""
     try:
         result = await tmdb_service.identify_media_from_name(name, media_type)
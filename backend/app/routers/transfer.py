@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from typing import List, Dict, Optional
+from ..services.transfer_service import TransferService
+from ..services.container import services
+
+router = APIRouter(prefix="/transfers", tags=["transfers"])
+get_transfer_service = services.provider(TransferService)
+
+class TransferRequest(BaseModel):
+    source_root: str
+    target_root: str
+    content_type: str  # 'movie' 或 'tv_series'
+    organize_by_initial: bool = False
+    mode: Optional[str] = None  # move, hardlink, reflink 或 copy; 默认使用配置
+
+@router.post("")
+async def start_transfer(request: TransferRequest, transfer_service: TransferService = Depends(get_transfer_service)) -> Dict:
+    """Start moving every title of a source directory into a target directory"""
+    try:
+        return await transfer_service.start_transfer(
+            request.source_root,
+            request.target_root,
+            request.content_type,
+            request.organize_by_initial,
+            request.mode
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("")
+async def list_transfers(transfer_service: TransferService = Depends(get_transfer_service)) -> List[Dict]:
+    """List transfers with their progress, newest first"""
+    return transfer_service.list_transfers()
+
+@router.get("/{transfer_id}")
+async def get_transfer(transfer_id: str, items: bool = False, transfer_service: TransferService = Depends(get_transfer_service)) -> Dict:
+    """Get the progress of a transfer, optionally with per-item results"""
+    transfer = transfer_service.get_transfer(transfer_id, include_items=items)
+    if not transfer:
+        raise HTTPException(status_code=404, detail="Transfer not found")
+    return transfer
+
+@router.post("/{transfer_id}/cancel")
+async def cancel_transfer(transfer_id: str, transfer_service: TransferService = Depends(get_transfer_service)) -> Dict:
+    """Stop a running transfer after the moves in progress"""
+    transfer = await transfer_service.cancel_transfer(transfer_id)
+    if not transfer:
+        raise HTTPException(status_code=404, detail="Transfer not found")
+    return transfer
\ No newline at end of file
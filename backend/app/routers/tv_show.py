@@ -1,21 +1,41 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Optional
 from ..services.tv_show_service import TVShowService
-from ..core.config import config_manager
+from ..services.container import services
+from ..models.media.tv_show_model import TVShow
+from ..core.projection import parse_fields, project, TV_SHOW_LIST_FIELDS
+from ..core.responses import FastJSONResponse, dumps
 
 router = APIRouter(prefix="/tv", tags=["tv"])
-tv_service = TVShowService(config_manager)
+get_tv_service = services.provider(TVShowService)
 
-@router.get("/scan")
-async def scan_tv_shows(directory: str) -> List[Dict]:
-    """Scan a directory for TV show files"""
+@router.get("/scan", response_class=FastJSONResponse)
+async def scan_tv_shows(directory: str, fields: Optional[str] = None, tv_service: TVShowService = Depends(get_tv_service)) -> FastJSONResponse:
+    """Scan a directory for TV show files
+    
+    `fields` selects the returned attributes as comma-separated dotted paths
+    (e.g. "title,seasons.season_info.overview"); "*" returns complete objects.
+    """
     try:
-        return await tv_service.scan_directory(directory)
+        show = await tv_service.scan_directory(directory)
+        return FastJSONResponse(project(show, parse_fields(fields, TV_SHOW_LIST_FIELDS)))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/library/scan")
+async def scan_tv_library(directory: str, fields: Optional[str] = None, tv_service: TVShowService = Depends(get_tv_service)) -> StreamingResponse:
+    """Scan every show under a library root, streaming one JSON line per show as it completes"""
+    projection = parse_fields(fields, TV_SHOW_LIST_FIELDS)
+    
+    async def show_lines():
+        async for show in tv_service.scan_library(directory):
+            yield dumps(project(show, projection)) + b"\n"
+    
+    return StreamingResponse(show_lines(), media_type="application/x-ndjson")
+
 @router.get("/identify")
-async def identify_tv_show(file_path: str) -> Dict:
+async def identify_tv_show(file_path: str, tv_service: TVShowService = Depends(get_tv_service)) -> Dict:
     """Identify a TV show file using TMDB"""
     try:
         result = await tv_service.identify_media(file_path)
@@ -23,4 +43,20 @@ async def identify_tv_show(file_path: str) -> Dict:
             raise HTTPException(status_code=404, detail="TV show not found")
         return result
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/rename")
+async def rename_tv_show(show: TVShow, tv_service: TVShowService = Depends(get_tv_service)) -> Dict:
+    """Rename selected episode files as one journaled batch"""
+    try:
+        return await tv_service.rename_show(show)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/rename/preview")
+async def preview_tv_show_renames(show: TVShow, tv_service: TVShowService = Depends(get_tv_service)) -> Dict:
+    """Dry-run the rename of selected episode files and report collisions"""
+    try:
+        return await tv_service.preview_renames(show)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
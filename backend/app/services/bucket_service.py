@@ -0,0 +1,45 @@
+"""Service for sorting titles into initial-letter buckets"""
+import logging
+import os
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+from ..core.executor import run_io
+from ..core.initials import BUCKETS, initial_bucket
+from ..core.io_scheduler import throttled_listdir
+
+# Bucket reported for titles without a letter or digit to sort by
+UNSORTED_BUCKET = "#"
+
+class BucketService:
+    """
+    Classifies titles into the 0-9 / A-Z folders used to organize libraries
+
+    Classification is a table lookup per title (see core.initials), so whole
+    libraries can be bucketed in a single request.
+    """
+
+    def __init__(self, config_manager):
+        self.config_manager = config_manager
+        self.logger = logging.getLogger("bucket_service")
+
+    def get_buckets(self) -> List[str]:
+        """All buckets in display order"""
+        return BUCKETS + [UNSORTED_BUCKET]
+
+    def classify(self, titles: Iterable[str]) -> Dict[str, str]:
+        """Map each title to its bucket"""
+        return {title: initial_bucket(title) or UNSORTED_BUCKET for title in titles}
+
+    def group(self, titles: Iterable[str]) -> Dict[str, List[str]]:
+        """Group titles by bucket, in bucket order"""
+        groups = defaultdict(list)
+        for title in titles:
+            groups[initial_bucket(title) or UNSORTED_BUCKET].append(title)
+        return {bucket: groups[bucket] for bucket in self.get_buckets() if bucket in groups}
+
+    async def group_directory(self, directory: str) -> Optional[Dict[str, List[str]]]:
+        """Group the entries of a directory by bucket"""
+        if not await run_io(os.path.isdir, directory):
+            return None
+        entries = await run_io(throttled_listdir, directory)
+        return self.group(sorted(entries))
\ No newline at end of file
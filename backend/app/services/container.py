@@ -0,0 +1,59 @@
+"""Shared service instances used by the routers"""
+from ..core.config import config_manager
+from ..core.container import ServiceContainer
+from .bucket_service import BucketService
+from .duplicate_service import DuplicateService
+from .file_service import FileService
+from .job_service import JobService
+from .llm_service import LLMService
+from .movie_service import MovieService
+from .rename_service import RenameService
+from .tmdb_service import TMDBService
+from .transfer_service import TransferService
+from .tv_show_service import TVShowService
+
+services = ServiceContainer(config_manager)
+
+# Each service is rebuilt when a settings section it is built from changes,
+# and with it the services holding it
+services.register(TMDBService, sections=["tmdb_config", "basic_config"])
+services.register(LLMService, sections=["llm_config", "basic_config"])
+services.register(RenameService, sections=["media_config"])
+services.register(DuplicateService, sections=["media_config"])
+services.register(BucketService, sections=[])
+services.register(
+    MovieService,
+    lambda container: MovieService(
+        container.config_manager,
+        tmdb_service=container.get(TMDBService),
+        rename_service=container.get(RenameService),
+        llm_provider=lambda: container.get(LLMService)
+    ),
+    sections=["media_config", "tmdb_config"]
+)
+services.register(
+    TVShowService,
+    lambda container: TVShowService(
+        container.config_manager,
+        tmdb_service=container.get(TMDBService),
+        rename_service=container.get(RenameService)
+    ),
+    sections=["media_config", "tmdb_config"]
+)
+services.register(
+    FileService,
+    lambda container: FileService(
+        container.config_manager,
+        movie_service=container.get(MovieService),
+        tv_service=container.get(TVShowService)
+    ),
+    sections=["media_config"]
+)
+
+# Stateful: transfers and jobs in progress must survive settings changes
+services.register(TransferService, reloadable=False)
+services.register(
+    JobService,
+    lambda container: JobService(container.config_manager, container),
+    reloadable=False
+)
\ No newline at end of file
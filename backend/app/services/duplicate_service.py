@@ -0,0 +1,212 @@
+"""Service for finding duplicate media files across libraries"""
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+from ..core.executor import run_io, run_io_cancellable, io_executor
+from ..core.fingerprint import try_full_hash
+from ..core.futils import safe_remove_files
+from ..core.io_scheduler import configure_worker, io_scheduler, throttle
+from ..core.scan_index import ScanIndex, get_scan_index
+from ..core.tasks import gather_bounded
+from ..models.config import MediaConfig
+
+class MediaFileEntry:
+    """A media file found while walking the libraries"""
+    __slots__ = ("path", "library_index", "size", "mtime", "fingerprint", "full_hash", "title_key")
+
+    def __init__(self, path: str, library_index: int, size: int, mtime: float):
+        self.path = path
+        self.library_index = library_index
+        self.size = size
+        self.mtime = mtime
+        self.fingerprint: Optional[str] = None
+        self.full_hash: Optional[str] = None
+        self.title_key: Optional[str] = None
+
+    def to_dict(self, libraries) -> Dict:
+        return {
+            "path": self.path,
+            "library": libraries[self.library_index].path,
+            "size": self.size,
+            "modified": self.mtime
+        }
+
+class DuplicateService:
+    """
+    Finds duplicate media files across the configured libraries
+
+    Candidates are narrowed in stages so that expensive work only touches the
+    files that survive the cheap checks:
+    1. group every file by size (from the walk, no extra I/O)
+    2. fingerprint size collisions (first/last 64 KB, cached in the scan index)
+    3. confirm fingerprint collisions with a full hash in worker processes
+
+    Separately, files whose fingerprints are indexed with the same TMDB match
+    are grouped as copies of one title, e.g. the same movie in two qualities.
+    """
+
+    def __init__(self, config_manager, hash_workers: Optional[int] = None):
+        self.config_manager = config_manager
+        self.media_config: MediaConfig = config_manager.settings.media_config
+        self.scan_index = get_scan_index(self.media_config.scan_index_path)
+        self.hash_workers = hash_workers or os.cpu_count() or 1
+        self.logger = logging.getLogger("duplicate_service")
+
+    async def find_duplicates(self) -> List[Dict]:
+        """Find exact duplicates and same-title copies across all libraries"""
+        libraries = self.media_config.libraries
+        entries: List[MediaFileEntry] = []
+        for library_index, library in enumerate(libraries):
+            entries.extend(await run_io_cancellable(self._walk_library, library.path, library_index))
+
+        exact_groups = await self._find_exact_duplicates(entries)
+        title_groups = await self._find_same_title_copies(entries)
+
+        return [
+            self._describe_group("exact", key, group, self._exact_keeper)
+            for key, group in exact_groups.items()
+        ] + [
+            self._describe_group("same_title", key, group, self._title_keeper)
+            for key, group in title_groups.items()
+        ]
+
+    async def remove_files(self, paths: List[str]) -> Dict:
+        """
+        Delete duplicate files and prune directories left empty
+
+        Only files inside the configured libraries are accepted; the library
+        roots themselves are never removed.
+        """
+        roots = [os.path.normpath(library.path) for library in self.media_config.libraries]
+        outside = [
+            path for path in paths
+            if not any(os.path.normpath(path).startswith(root + os.sep) for root in roots)
+        ]
+        if outside:
+            raise ValueError(f"Not inside a media library: {', '.join(outside)}")
+        return await run_io(safe_remove_files, paths, True, roots)
+
+    def _walk_library(self, cancel_event, library_path: str, library_index: int) -> List[MediaFileEntry]:
+        """Collect media files of a library (blocking, run on the IO executor)"""
+        extensions = tuple(self.media_config.supported_extensions)
+        entries = []
+        for root, _, files in os.walk(library_path):
+            if cancel_event.is_set():
+                break
+            throttle(root, ops=1, cancel_event=cancel_event)
+            for file in files:
+                if not file.lower().endswith(extensions):
+                    continue
+                path = os.path.join(root, file)
+                try:
+                    file_stat = os.stat(path)
+                except OSError as e:
+                    self.logger.warning(f"Failed to stat {path}: {e}")
+                    continue
+                entries.append(MediaFileEntry(path, library_index, file_stat.st_size, file_stat.st_mtime))
+        return entries
+
+    async def _find_exact_duplicates(self, entries: List[MediaFileEntry]) -> Dict[str, List[MediaFileEntry]]:
+        """Narrow by size, then fingerprint, then full hash"""
+        # Stage 1: size
+        candidates = self._colliding(entries, lambda entry: entry.size if entry.size else None)
+
+        # Stage 2: partial-content fingerprint
+        async def fingerprint(entry: MediaFileEntry) -> None:
+            entry.fingerprint = await run_io(self.scan_index.fingerprint, entry.path, entry.size, entry.mtime)
+        await gather_bounded(fingerprint, candidates, io_executor.max_workers)
+        candidates = self._colliding(candidates, lambda entry: entry.fingerprint)
+
+        # Stage 3: full hash, only for the few remaining collisions
+        await self._full_hash(candidates)
+        groups = defaultdict(list)
+        for entry in candidates:
+            if entry.full_hash:
+                groups[entry.full_hash].append(entry)
+        return {key: group for key, group in groups.items() if len(group) > 1}
+
+    def _colliding(self, entries: List[MediaFileEntry], key) -> List[MediaFileEntry]:
+        """Keep only entries whose key is shared with at least one other entry"""
+        groups = defaultdict(list)
+        for entry in entries:
+            value = key(entry)
+            if value is not None:
+                groups[value].append(entry)
+        return [entry for group in groups.values() if len(group) > 1 for entry in group]
+
+    async def _full_hash(self, entries: List[MediaFileEntry]) -> None:
+        """Hash complete files in parallel worker processes"""
+        if not entries:
+            return
+        loop = asyncio.get_running_loop()
+        workers = min(self.hash_workers, len(entries))
+        # Each worker process throttles its share of the configured I/O limits
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=configure_worker,
+            initargs=(io_scheduler.share(workers),)
+        )
+        try:
+            hashes = await asyncio.gather(*(
+                loop.run_in_executor(pool, try_full_hash, entry.path)
+                for entry in entries
+            ))
+        finally:
+            # Never block the event loop waiting for workers
+            pool.shutdown(wait=False, cancel_futures=True)
+        for entry, full_hash in zip(entries, hashes):
+            entry.full_hash = full_hash
+
+    async def _find_same_title_copies(self, entries: List[MediaFileEntry]) -> Dict[str, List[MediaFileEntry]]:
+        """Group files whose indexed TMDB match is the same title"""
+        await run_io(self._assign_title_keys, entries)
+        groups = defaultdict(list)
+        for entry in entries:
+            if entry.title_key:
+                groups[entry.title_key].append(entry)
+        # Identical copies are already reported as exact duplicates
+        return {
+            key: group for key, group in groups.items()
+            if len({entry.fingerprint for entry in group}) > 1
+        }
+
+    def _assign_title_keys(self, entries: List[MediaFileEntry]) -> None:
+        """Look up indexed TMDB matches without hashing anything new (blocking)"""
+        for entry in entries:
+            fingerprint = entry.fingerprint or self.scan_index.cached_fingerprint(entry.path, entry.size, entry.mtime)
+            if not fingerprint:
+                continue
+            entry.fingerprint = fingerprint
+            match = self.scan_index.get_match(fingerprint)
+            if not match:
+                continue
+            if match["media_type"] == "movie":
+                entry.title_key = ScanIndex.movie_key(match["tmdb_id"])
+            elif match["episode_number"] is not None:
+                entry.title_key = ScanIndex.episode_key(
+                    match["tmdb_id"],
+                    match["season_number"],
+                    match["episode_number"]
+                )
+
+    def _exact_keeper(self, entry: MediaFileEntry):
+        """Identical files: keep the copy in the first library, then the oldest"""
+        return (entry.library_index, entry.mtime, len(entry.path))
+
+    def _title_keeper(self, entry: MediaFileEntry):
+        """Copies of one title: keep the largest (usually best quality), then the newest"""
+        return (-entry.size, -entry.mtime)
+
+    def _describe_group(self, kind: str, key: str, group: List[MediaFileEntry], keeper_key) -> Dict:
+        """Build the result for a duplicate group"""
+        keeper = min(group, key=keeper_key)
+        return {
+            "kind": kind,
+            "key": key,
+            "keeper": keeper.path,
+            "reclaimable_bytes": sum(entry.size for entry in group if entry is not keeper),
+            "files": [entry.to_dict(self.media_config.libraries) for entry in group]
+        }
@@ -1,16 +1,25 @@
 from typing import List, Dict, Optional
 import os
+import time
 from ..core.config import config_manager
+from ..core.executor import run_io, run_io_cancellable
+from ..core.io_scheduler import throttle, throttled_listdir
+from ..core.metrics import SCAN_FILES, SCAN_SECONDS
 from ..models.config import MediaConfig, MediaLibrary
 from ..services.movie_service import MovieService
 from ..services.tv_show_service import TVShowService
 
 class FileService:
-    def __init__(self, config_manager):
+    def __init__(
+        self,
+        config_manager,
+        movie_service: Optional[MovieService] = None,
+        tv_service: Optional[TVShowService] = None
+    ):
         self.config_manager = config_manager
         self.media_config: MediaConfig = config_manager.settings.media_config
-        self.movie_service = MovieService(config_manager)
-        self.tv_service = TVShowService(config_manager)
+        self.movie_service = movie_service or MovieService(config_manager)
+        self.tv_service = tv_service or TVShowService(config_manager)
 
     def get_supported_extensions(self) -> List[str]:
         """Get list of supported media file extensions"""
@@ -33,27 +42,39 @@ class FileService:
         # by checking the directory name and structure
         if self._is_movie_directory(directory):
             # Use movie service to scan
-            movies = await self.movie_service.scan_directory(directory)
-            for movie in movies:
-                results.append(movie.dict())
-        elif self._is_tv_show_directory(directory):
+            results = await self.movie_service.scan_directory(directory)
+        elif await run_io(self._is_tv_show_directory, directory):
             # Use TV show service to scan
             tv_show = await self.tv_service.scan_directory(directory)
             results.append(tv_show.dict())
         else:
             # Generic scan for any media files
-            for root, _, files in os.walk(directory):
-                for file in files:
-                    if self.is_supported_file(file):
-                        file_path = os.path.join(root, file)
-                        results.append({
-                            "path": file_path,
-                            "name": file,
-                            "size": os.path.getsize(file_path),
-                            "modified": os.path.getmtime(file_path)
-                        })
+            results = await run_io_cancellable(self._walk_media_files, directory)
         
         return results
+
+    def _walk_media_files(self, cancel_event, directory: str) -> List[Dict]:
+        """Walk a directory tree for supported files (blocking, run on the IO executor)"""
+        results = []
+        start = time.perf_counter()
+        for root, _, files in os.walk(directory):
+            # Stop early if the request that started the walk was cancelled
+            if cancel_event.is_set():
+                break
+            throttle(root, ops=1, cancel_event=cancel_event)
+            SCAN_FILES.inc("files", amount=len(files))
+            for file in files:
+                if self.is_supported_file(file):
+                    file_path = os.path.join(root, file)
+                    file_stat = os.stat(file_path)
+                    results.append({
+                        "path": file_path,
+                        "name": file,
+                        "size": file_stat.st_size,
+                        "modified": file_stat.st_mtime
+                    })
+        SCAN_SECONDS.observe(time.perf_counter() - start, "files")
+        return results
     
     def _is_movie_directory(self, directory: str) -> bool:
         """Check if a directory is likely a movie directory"""
@@ -67,7 +88,7 @@ class FileService:
     def _is_tv_show_directory(self, directory: str) -> bool:
         """Check if a directory is likely a TV show directory"""
         # Check for season subdirectories
-        for item in os.listdir(directory):
+        for item in throttled_listdir(directory):
             item_path = os.path.join(directory, item)
             if os.path.isdir(item_path):
                 # Check if directory name contains "season" or "s" followed by numbers
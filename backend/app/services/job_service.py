@@ -0,0 +1,183 @@
+"""Service running scans, identification, renames and transfers as background jobs"""
+import logging
+from typing import Any, Dict
+from ..core.container import ServiceContainer
+from ..core.executor import run_in_thread
+from ..core.jobs import JobContext, JobQueue, JobStore
+from ..core.responses import dumps
+from ..core.transfer import CONTENT_MOVIE, CONTENT_TV_SERIES
+from ..core.transfer_ops import TRANSFER_MODES
+from ..models.config import BasicConfig
+from ..models.media.movie_model import Movie
+from ..models.media.tv_show_model import TVShow
+from ..services.file_service import FileService
+from ..services.movie_service import MovieService
+from ..services.rename_service import RenameService
+from ..services.transfer_service import TransferService
+from ..services.tv_show_service import TVShowService
+
+# Job kinds
+JOB_SCAN = "scan"
+JOB_IDENTIFY = "identify"
+JOB_RENAME = "rename"
+JOB_PLAN = "plan"
+JOB_TRANSFER = "transfer"
+
+# Media types a scan accepts; "auto" detects movie or TV from the directory
+SCAN_MEDIA_TYPES = ("movie", "tv", "tv_library", "auto")
+
+class JobService:
+    """
+    Long-running media operations submitted as jobs
+
+    Each kind of job wraps the same service call its HTTP endpoint makes,
+    reporting per-stage progress to the job queue. A resumed job continues
+    where the last attempt stopped: scans reuse the fingerprint index, a
+    rename continues its journaled batch and a transfer skips titles that
+    were already moved.
+    """
+
+    def __init__(self, config_manager, services: ServiceContainer):
+        self.config_manager = config_manager
+        self.basic_config: BasicConfig = config_manager.settings.basic_config
+        self.services = services
+        self.queue = JobQueue(JobStore(self.basic_config.job_db_path), self.basic_config.job_workers, dumps)
+        self.queue.register(JOB_SCAN, self._scan, self._validate_scan)
+        self.queue.register(JOB_IDENTIFY, self._identify, self._validate_media)
+        self.queue.register(JOB_RENAME, self._rename, self._validate_media)
+        self.queue.register(JOB_PLAN, self._plan, self._validate_plan)
+        self.queue.register(JOB_TRANSFER, self._transfer, self._validate_transfer)
+        self.logger = logging.getLogger("job_service")
+
+    # Collaborators are looked up per job, so jobs started after a settings
+    # change use the rebuilt services while the queue keeps running
+
+    @property
+    def file_service(self) -> FileService:
+        return self.services.get(FileService)
+
+    @property
+    def movie_service(self) -> MovieService:
+        return self.services.get(MovieService)
+
+    @property
+    def tv_service(self) -> TVShowService:
+        return self.services.get(TVShowService)
+
+    @property
+    def rename_service(self) -> RenameService:
+        return self.services.get(RenameService)
+
+    @property
+    def transfer_service(self) -> TransferService:
+        return self.services.get(TransferService)
+
+    async def start(self) -> None:
+        await self.queue.start()
+
+    async def stop(self) -> None:
+        await self.queue.stop()
+
+    def _validate_scan(self, params: Dict) -> None:
+        if not params.get("directory"):
+            raise ValueError("directory is required")
+        if params.get("media_type", "auto") not in SCAN_MEDIA_TYPES:
+            raise ValueError(f"Unsupported media type: {params.get('media_type')}")
+
+    def _validate_plan(self, params: Dict) -> None:
+        if not params.get("directory"):
+            raise ValueError("directory is required")
+
+    def _validate_media(self, params: Dict) -> None:
+        """Parse the movies or show a job works on"""
+        self._parse_media(params)
+
+    def _validate_transfer(self, params: Dict) -> None:
+        for key in ("source_root", "target_root", "content_type"):
+            if not params.get(key):
+                raise ValueError(f"{key} is required")
+        if params["content_type"] not in (CONTENT_MOVIE, CONTENT_TV_SERIES):
+            raise ValueError(f"Unsupported content type: {params['content_type']}")
+        if params.get("mode") is not None and params["mode"] not in TRANSFER_MODES:
+            raise ValueError(f"Unsupported transfer mode: {params['mode']}")
+
+    def _parse_media(self, params: Dict) -> Any:
+        media_type = params.get("media_type")
+        if media_type == "movie":
+            return [Movie(**movie) for movie in params.get("movies", [])]
+        if media_type == "tv":
+            if "show" not in params:
+                raise ValueError("show is required")
+            return TVShow(**params["show"])
+        raise ValueError(f"Unsupported media type: {media_type}")
+
+    async def _scan(self, job: JobContext) -> Any:
+        directory = job.params["directory"]
+        media_type = job.params.get("media_type", "auto")
+        if media_type == "movie":
+            scan = await self.movie_service.scan_records(directory, job.stage("scan"))
+            return scan.to_dicts()
+        if media_type == "tv_library":
+            return [show async for show in self.tv_service.scan_library(directory, job.stage("scan"))]
+        job.progress("scan", 0, 1)
+        if media_type == "tv":
+            result = await self.tv_service.scan_directory(directory)
+        else:
+            result = await self.file_service.scan_directory(directory)
+        job.progress("scan", 1, 1)
+        return result
+
+    async def _identify(self, job: JobContext) -> Any:
+        media = self._parse_media(job.params)
+        if job.params["media_type"] == "movie":
+            return await self.movie_service.identify_movies(media, job.stage("identify"))
+        job.progress("identify", 0, 1)
+        show = await self.tv_service.identify_episodes(media)
+        job.progress("identify", 1, 1)
+        return show
+
+    async def _plan(self, job: JobContext) -> Dict:
+        return await self.movie_service.plan_library(
+            job.params["directory"],
+            job.params.get("use_llm", False),
+            job.progress
+        )
+
+    async def _rename(self, job: JobContext) -> Dict:
+        rename_service = self.rename_service
+        batch_id = job.checkpoint.get("batch_id")
+        if batch_id:
+            # An earlier attempt journaled the batch; finish that one
+            report = await rename_service.resume(batch_id, job.stage("rename"))
+            if report is not None:
+                return report
+
+        media = self._parse_media(job.params)
+        if job.params["media_type"] == "movie":
+            ops = self.movie_service.plan_renames(media)
+        else:
+            ops = self.tv_service.plan_renames(media)
+        return await rename_service.execute(
+            ops,
+            job.stage("rename"),
+            lambda batch_id: job.save_checkpoint(batch_id=batch_id)
+        )
+
+    async def _transfer(self, job: JobContext) -> Dict:
+        params = job.params
+        # Titles an earlier attempt moved are gone from the source and partly
+        # copied ones are completed in place, so planning again resumes
+        engine = await self.transfer_service.plan_transfer(
+            params["source_root"],
+            params["target_root"],
+            params["content_type"],
+            params.get("organize_by_initial", False),
+            params.get("mode")
+        )
+        engine.progress_callback = lambda progress: job.progress(
+            "transfer",
+            progress["done"] + progress["failed"],
+            progress["total"]
+        )
+        items = engine.items
+        return await run_in_thread(lambda cancel_event: engine.run(items, cancel_event), name="aigua-transfer-run")
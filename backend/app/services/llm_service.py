@@ -1,10 +1,12 @@
 """Service for managing LLM operations using OpenAI SDK"""
 import json
 import logging
+import time
 from typing import List, Dict, Optional, Any
-import openai
 from ..core.config import config_manager
+from ..core.metrics import LLM_BATCH_FILES, LLM_BATCH_TOKENS, LLM_REQUEST_SECONDS
 from ..core.rlimit import RateLimiter
+from ..core.shared_state import get_shared_store
 from ..models.config import LLMConfig
 from ..models.settings import Settings
 
@@ -17,24 +19,43 @@ class LLMService:
         self.llm_config: LLMConfig = self.settings.llm_config
         self.logger = logging.getLogger(f"llm.{self.llm_config.provider}")
         
-        # Configure OpenAI client
-        openai.api_key = self.llm_config.api_key
-        openai.base_url = self.llm_config.base_url
+        # The SDK is slow to import; load it with the first client, not at startup
+        import httpx
+        import openai
         
         # Set proxy if configured
-        if self.settings.general_config.proxy_url:
-            openai.proxy = f"http://{self.settings.general_config.proxy_url}"
+        http_client = None
+        if self.settings.basic_config.proxy_url:
+            http_client = httpx.AsyncClient(proxy=f"http://{self.settings.basic_config.proxy_url}")
+        
+        # The async client sends requests on the event loop, so cancelling the
+        # awaiting task (e.g. when the client disconnects) aborts the call.
+        # Retries are left to the rate limiter's backoff.
+        self.client = openai.AsyncOpenAI(
+            api_key=self.llm_config.api_key,
+            base_url=self.llm_config.base_url,
+            max_retries=0,
+            http_client=http_client
+        )
             
         # Initialize rate limiter
-        self.rate_limiter = RateLimiter(self.llm_config.rate_limit)
+        self.rate_limiter = RateLimiter(
+            self.llm_config.rate_limit,
+            store=get_shared_store(self.settings.basic_config.shared_state_path),
+            name=f"llm:{self.llm_config.provider}"
+        )
+    
+    async def aclose(self) -> None:
+        """Close the HTTP connections of the client"""
+        await self.client.close()
     
     async def _make_request(self, func, *args, **kwargs):
         """Make a rate-limited API request with exponential backoff"""
         try:
             return await self.rate_limiter.execute_with_backoff(
                 func,
-                max_retries=3,
-                base_delay=1.0,
+                3,
+                1.0,
                 *args,
                 **kwargs
             )
@@ -52,17 +73,29 @@ class LLMService:
         """Get default configuration for a specific provider"""
         return LLMConfig.get_default_configs()[provider]
     
+    async def _create_completion(self, **kwargs):
+        """One completion attempt, timed per provider"""
+        start = time.perf_counter()
+        try:
+            return await self.client.chat.completions.create(**kwargs)
+        finally:
+            LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, self.llm_config.provider)
+    
     async def chat_completion(self, messages: List[Dict[str, str]], **kwargs) -> str:
         """Send a chat completion request using OpenAI SDK"""
         try:
             response = await self._make_request(
-                openai.ChatCompletion.acreate,
+                self._create_completion,
                 model=self.llm_config.model,
                 messages=messages,
                 temperature=kwargs.get("temperature", 0.7),
                 max_tokens=kwargs.get("max_tokens", 2000),
                 response_format={"type": "json_object"}
             )
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                LLM_BATCH_TOKENS.observe(usage.prompt_tokens, self.llm_config.provider, "prompt")
+                LLM_BATCH_TOKENS.observe(usage.completion_tokens, self.llm_config.provider, "completion")
             return response.choices[0].message.content
         except Exception as e:
             self.logger.error(f"LLM chat completion failed: {str(e)}")
@@ -116,6 +149,7 @@ class LLMService:
             {"role": "user", "content": user_prompt}
         ]
         
+        LLM_BATCH_FILES.observe(len(filenames), self.llm_config.provider)
         try:
             content = await self.chat_completion(messages)
             return self._parse_llm_response(content, filenames)
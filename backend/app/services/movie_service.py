@@ -1,57 +1,292 @@
-from typing import List, Dict, Optional
+import asyncio
+import logging
+from typing import AsyncIterator, Callable, List, Dict, Optional, Tuple
 import os
 import re
-from datetime import datetime
-from ..models.media.movie_model import Movie, MovieFile
+import time
+from ..models.media.movie_model import Movie
+from ..models.media.scan_records import PathTable, FileRecord, MovieRecord, ScanResult
 from ..core.config import ConfigManager
+from ..core.executor import run_io, io_executor
+from ..core.io_scheduler import throttle, throttled_listdir
+from ..core.metrics import SCAN_FILES, SCAN_SECONDS
+from ..core.pipeline import Pipeline, Stage
+from ..core.tasks import gather_bounded
+from ..core.scan_index import ScanIndex, get_scan_index
 from ..services.tmdb_service import TMDBService
+from ..services.rename_service import RenameService
+from ..services.llm_service import LLMService
+
+# Directory entries read per executor call while walking a library
+WALK_CHUNK_SIZE = 256
+
+# Keys of an LLM parse result holding a searchable title, in order of preference
+LLM_TITLE_KEYS = ("english_title", "title", "chinese_title")
 
 class MovieService:
-    def __init__(self, config_manager: ConfigManager):
+    def __init__(
+        self,
+        config_manager: ConfigManager,
+        tmdb_service: Optional[TMDBService] = None,
+        rename_service: Optional[RenameService] = None,
+        llm_provider: Optional[Callable[[], LLMService]] = None
+    ):
         self.config_manager = config_manager
-        self.tmdb_service = TMDBService(config_manager)
+        self.tmdb_service = tmdb_service or TMDBService(config_manager)
         self.settings = config_manager.settings
         self.media_config = self.settings.media_config
+        self.tmdb_config = self.settings.tmdb_config
         self.movie_extensions = self.media_config.movie_extensions
         self.subtitle_extensions = self.media_config.subtitle_extensions
+        self.scan_index = get_scan_index(self.media_config.scan_index_path)
+        self.rename_service = rename_service or RenameService(config_manager)
+        self.llm_provider = llm_provider
+        self._llm_service: Optional[LLMService] = None
+        self.logger = logging.getLogger("movie_service")
 
-    async def scan_directory(self, root_path: str) -> List[Movie]:
-        """Scan directory and build movie structure"""
-        movies = []
+    async def scan_directory(self, root_path: str) -> List[Dict]:
+        """Scan directory into movies, serialized as Movie dumps without building the models"""
+        scan = await self.scan_records(root_path)
+        return scan.to_dicts()
+
+    async def scan_records(
+        self,
+        root_path: str,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> ScanResult:
+        """Scan directory into compact movie records, reporting (done, total) directories to progress"""
+        scan = ScanResult()
+        start = time.perf_counter()
         
         # Get all directories in the root path
-        for item in os.listdir(root_path):
-            item_path = os.path.join(root_path, item)
-            if os.path.isdir(item_path):
-                # Try to identify movie from directory name
-                movie_info = await self._identify_movie_from_directory(item_path)
-                if movie_info:
-                    movie = await self._scan_movie_directory(item_path, movie_info)
-                    movies.append(movie)
+        subdirectories = await run_io(self._list_subdirectories, root_path)
+        done = 0
+        
+        async def scan_candidate(directory_path: str) -> Optional[MovieRecord]:
+            nonlocal done
+            record = await self._scan_movie_candidate(directory_path, scan.paths)
+            done += 1
+            if progress is not None:
+                progress(done, len(subdirectories))
+            return record
+        
+        # Identify directories concurrently; the TMDB rate limiter, not the
+        # round-trip time, bounds the overall throughput
+        records = await gather_bounded(
+            scan_candidate,
+            subdirectories,
+            self.tmdb_config.concurrency
+        )
+        scan.records = [record for record in records if record]
+        SCAN_SECONDS.observe(time.perf_counter() - start, "movie")
+        return scan
+
+    async def plan_library(
+        self,
+        root_path: str,
+        use_llm: bool = False,
+        progress: Optional[Callable[[str, int, int], None]] = None
+    ) -> Dict:
+        """
+        Scan, identify and plan the renames of every movie under a root in one pass
+        
+        Directories stream through walk → scan → parse → match → name stages
+        that all run at once (see core.pipeline): TMDB lookups start as soon as
+        the first directory is scanned instead of after the whole library.
+        Files with a fingerprint match skip the parse and match stages. With
+        use_llm, names are parsed by the LLM in batches before the TMDB search.
+        
+        Returns the rename preview of the planned batch plus the directories
+        that could not be matched and per-stage counters; progress receives
+        (stage, done, total) as items pass.
+        """
+        paths = PathTable()
+        unmatched: List[str] = []
         
-        return movies
+        async def scan(directory_path: str) -> Optional[Dict]:
+            media_file = await self._scan_movie_directory(directory_path, paths.intern(directory_path))
+            if not media_file:
+                return None
+            # A file seen before (possibly under another name) keeps its match
+            return {
+                "directory": directory_path,
+                "file": media_file,
+                "query": os.path.basename(directory_path),
+                "year": None,
+                "movie_info": await self._find_indexed_movie(media_file)
+            }
+        
+        async def parse(batch: List[Dict]) -> List[Dict]:
+            pending = [candidate for candidate in batch if not candidate["movie_info"]]
+            if pending:
+                results = await self._get_llm_service().parse_filenames(
+                    [candidate["query"] for candidate in pending],
+                    {candidate["query"]: "movie" for candidate in pending}
+                )
+                for candidate, result in zip(pending, results):
+                    if not isinstance(result, dict):
+                        # The model returned something other than an object; search by filename
+                        continue
+                    title = next((result[key] for key in LLM_TITLE_KEYS if result.get(key)), None)
+                    if title:
+                        candidate["query"] = title
+                        candidate["year"] = str(result.get("year") or "") or None
+            return batch
+        
+        async def match(candidate: Dict) -> Optional[Dict]:
+            if not candidate["movie_info"]:
+                if candidate["year"] is not None:
+                    movie_info = await self._search_movie(candidate["query"], candidate["year"])
+                else:
+                    movie_info = await self._identify_movie_from_directory(candidate["directory"])
+                if not movie_info:
+                    unmatched.append(candidate["directory"])
+                    return None
+                await self._index_movie(candidate["file"], movie_info)
+                candidate["movie_info"] = movie_info
+            return candidate
+        
+        async def name(candidate: Dict) -> List[Tuple[str, ...]]:
+            movie_info = candidate["movie_info"]
+            media_file: FileRecord = candidate["file"]
+            return self._plan_file_renames(
+                candidate["directory"],
+                media_file.file_path(paths),
+                media_file.subtitles,
+                movie_info.get('title'),
+                movie_info.get('release_date', '').split('-')[0],
+                movie_info
+            )
+        
+        stages = [Stage("scan", scan, io_executor.max_workers)]
+        if use_llm:
+            stages.append(Stage("parse", parse, 1, self._get_llm_service().llm_config.batch_size))
+        stages.append(Stage("match", match, self.tmdb_config.concurrency))
+        stages.append(Stage("name", name))
+        pipeline = Pipeline(stages, progress=progress)
+        
+        ops = []
+        async for file_ops in pipeline.run(self._iter_subdirectories(root_path)):
+            ops.extend(file_ops)
+        
+        plan = await self.rename_service.preview(ops)
+        plan["unmatched"] = sorted(unmatched)
+        plan["stages"] = pipeline.stats()
+        return plan
+
+    def _get_llm_service(self) -> LLMService:
+        """Get the LLM client on first use; scans without LLM parsing never need it"""
+        if self.llm_provider is not None:
+            return self.llm_provider()
+        if self._llm_service is None:
+            self._llm_service = LLMService(self.config_manager)
+        return self._llm_service
+
+    async def _iter_subdirectories(self, root_path: str) -> AsyncIterator[str]:
+        """Yield subdirectory paths of a directory while it is still being listed"""
+        await run_io(throttle, root_path, 0, 1)
+        entries = await run_io(os.scandir, root_path)
+        read: Optional[asyncio.Future] = None
+        try:
+            while True:
+                # Shielded so a cancelled scan never leaves a read running on the iterator
+                read = asyncio.ensure_future(run_io(self._next_subdirectories, entries))
+                chunk = await asyncio.shield(read)
+                if chunk is None:
+                    return
+                for path in chunk:
+                    yield path
+        finally:
+            # Closing while another thread is inside next(entries) is unsafe,
+            # so wait for the in-flight chunk and close on the executor
+            if read is not None and not read.done():
+                await asyncio.wait({read})
+            await run_io(entries.close)
+
+    def _next_subdirectories(self, entries) -> Optional[List[str]]:
+        """Subdirectory paths among the next WALK_CHUNK_SIZE entries, None at the end (blocking)"""
+        chunk = []
+        for _ in range(WALK_CHUNK_SIZE):
+            entry = next(entries, None)
+            if entry is None:
+                return chunk or None
+            if entry.is_dir():
+                chunk.append(entry.path)
+        return chunk
+
+    async def _search_movie(self, title: str, year: Optional[str]) -> Optional[Dict]:
+        """Search TMDB for a parsed title, preferring a result from the parsed year"""
+        results = await self.tmdb_service.search_movie(title)
+        if not results:
+            return None
+        if year:
+            for result in results:
+                if result.get('release_date', '').startswith(year):
+                    return result
+        return results[0]
+
+    async def _scan_movie_candidate(self, directory_path: str, paths: PathTable) -> Optional[MovieRecord]:
+        """Identify a directory as a movie and scan its files"""
+        dir_id = paths.intern(directory_path)
+        media_file = await self._scan_movie_directory(directory_path, dir_id)
+        
+        # A file seen before (possibly under another name) keeps its match
+        movie_info = await self._find_indexed_movie(media_file)
+        if not movie_info:
+            # Try to identify movie from directory name
+            movie_info = await self._identify_movie_from_directory(directory_path)
+            if not movie_info:
+                return None
+            await self._index_movie(media_file, movie_info)
+        
+        movie = MovieRecord(
+            dir_id=dir_id,
+            tmdb_id=str(movie_info.get('id')),
+            title=movie_info.get('title'),
+            year=movie_info.get('release_date', '').split('-')[0],
+            movie_info=movie_info
+        )
+        if media_file:
+            movie.files.append(media_file)
+        return movie
+
+    async def _find_indexed_movie(self, media_file: Optional[FileRecord]) -> Optional[Dict]:
+        """Look up the movie previously matched to a file's fingerprint"""
+        if not media_file or not media_file.fingerprint:
+            return None
+        match = await run_io(self.scan_index.get_match, media_file.fingerprint)
+        if not match or match["media_type"] != "movie":
+            return None
+        return await run_io(self.scan_index.get_payload, ScanIndex.movie_key(match["tmdb_id"]))
+
+    async def _index_movie(self, media_file: Optional[FileRecord], movie_info: Dict) -> None:
+        """Remember the movie matched to a file's fingerprint"""
+        if not media_file or not media_file.fingerprint:
+            return
+        tmdb_id = str(movie_info.get('id'))
+        await run_io(self.scan_index.put_payload, ScanIndex.movie_key(tmdb_id), movie_info)
+        await run_io(self.scan_index.put_match, media_file.fingerprint, "movie", tmdb_id)
+
+    def _list_subdirectories(self, root_path: str) -> List[str]:
+        """List subdirectory paths of a directory (blocking, run on the IO executor)"""
+        throttle(root_path, ops=1)
+        with os.scandir(root_path) as entries:
+            return [entry.path for entry in entries if entry.is_dir()]
 
     async def _identify_movie_from_directory(self, directory_path: str) -> Optional[Dict]:
         """Try to identify movie from directory name using TMDB"""
         directory_name = os.path.basename(directory_path)
         # Use the centralized TMDB service to identify the movie
         result = await self.tmdb_service.identify_media_from_name(directory_name, "movie")
-        if result and result["type"] == "movie":
-            return result["data"]
+        if result and result.get("media_type") == "movie":
+            return result
         return None
 
-    async def _scan_movie_directory(self, directory_path: str, movie_info: Dict) -> Movie:
-        """Scan a movie directory and identify files"""
-        movie = Movie(
-            tmdb_id=str(movie_info.get('id')),
-            title=movie_info.get('title'),
-            year=movie_info.get('release_date', '').split('-')[0],
-            directory_path=directory_path,
-            movie_info=movie_info
-        )
-        
+    async def _scan_movie_directory(self, directory_path: str, dir_id: int) -> Optional[FileRecord]:
+        """Scan a movie directory for its main media file"""
         # Get all files in the directory
-        files = os.listdir(directory_path)
+        files = await run_io(throttled_listdir, directory_path)
+        SCAN_FILES.inc("movie", amount=len(files))
         
         # Find the main media file
         media_file = next(
@@ -60,35 +295,58 @@ class MovieService:
             None
         )
         
-        if media_file:
-            # Find associated subtitle files
-            subtitle_files = [
-                f for f in files if any(f.lower().endswith(ext.lower()) 
-                                      for ext in self.subtitle_extensions)
-            ]
-            
-            file_path = os.path.join(directory_path, media_file)
-            movie_file = MovieFile(
-                file_path=file_path,
-                file_name=media_file,
-                file_size=os.path.getsize(file_path),
-                modified_time=datetime.fromtimestamp(os.path.getmtime(file_path)),
-                subtitles=subtitle_files
-            )
-            movie.files.append(movie_file)
+        if not media_file:
+            return None
         
-        return movie
+        # Find associated subtitle files
+        subtitle_files = [
+            f for f in files if any(f.lower().endswith(ext.lower()) 
+                                  for ext in self.subtitle_extensions)
+        ]
+        
+        file_path = os.path.join(directory_path, media_file)
+        file_stat = await run_io(os.stat, file_path)
+        fingerprint = await run_io(
+            self.scan_index.fingerprint,
+            file_path,
+            file_stat.st_size,
+            file_stat.st_mtime
+        )
+        return FileRecord(
+            dir_id=dir_id,
+            file_name=media_file,
+            file_size=file_stat.st_size,
+            modified_time=file_stat.st_mtime,
+            subtitles=tuple(subtitle_files),
+            fingerprint=fingerprint
+        )
 
-    async def identify_movies(self, movies: List[Movie]) -> List[Movie]:
-        """Identify all movies"""
-        identified_movies = []
+    async def identify_movies(
+        self,
+        movies: List[Movie],
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> List[Movie]:
+        """Identify all movies, reporting (done, total) lookups to progress"""
+        candidates = [movie for movie in movies if movie.tmdb_id]
+        done = 0
         
-        for movie in movies:
-            if not movie.tmdb_id:
-                continue
-                
-            # Get detailed movie info from TMDB
+        async def get_info(movie: Movie) -> Optional[Dict]:
+            nonlocal done
             movie_info = await self._get_movie_info(movie.tmdb_id)
+            done += 1
+            if progress is not None:
+                progress(done, len(candidates))
+            return movie_info
+        
+        # Get detailed movie info from TMDB concurrently, keeping input order
+        infos = await gather_bounded(
+            get_info,
+            candidates,
+            self.tmdb_config.concurrency
+        )
+        
+        identified_movies = []
+        for movie, movie_info in zip(candidates, infos):
             if movie_info:
                 movie.movie_info = movie_info
                 identified_movies.append(movie)
@@ -100,12 +358,25 @@ class MovieService:
         try:
             return await self.tmdb_service.get_movie(movie_id)
         except Exception as e:
-            print(f"Error getting movie info: {e}")
+            self.logger.error(f"Error getting movie info: {e}")
             return None
 
-    async def rename_movies(self, movies: List[Movie]) -> List[Dict]:
-        """Rename all movies following movie naming convention"""
-        results = []
+    async def rename_movies(self, movies: List[Movie]) -> Dict:
+        """
+        Rename all movies following movie naming convention
+        
+        The renames run as one journaled batch; the returned report carries
+        the batch id for resume/undo and the per-file results.
+        """
+        return await self.rename_service.execute(self.plan_renames(movies))
+
+    async def preview_renames(self, movies: List[Movie]) -> Dict:
+        """Dry-run the renames of rename_movies and report collisions"""
+        return await self.rename_service.preview(self.plan_renames(movies))
+
+    def plan_renames(self, movies: List[Movie]) -> List[Tuple[str, ...]]:
+        """Compute (source, target[, video]) paths for all selected movie files"""
+        ops = []
         
         for movie in movies:
             if not movie.selected:
@@ -114,40 +385,54 @@ class MovieService:
             for movie_file in movie.files:
                 if not movie_file.selected:
                     continue
-                
-                # Generate new movie name
-                new_name = self._generate_movie_name(
+                ops.extend(self._plan_file_renames(
+                    movie.directory_path,
+                    movie_file.file_path,
+                    movie_file.subtitles,
                     movie.title,
                     movie.year,
                     movie.movie_info
-                )
-                
-                # Rename main file
-                new_path = os.path.join(movie.directory_path, new_name)
-                result = await self._rename_file(movie_file.file_path, new_path)
-                results.append(result)
-                
-                # Rename subtitle files
-                for subtitle in movie_file.subtitles:
-                    subtitle_path = os.path.join(
-                        os.path.dirname(movie_file.file_path),
-                        subtitle
-                    )
-                    new_subtitle = self._generate_subtitle_name(
-                        new_name,
-                        subtitle
-                    )
-                    new_subtitle_path = os.path.join(
-                        movie.directory_path,
-                        new_subtitle
-                    )
-                    result = await self._rename_file(
-                        subtitle_path,
-                        new_subtitle_path
-                    )
-                    results.append(result)
-        
-        return results
+                ))
+        
+        return ops
+
+    def _plan_file_renames(
+        self,
+        directory_path: str,
+        file_path: str,
+        subtitles: List[str],
+        title: str,
+        year: str,
+        movie_info: Dict
+    ) -> List[Tuple[str, ...]]:
+        """Compute (source, target) paths for a movie file and its subtitles, which also name the movie file"""
+        # Generate new movie name, keeping the file extension
+        new_name = self._generate_movie_name(
+            title,
+            year,
+            movie_info
+        ) + os.path.splitext(file_path)[1]
+        
+        # Rename main file
+        ops = [(file_path, os.path.join(directory_path, new_name))]
+        
+        # Rename subtitle files
+        for subtitle in subtitles:
+            subtitle_path = os.path.join(
+                os.path.dirname(file_path),
+                subtitle
+            )
+            new_subtitle = self._generate_subtitle_name(
+                new_name,
+                subtitle
+            )
+            new_subtitle_path = os.path.join(
+                directory_path,
+                new_subtitle
+            )
+            ops.append((subtitle_path, new_subtitle_path, file_path))
+        
+        return ops
 
     def _generate_movie_name(
         self,
@@ -173,23 +458,6 @@ class MovieService:
         
         return f"{base_name}.{lang_code}{ext}"
 
-    async def _rename_file(self, old_path: str, new_path: str) -> Dict:
-        """Rename a file and return the result"""
-        try:
-            os.rename(old_path, new_path)
-            return {
-                "success": True,
-                "old_path": old_path,
-                "new_path": new_path
-            }
-        except Exception as e:
-            return {
-                "success": False,
-                "old_path": old_path,
-                "new_path": new_path,
-                "error": str(e)
-            }
-
     def _extract_language_code(self, subtitle_file: str) -> str:
         """Extract language code from subtitle filename"""
         # Common patterns for language codes
@@ -0,0 +1,292 @@
+"""Service for applying batches of renames safely"""
+import logging
+import os
+import threading
+from collections import Counter, defaultdict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from ..core.executor import run_io, run_io_cancellable, io_executor
+from ..core.futils import get_long_path, rename_noreplace
+from ..core.oplog import record
+from ..core.rename_journal import (
+    RenameJournal,
+    STATE_APPLYING,
+    STATE_APPLIED,
+    STATE_UNDOING,
+    STATE_UNDONE,
+    list_journals,
+    find_journal
+)
+from ..core.tasks import gather_bounded
+from ..models.config import MediaConfig
+
+# Statuses of planned renames
+PLAN_RENAME = "rename"
+PLAN_UNCHANGED = "unchanged"
+PLAN_CONFLICT = "conflict"
+
+class RenameService:
+    """
+    Plan → apply engine for bulk renames
+
+    Every batch is first checked for collisions, then written to a journal
+    before any file is touched. Renames are applied in parallel across target
+    directories (sequentially within one directory), never overwriting an
+    existing target. An interrupted batch can be resumed, and an applied
+    batch can be undone.
+    """
+
+    def __init__(self, config_manager):
+        self.config_manager = config_manager
+        self.media_config: MediaConfig = config_manager.settings.media_config
+        self.journal_dir = self.media_config.rename_journal_dir
+        self.logger = logging.getLogger("rename_service")
+
+    async def preview(self, ops: List[Tuple[str, ...]]) -> Dict:
+        """
+        Dry-run a batch of (source, target) renames
+        
+        An operation may carry the source of the file it belongs to as a
+        third element (a subtitle names its video); it becomes a conflict
+        when that file's rename does.
+        
+        Returns the full diff with a status per operation. Targets are checked
+        against each other and against existing files using one directory
+        listing per target directory, so the cost is linear in the batch.
+        """
+        return await run_io(self._plan, ops)
+
+    async def execute(
+        self,
+        ops: List[Tuple[str, ...]],
+        progress: Optional[Callable[[int, int], None]] = None,
+        on_journal: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> Dict:
+        """
+        Plan, journal and apply a batch; conflicting renames are skipped
+        
+        Args:
+            ops: (source, target) paths, optionally with the source of the
+                file each one belongs to (see preview)
+            progress: Called with (done, total) renames as directories complete
+            on_journal: Awaited with the batch id once the journal is written,
+                before any file is renamed
+        """
+        plan = await self.preview(ops)
+        renames = [
+            (entry["old_path"], entry["new_path"])
+            for entry in plan["entries"]
+            if entry["status"] == PLAN_RENAME
+        ]
+        journal = await run_io(RenameJournal.create, self.journal_dir, renames)
+        if on_journal is not None:
+            await on_journal(journal.batch_id)
+        report = await self._apply(journal, progress)
+        report["conflicts"] = [entry for entry in plan["entries"] if entry["status"] == PLAN_CONFLICT]
+        return report
+
+    def _plan(self, ops: List[Tuple[str, ...]]) -> Dict:
+        """Compute the dry-run diff (blocking, run on the IO executor)"""
+        # Case-insensitive filesystems treat paths differing only in case as
+        # the same file, so collisions are checked on normcased keys, while a
+        # case-only rename is still a rename
+        def key(path: str) -> str:
+            return os.path.normcase(os.path.normpath(path))
+        
+        def unchanged(src: str, dst: str) -> bool:
+            return os.path.normpath(src) == os.path.normpath(dst)
+        
+        # One listing per target directory instead of an exists() per file
+        existing = {}
+        for directory in {os.path.dirname(key(op[1])) for op in ops}:
+            try:
+                existing[directory] = {os.path.normcase(name) for name in os.listdir(get_long_path(directory))}
+            except OSError:
+                existing[directory] = set()
+        
+        sources = {key(op[0]) for op in ops}
+        target_counts = Counter(key(op[1]) for op in ops if not unchanged(op[0], op[1]))
+        
+        entries = []
+        by_source = {}
+        for op in ops:
+            src, dst = op[0], op[1]
+            src_key, dst_key = key(src), key(dst)
+            entry = {"old_path": src, "new_path": dst, "status": PLAN_RENAME}
+            if unchanged(src, dst):
+                entry["status"] = PLAN_UNCHANGED
+            elif target_counts[dst_key] > 1:
+                entry["status"] = PLAN_CONFLICT
+                entry["reason"] = "Several files in this batch map to the same target"
+            elif dst_key == src_key:
+                pass  # Case-only rename of the file itself
+            elif dst_key in sources:
+                entry["status"] = PLAN_CONFLICT
+                entry["reason"] = "Target is another file that this batch renames"
+            elif os.path.basename(dst_key) in existing[os.path.dirname(dst_key)]:
+                entry["status"] = PLAN_CONFLICT
+                entry["reason"] = "Target already exists"
+            by_source[src_key] = entry
+            entries.append((op, entry))
+        
+        # A subtitle follows its video; renaming it alone would orphan it
+        for op, entry in entries:
+            if len(op) < 3 or entry["status"] != PLAN_RENAME:
+                continue
+            parent = by_source.get(key(op[2]))
+            if parent is not None and parent["status"] == PLAN_CONFLICT:
+                entry["status"] = PLAN_CONFLICT
+                entry["reason"] = "The rename of the file it belongs to conflicts"
+        
+        counts = Counter(entry["status"] for _, entry in entries)
+        return {
+            "total": len(entries),
+            "renames": counts[PLAN_RENAME],
+            "unchanged": counts[PLAN_UNCHANGED],
+            "conflicts": counts[PLAN_CONFLICT],
+            "entries": [entry for _, entry in entries]
+        }
+
+    async def resume(
+        self,
+        batch_id: str,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> Optional[Dict]:
+        """Finish applying an interrupted batch"""
+        journal = await self._load(batch_id)
+        if journal is None:
+            return None
+        if journal.state in (STATE_UNDOING, STATE_UNDONE):
+            return await self._undo(journal)
+        return await self._apply(journal, progress)
+
+    async def undo(self, batch_id: str) -> Optional[Dict]:
+        """Revert every completed rename of a batch"""
+        journal = await self._load(batch_id)
+        if journal is None:
+            return None
+        return await self._undo(journal)
+
+    async def get_batch(self, batch_id: str) -> Optional[Dict]:
+        """Get the state and per-operation results of a batch"""
+        journal = await self._load(batch_id)
+        return self._report(journal) if journal else None
+
+    async def list_batches(self) -> List[Dict]:
+        """Summaries of all journaled batches, newest first"""
+        def load_summaries() -> List[Dict]:
+            return [RenameJournal.load(path).summary() for path in reversed(list_journals(self.journal_dir))]
+        return await run_io(load_summaries)
+
+    async def _load(self, batch_id: str) -> Optional[RenameJournal]:
+        path = await run_io(find_journal, self.journal_dir, batch_id)
+        if path is None:
+            return None
+        return await run_io(RenameJournal.load, path)
+
+    def _report(self, journal: RenameJournal) -> Dict:
+        report = journal.summary()
+        report["results"] = journal.results()
+        return report
+
+    def _group(self, journal: RenameJournal, indices: List[int], by_target: bool = False) -> List[List[int]]:
+        """Group operations by source (or target) directory so each directory is worked sequentially"""
+        groups = defaultdict(list)
+        for index in indices:
+            src, dst = journal.ops[index]
+            groups[os.path.dirname(dst if by_target else src)].append(index)
+        return list(groups.values())
+
+    async def _apply(
+        self,
+        journal: RenameJournal,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> Dict:
+        await run_io(journal.set_state, STATE_APPLYING)
+        pending = journal.pending()
+        processed = len(journal.ops) - len(pending)
+        
+        async def apply_group(indices: List[int]) -> None:
+            nonlocal processed
+            await run_io_cancellable(self._apply_group, journal, indices)
+            processed += len(indices)
+            if progress is not None:
+                progress(processed, len(journal.ops))
+        
+        try:
+            # Renames into one directory never run concurrently, so files
+            # from different sources (e.g. subtitle subfolders) cannot race
+            # for the same target
+            await gather_bounded(
+                apply_group,
+                self._group(journal, pending, by_target=True),
+                io_executor.max_workers
+            )
+            await run_io(journal.set_state, STATE_APPLIED)
+        finally:
+            await run_io(journal.close)
+        return self._report(journal)
+
+    def _apply_group(self, cancel_event: threading.Event, journal: RenameJournal, indices: List[int]) -> None:
+        """
+        Apply renames into one directory (blocking, run on the IO executor)
+        
+        Stops before the next rename once cancel_event is set; the rest stay
+        pending in the journal for a resume.
+        """
+        for index in indices:
+            if cancel_event.is_set():
+                return
+            src, dst = journal.ops[index]
+            long_src = get_long_path(src)
+            long_dst = get_long_path(dst)
+            try:
+                if os.path.normpath(long_src) == os.path.normpath(long_dst):
+                    journal.mark_done(index)
+                    continue
+                os.makedirs(os.path.dirname(long_dst), exist_ok=True)
+                try:
+                    rename_noreplace(long_src, long_dst)
+                except OSError:
+                    if not os.path.lexists(long_src) and os.path.lexists(long_dst):
+                        # Applied before an interruption
+                        journal.mark_done(index)
+                        continue
+                    raise
+                journal.mark_done(index)
+                record("rename", "success", src=src, dst=dst, batch=journal.batch_id)
+            except OSError as e:
+                record("rename", "error", src=src, dst=dst, batch=journal.batch_id, error=str(e))
+                journal.mark_failed(index, str(e))
+
+    async def _undo(self, journal: RenameJournal) -> Dict:
+        await run_io(journal.set_state, STATE_UNDOING)
+        # Undo in reverse order so chained renames unwind correctly
+        indices = sorted(journal.done, reverse=True)
+        try:
+            await gather_bounded(
+                lambda group: run_io(self._undo_group, journal, group),
+                self._group(journal, indices),
+                io_executor.max_workers
+            )
+            await run_io(journal.set_state, STATE_UNDONE)
+        finally:
+            await run_io(journal.close)
+        return self._report(journal)
+
+    def _undo_group(self, journal: RenameJournal, indices: List[int]) -> None:
+        """Revert renames back into one directory (blocking, run on the IO executor)"""
+        for index in indices:
+            src, dst = journal.ops[index]
+            long_src = get_long_path(src)
+            long_dst = get_long_path(dst)
+            try:
+                if os.path.normpath(long_src) != os.path.normpath(long_dst):
+                    try:
+                        rename_noreplace(long_dst, long_src)
+                    except FileExistsError:
+                        raise FileExistsError(f"Original path is occupied: {src}")
+                journal.mark_undone(index)
+                record("rename_undo", "success", src=dst, dst=src, batch=journal.batch_id)
+            except OSError as e:
+                record("rename_undo", "error", src=dst, dst=src, batch=journal.batch_id, error=str(e))
+                journal.mark_failed(index, str(e))
@@ -1,11 +1,13 @@
 from typing import List, Dict, Optional, Union
-import tmdbsimple as tmdb
 from ..core.config import config_manager
+from ..core.metrics import TMDB_REQUEST_SECONDS
 from ..core.rlimit import RateLimiter
+from ..core.shared_state import ResponseCache, get_shared_store
 from ..models.config import TMDBConfig
 from ..models.settings import Settings
 import os
 import time
+import asyncio
 import logging
 
 class TMDBService:
@@ -16,6 +18,10 @@ class TMDBService:
         self.settings: Settings = config_manager.settings
         self.tmdb_config: TMDBConfig = self.settings.tmdb_config
         
+        # Import the SDK with the first service instance rather than at startup
+        import tmdbsimple as tmdb
+        self.tmdb = tmdb
+        
         # Initialize TMDB API
         tmdb.API_KEY = self.tmdb_config.api_key
         self.language = self.tmdb_config.language
@@ -25,17 +31,37 @@ class TMDBService:
         self.movies = tmdb.Movies()
         self.tv = tmdb.TV()
         
-        # Initialize rate limiter
-        self.rate_limiter = RateLimiter(self.tmdb_config.rate_limit)
+        # Rate limit and cache responses; with a shared state file every
+        # worker process draws from one bucket and one cache
+        store = get_shared_store(self.settings.basic_config.shared_state_path)
+        self.rate_limiter = RateLimiter(self.tmdb_config.rate_limit, store=store, name="tmdb")
+        self.cache = ResponseCache("tmdb", self.tmdb_config.cache_ttl, store=store)
         self.logger = logging.getLogger("tmdb_service")
     
-    async def _make_request(self, func, *args, **kwargs):
+    async def _run_sync(self, endpoint: str, func, *args, **kwargs):
+        """
+        Run a blocking tmdbsimple call in a worker thread
+        
+        Cancelling the awaiting task drops a call that has not started yet; a
+        request already on the wire finishes in its thread and is discarded.
+        """
+        start = time.perf_counter()
+        try:
+            return await asyncio.to_thread(func, *args, **kwargs)
+        finally:
+            TMDB_REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint)
+    
+    async def _make_request(self, endpoint: str, func, *args, **kwargs):
         """Make a rate-limited API request with exponential backoff"""
         try:
+            # tmdbsimple is synchronous; run it off the event loop so that
+            # concurrent lookups actually overlap
             return await self.rate_limiter.execute_with_backoff(
+                self._run_sync,
+                3,
+                1.0,
+                endpoint,
                 func,
-                max_retries=3,
-                base_delay=1.0,
                 *args,
                 **kwargs
             )
@@ -43,10 +69,21 @@ class TMDBService:
             self.logger.error(f"TMDB API error: {str(e)}")
             raise
     
+    async def _cached_request(self, endpoint: str, key: str, func, **kwargs):
+        """Make a request unless its response is cached; failures are not cached"""
+        key = f"{endpoint}:{key}:{self.language}"
+        response = await self.cache.get(key)
+        if response is None:
+            response = await self._make_request(endpoint, func, **kwargs)
+            await self.cache.put(key, response)
+        return response
+    
     async def search_movie(self, query: str) -> List[Dict]:
         """Search for a movie using TMDB API"""
         try:
-            response = await self._make_request(
+            response = await self._cached_request(
+                "search_movie",
+                query,
                 self.search.movie,
                 query=query,
                 language=self.language
@@ -59,7 +96,9 @@ class TMDBService:
     async def search_tv_show(self, query: str) -> List[Dict]:
         """Search for a TV show using TMDB API"""
         try:
-            response = await self._make_request(
+            response = await self._cached_request(
+                "search_tv",
+                query,
                 self.search.tv,
                 query=query,
                 language=self.language
@@ -72,8 +111,10 @@ class TMDBService:
     async def get_movie(self, movie_id: str) -> Optional[Dict]:
         """Get movie details"""
         try:
-            return await self._make_request(
-                self.movies(movie_id).info,
+            return await self._cached_request(
+                "movie",
+                movie_id,
+                self.tmdb.Movies(movie_id).info,
                 language=self.language,
                 append_to_response="credits,external_ids"
             )
@@ -84,8 +125,10 @@ class TMDBService:
     async def get_tv_show(self, tv_id: str) -> Optional[Dict]:
         """Get TV show details"""
         try:
-            return await self._make_request(
-                self.tv(tv_id).info,
+            return await self._cached_request(
+                "tv",
+                tv_id,
+                self.tmdb.TV(tv_id).info,
                 language=self.language,
                 append_to_response="credits,external_ids"
             )
@@ -96,7 +139,10 @@ class TMDBService:
     async def get_tv_season(self, show_id: str, season_number: int) -> Optional[Dict]:
         """Get TV season details"""
         try:
-            return self.tv(show_id).season(season_number).info(
+            return await self._cached_request(
+                "tv_season",
+                f"{show_id}:{season_number}",
+                self.tmdb.TV_Seasons(show_id, season_number).info,
                 language=self.language
             )
         except Exception:
@@ -105,7 +151,10 @@ class TMDBService:
     async def get_tv_episode(self, show_id: str, season_number: int, episode_number: int) -> Optional[Dict]:
         """Get TV episode details"""
         try:
-            return self.tv(show_id).season(season_number).episode(episode_number).info(
+            return await self._cached_request(
+                "tv_episode",
+                f"{show_id}:{season_number}:{episode_number}",
+                self.tmdb.TV_Episodes(show_id, season_number, episode_number).info,
                 language=self.language
             )
         except Exception:
@@ -0,0 +1,134 @@
+"""Service for moving downloaded titles into the media libraries"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from typing import Dict, List, Optional
+from ..core.executor import run_io, run_in_thread
+from ..core.transfer import TransferEngine, CONTENT_MOVIE, CONTENT_TV_SERIES
+from ..models.config import TransferConfig
+
+class TransferService:
+    """
+    Runs transfers in the background and tracks their progress
+
+    Each transfer plans its items up front, then runs on the transfer engine
+    (on a thread of its own) while the caller polls `get_transfer` for
+    progress. A cancelled transfer reports "cancelling" until the moves
+    already running have finished.
+    """
+
+    def __init__(self, config_manager):
+        self.config_manager = config_manager
+        self._transfers: Dict[str, Dict] = {}
+        self.logger = logging.getLogger("transfer_service")
+
+    @property
+    def transfer_config(self) -> TransferConfig:
+        # Read on every transfer; the service outlives settings changes
+        return self.config_manager.settings.transfer_config
+
+    def _create_engine(self, mode: Optional[str] = None) -> TransferEngine:
+        return TransferEngine(
+            parallel_per_device=self.transfer_config.parallel_per_device,
+            max_parallel=self.transfer_config.max_parallel,
+            mode=mode or self.transfer_config.mode,
+            verify=self.transfer_config.verify
+        )
+
+    async def plan_transfer(
+        self,
+        source_root: str,
+        target_root: str,
+        content_type: str,
+        organize_by_initial: bool = False,
+        mode: Optional[str] = None
+    ) -> TransferEngine:
+        """Create an engine with the planned items of a transfer; mode defaults to the configured one"""
+        if content_type not in (CONTENT_MOVIE, CONTENT_TV_SERIES):
+            raise ValueError(f"Unsupported content type: {content_type}")
+        for path in (source_root, target_root):
+            if not await run_io(os.path.isdir, path):
+                raise ValueError(f"Not a directory: {path}")
+
+        engine = self._create_engine(mode)
+        engine.items = await run_io(engine.plan, source_root, target_root, content_type, organize_by_initial)
+        return engine
+
+    async def start_transfer(
+        self,
+        source_root: str,
+        target_root: str,
+        content_type: str,
+        organize_by_initial: bool = False,
+        mode: Optional[str] = None
+    ) -> Dict:
+        """Plan a transfer and start it in the background"""
+        engine = await self.plan_transfer(source_root, target_root, content_type, organize_by_initial, mode)
+        items = engine.items
+
+        transfer_id = uuid.uuid4().hex[:12]
+        transfer = {
+            "id": transfer_id,
+            "source_root": source_root,
+            "target_root": target_root,
+            "content_type": content_type,
+            "mode": engine.mode,
+            "created": time.time(),
+            "engine": engine,
+            "task": None,
+            "cancel_requested": False
+        }
+        transfer["task"] = asyncio.create_task(
+            run_in_thread(lambda cancel_event: engine.run(items, cancel_event), name="aigua-transfer-run")
+        )
+        self._transfers[transfer_id] = transfer
+        return self._describe(transfer)
+
+    def get_transfer(self, transfer_id: str, include_items: bool = False) -> Optional[Dict]:
+        """Get the progress of a transfer"""
+        transfer = self._transfers.get(transfer_id)
+        return self._describe(transfer, include_items) if transfer else None
+
+    def list_transfers(self) -> List[Dict]:
+        """Progress of all transfers, newest first"""
+        transfers = sorted(self._transfers.values(), key=lambda transfer: transfer["created"], reverse=True)
+        return [self._describe(transfer) for transfer in transfers]
+
+    async def cancel_transfer(self, transfer_id: str) -> Optional[Dict]:
+        """Stop dispatching new moves; moves already running finish"""
+        transfer = self._transfers.get(transfer_id)
+        if not transfer:
+            return None
+        task = transfer["task"]
+        if not task.done() and not transfer["cancel_requested"]:
+            # Sets the engine's cancel event; the task ends once engine.run returns
+            transfer["cancel_requested"] = True
+            task.cancel()
+        return self._describe(transfer)
+
+    def _describe(self, transfer: Dict, include_items: bool = False) -> Dict:
+        engine: TransferEngine = transfer["engine"]
+        task = transfer["task"]
+        if not task.done():
+            state = "cancelling" if transfer["cancel_requested"] else "running"
+        elif task.cancelled():
+            state = "cancelled"
+        elif task.exception() is not None:
+            state = "failed"
+        else:
+            state = "finished"
+        result = {
+            "id": transfer["id"],
+            "source_root": transfer["source_root"],
+            "target_root": transfer["target_root"],
+            "content_type": transfer["content_type"],
+            "mode": transfer["mode"],
+            "created": transfer["created"],
+            "state": state,
+            "progress": engine.progress()
+        }
+        if include_items:
+            result["items"] = [item.to_dict() for item in engine.items]
+        return result
\ No newline at end of file
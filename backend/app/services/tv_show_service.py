@@ -1,66 +1,211 @@
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Tuple, AsyncIterator, Union
+import asyncio
+import logging
 import os
 import re
-from datetime import datetime
+import time
 from ..models.media.tv_show_model import TVShow, TVSeason, TVEpisode
+from ..models.media.scan_records import PathTable, FileRecord, SeasonRecord, ShowRecord
 from ..core.config import ConfigManager
+from ..core.executor import run_io
+from ..core.io_scheduler import throttle, throttled_listdir
+from ..core.metrics import SCAN_FILES, SCAN_SECONDS
+from ..core.tasks import iter_bounded
+from ..core.scan_index import ScanIndex, get_scan_index
 from ..services.tmdb_service import TMDBService
+from ..services.rename_service import RenameService
 
 class TVShowService:
-    def __init__(self, config_manager: ConfigManager):
+    def __init__(
+        self,
+        config_manager: ConfigManager,
+        tmdb_service: Optional[TMDBService] = None,
+        rename_service: Optional[RenameService] = None
+    ):
         self.config_manager = config_manager
-        self.tmdb_service = TMDBService(config_manager)
+        self.tmdb_service = tmdb_service or TMDBService(config_manager)
         self.settings = config_manager.settings
         self.media_config = self.settings.media_config
+        self.tmdb_config = self.settings.tmdb_config
         self.tv_extensions = self.media_config.tv_extensions
         self.subtitle_extensions = self.media_config.subtitle_extensions
+        self.scan_index = get_scan_index(self.media_config.scan_index_path)
+        self.rename_service = rename_service or RenameService(config_manager)
+        self.logger = logging.getLogger("tv_show_service")
+
+    def _new_budget(self) -> asyncio.Semaphore:
+        """Create a semaphore bounding concurrent TMDB lookups"""
+        return asyncio.Semaphore(self.tmdb_config.concurrency)
 
-    async def scan_directory(self, root_path: str) -> TVShow:
+    async def scan_library(
+        self,
+        library_root: str,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> AsyncIterator[TVShow]:
+        """
+        Scan and identify every show directory under a library root
+        
+        Shows, seasons and episodes are identified concurrently under a single
+        TMDB concurrency budget shared by the whole library. Each show is
+        yielded as soon as it has been fully identified; shows are kept as
+        compact records until then. progress receives (done, total) show
+        directories.
+        """
+        start = time.perf_counter()
+        show_paths = [path for _, path in await run_io(self._list_subdirectories, library_root)]
+        budget = self._new_budget()
+        paths = PathTable()
+        
+        async def scan_show(show_path: str) -> Optional[ShowRecord]:
+            try:
+                show = await self.scan_show_record(show_path, paths, budget)
+                return await self.identify_episodes(show, budget)
+            except Exception as e:
+                self.logger.error(f"Error scanning TV show {show_path}: {e}")
+                return None
+        
+        done = 0
+        async for _, show in iter_bounded(scan_show, show_paths, self.tmdb_config.concurrency):
+            done += 1
+            if progress is not None:
+                progress(done, len(show_paths))
+            if show:
+                yield show.to_model(paths)
+        SCAN_SECONDS.observe(time.perf_counter() - start, "tv")
+
+    async def scan_directory(self, root_path: str, budget: Optional[asyncio.Semaphore] = None) -> TVShow:
         """Scan directory and build TV show structure"""
-        show = TVShow(root_path=root_path)
+        paths = PathTable()
+        show = await self.scan_show_record(root_path, paths, budget)
+        return show.to_model(paths)
+
+    async def scan_show_record(
+        self,
+        root_path: str,
+        paths: PathTable,
+        budget: Optional[asyncio.Semaphore] = None
+    ) -> ShowRecord:
+        """Scan directory into a compact show record"""
+        budget = budget or self._new_budget()
+        show = ShowRecord(root_id=paths.intern(root_path), title=os.path.basename(root_path))
+        
+        # Scan for season directories
+        subdirectories = await run_io(self._list_subdirectories, root_path)
+        season_dirs = []
+        for item, item_path in subdirectories:
+            # Try to identify season number from directory name
+            season_number = self._extract_season_number(item)
+            if season_number is not None:
+                season_dirs.append((season_number, item_path))
+        
+        seasons = await asyncio.gather(*(
+            self._scan_season_directory(season_number, item_path, paths)
+            for season_number, item_path in season_dirs
+        ))
+        for season in seasons:
+            show.seasons[season.season_number] = season
         
-        # First, try to identify the show from the root directory name
-        show_info = await self._identify_show_from_directory(root_path)
+        # Reuse the show matched to any known episode file before asking TMDB
+        show_info = await self._find_indexed_show(show)
+        if not show_info:
+            # Try to identify the show from the root directory name
+            async with budget:
+                show_info = await self._identify_show_from_directory(root_path)
+            if show_info:
+                await run_io(self.scan_index.put_payload, ScanIndex.show_key(show_info.get('id')), show_info)
         if show_info:
             show.tmdb_id = str(show_info.get('id'))
             show.title = show_info.get('name')
             show.year = show_info.get('first_air_date', '').split('-')[0]
             show.show_info = show_info
         
-        # Scan for season directories
-        for item in os.listdir(root_path):
-            item_path = os.path.join(root_path, item)
-            if os.path.isdir(item_path):
-                # Try to identify season number from directory name
-                season_number = self._extract_season_number(item)
-                if season_number is not None:
-                    season = await self._scan_season_directory(season_number, item_path)
-                    show.seasons[season_number] = season
-        
         return show
 
+    async def _find_indexed_show(self, show: ShowRecord) -> Optional[Dict]:
+        """Look up the show previously matched to any of the show's episode files"""
+        fingerprints = [
+            episode.fingerprint
+            for season in show.seasons.values()
+            for episode in season.episodes
+            if episode.fingerprint
+        ]
+        return await run_io(self._lookup_indexed_show, fingerprints)
+
+    def _lookup_indexed_show(self, fingerprints: List[str]) -> Optional[Dict]:
+        """Find the first indexed TV match among fingerprints (blocking, run on the IO executor)"""
+        for fingerprint in fingerprints:
+            match = self.scan_index.get_match(fingerprint)
+            if match and match["media_type"] == "tv":
+                return self.scan_index.get_payload(ScanIndex.show_key(match["tmdb_id"]))
+        return None
+
+    async def _find_indexed_episode(self, show_id: str, episode: Union[TVEpisode, FileRecord]) -> Optional[Dict]:
+        """Look up the episode previously matched to a file's fingerprint"""
+        if not episode.fingerprint:
+            return None
+        match = await run_io(self.scan_index.get_match, episode.fingerprint)
+        if (
+            not match
+            or match["media_type"] != "tv"
+            or match["tmdb_id"] != str(show_id)
+            or match["episode_number"] is None
+        ):
+            return None
+        return await run_io(
+            self.scan_index.get_payload,
+            ScanIndex.episode_key(show_id, match["season_number"], match["episode_number"])
+        )
+
+    async def _index_episode(self, show_id: str, season_number: int, episode: Union[TVEpisode, FileRecord]) -> None:
+        """Remember the episode matched to a file's fingerprint"""
+        episode_info = episode.episode_info
+        if not episode.fingerprint or not episode_info or episode_info.get('episode_number') is None:
+            return
+        season_number = episode_info.get('season_number', season_number)
+        episode_number = episode_info['episode_number']
+        await run_io(
+            self.scan_index.put_payload,
+            ScanIndex.episode_key(show_id, season_number, episode_number),
+            episode_info
+        )
+        await run_io(
+            self.scan_index.put_match,
+            episode.fingerprint,
+            "tv",
+            show_id,
+            season_number,
+            episode_number
+        )
+
+    def _list_subdirectories(self, root_path: str) -> List[Tuple[str, str]]:
+        """List (name, path) of subdirectories (blocking, run on the IO executor)"""
+        throttle(root_path, ops=1)
+        with os.scandir(root_path) as entries:
+            return [(entry.name, entry.path) for entry in entries if entry.is_dir()]
+
     async def _identify_show_from_directory(self, directory_path: str) -> Optional[Dict]:
         """Try to identify TV show from directory name using TMDB"""
         directory_name = os.path.basename(directory_path)
         # Use the centralized TMDB service to identify the show
         result = await self.tmdb_service.identify_media_from_name(directory_name, "tv")
-        if result and result["type"] == "tv":
-            return result["data"]
+        if result and result.get("media_type") == "tv":
+            return result
         return None
 
-    async def _scan_season_directory(self, season_number: int, season_path: str) -> TVSeason:
+    async def _scan_season_directory(self, season_number: int, season_path: str, paths: PathTable) -> SeasonRecord:
         """Scan a season directory and identify episodes"""
-        season = TVSeason(season_number=season_number, directory_path=season_path)
+        season = SeasonRecord(season_number=season_number, dir_id=paths.intern(season_path))
         
         # Get all files in the directory
-        files = os.listdir(season_path)
+        files = await run_io(throttled_listdir, season_path)
+        SCAN_FILES.inc("tv", amount=len(files))
         
         # Group files by episode number (if they can be identified)
         episode_groups = self._group_files_by_episode(files)
         
         # Create episode objects
         for episode_number, group in episode_groups.items():
-            episode = await self._create_episode(season_path, group)
+            episode = await self._create_episode(season_path, season.dir_id, group)
             season.episodes.append(episode)
         
         # Sort episodes by episode number
@@ -80,7 +225,7 @@ class TVShowService:
                 groups[episode_number].append(file)
         return groups
 
-    async def _create_episode(self, season_path: str, files: List[str]) -> TVEpisode:
+    async def _create_episode(self, season_path: str, dir_id: int, files: List[str]) -> FileRecord:
         """Create an episode object from a group of files"""
         # Find the main media file
         media_file = next(
@@ -99,32 +244,71 @@ class TVShowService:
         ]
         
         file_path = os.path.join(season_path, media_file)
-        return TVEpisode(
-            file_path=file_path,
+        file_stat = await run_io(os.stat, file_path)
+        fingerprint = await run_io(
+            self.scan_index.fingerprint,
+            file_path,
+            file_stat.st_size,
+            file_stat.st_mtime
+        )
+        return FileRecord(
+            dir_id=dir_id,
             file_name=media_file,
-            file_size=os.path.getsize(file_path),
-            modified_time=datetime.fromtimestamp(os.path.getmtime(file_path)),
-            subtitles=subtitle_files
+            file_size=file_stat.st_size,
+            modified_time=file_stat.st_mtime,
+            subtitles=tuple(subtitle_files),
+            fingerprint=fingerprint
         )
 
-    async def identify_episodes(self, show: TVShow) -> TVShow:
-        """Identify all episodes in a show"""
+    async def identify_episodes(
+        self,
+        show: Union[TVShow, ShowRecord],
+        budget: Optional[asyncio.Semaphore] = None
+    ) -> Union[TVShow, ShowRecord]:
+        """Identify all episodes in a show (API model or scan record)"""
         if not show.tmdb_id:
             return show
-
-        for season in show.seasons.values():
-            # Get season info from TMDB
-            season_info = await self._get_season_info(show.tmdb_id, season.season_number)
-            season.season_info = season_info
-            
-            # Identify each episode
-            for episode in season.episodes:
-                episode_info = await self._identify_episode(
+        
+        budget = budget or self._new_budget()
+        
+        async def identify_episode(
+            season: Union[TVSeason, SeasonRecord],
+            episode: Union[TVEpisode, FileRecord]
+        ) -> bool:
+            # A file seen before (possibly under another name) keeps its match
+            indexed_info = await self._find_indexed_episode(show.tmdb_id, episode)
+            if indexed_info:
+                episode.episode_info = indexed_info
+                return True
+            async with budget:
+                episode.episode_info = await self._identify_episode(
                     show.tmdb_id,
                     season.season_number,
                     episode.file_name
                 )
-                episode.episode_info = episode_info
+            await self._index_episode(show.tmdb_id, season.season_number, episode)
+            return False
+        
+        async def identify_season(season: Union[TVSeason, SeasonRecord]) -> None:
+            reused = await asyncio.gather(*(
+                identify_episode(season, episode) for episode in season.episodes
+            ))
+            season_key = ScanIndex.season_key(show.tmdb_id, season.season_number)
+            season_info = None
+            if reused and all(reused):
+                # Every episode was already known; the stored season is enough
+                season_info = await run_io(self.scan_index.get_payload, season_key)
+            if season_info is None:
+                # Get season info from TMDB
+                async with budget:
+                    season_info = await self._get_season_info(show.tmdb_id, season.season_number)
+                if season_info:
+                    await run_io(self.scan_index.put_payload, season_key, season_info)
+            season.season_info = season_info
+        
+        # Seasons and episodes are looked up concurrently; the budget bounds
+        # the number of requests in flight
+        await asyncio.gather(*(identify_season(season) for season in show.seasons.values()))
         
         return show
 
@@ -133,7 +317,7 @@ class TVShowService:
         try:
             return await self.tmdb_service.get_tv_season(show_id, season_number)
         except Exception as e:
-            print(f"Error getting season info: {e}")
+            self.logger.error(f"Error getting season info: {e}")
             return None
 
     async def _identify_episode(self, show_id: str, season_number: int, file_name: str) -> Optional[Dict]:
@@ -147,40 +331,52 @@ class TVShowService:
             # Get episode info from TMDB
             return await self.tmdb_service.get_tv_episode(show_id, season_number, episode_number)
         except Exception as e:
-            print(f"Error identifying episode: {e}")
+            self.logger.error(f"Error identifying episode: {e}")
             return None
 
-    async def rename_show(self, show: TVShow) -> List[Dict]:
-        """Rename all episodes in a show following TV show naming convention"""
-        results = []
+    async def rename_show(self, show: TVShow) -> Dict:
+        """
+        Rename all episodes in a show following TV show naming convention
+        
+        The renames run as one journaled batch; the returned report carries
+        the batch id for resume/undo and the per-file results.
+        """
+        return await self.rename_service.execute(self.plan_renames(show))
+
+    async def preview_renames(self, show: TVShow) -> Dict:
+        """Dry-run the renames of rename_show and report collisions"""
+        return await self.rename_service.preview(self.plan_renames(show))
+
+    def plan_renames(self, show: TVShow) -> List[Tuple[str, ...]]:
+        """Compute (source, target[, episode]) paths for all selected episode files"""
+        ops = []
         
         for season in show.seasons.values():
             if not season.selected:
                 continue
                 
-            # Create season directory if needed
+            # Season directory; created by the rename engine if needed
             season_dir = os.path.join(
                 show.root_path,
                 f"Season {season.season_number:02d}"
             )
-            os.makedirs(season_dir, exist_ok=True)
             
             # Rename each episode
             for episode in season.episodes:
                 if not episode.selected:
                     continue
                     
-                # Generate new episode name
+                # Generate new episode name, keeping the file extension
                 new_name = self._generate_episode_name(
                     show.title,
                     season.season_number,
-                    episode.episode_info
-                )
+                    episode.episode_info,
+                    self._extract_episode_number(os.path.splitext(episode.file_name)[0])
+                ) + os.path.splitext(episode.file_name)[1]
                 
                 # Rename main file
                 new_path = os.path.join(season_dir, new_name)
-                result = await self._rename_file(episode.file_path, new_path)
-                results.append(result)
+                ops.append((episode.file_path, new_path))
                 
                 # Rename subtitle files
                 for subtitle in episode.subtitles:
@@ -193,28 +389,29 @@ class TVShowService:
                         subtitle
                     )
                     new_subtitle_path = os.path.join(season_dir, new_subtitle)
-                    result = await self._rename_file(
-                        subtitle_path,
-                        new_subtitle_path
-                    )
-                    results.append(result)
+                    ops.append((subtitle_path, new_subtitle_path, episode.file_path))
         
-        return results
+        return ops
 
     def _generate_episode_name(
         self,
         show_title: str,
         season_number: int,
-        episode_info: Dict
+        episode_info: Optional[Dict],
+        fallback_episode_number: Optional[int] = None
     ) -> str:
-        """Generate standardized episode name"""
-        episode_number = episode_info.get('episode_number', 0)
+        """
+        Generate standardized episode name
+        
+        Unidentified episodes fall back to the number parsed from the file
+        name; without either every such file would become E00 and collide.
+        """
+        episode_info = episode_info or {}
+        episode_number = episode_info.get('episode_number', fallback_episode_number or 0)
         episode_title = episode_info.get('name', '')
         
-        return (
-            f"{show_title} - S{season_number:02d}E{episode_number:02d}"
-            f" - {episode_title}"
-        )
+        name = f"{show_title} - S{season_number:02d}E{episode_number:02d}"
+        return f"{name} - {episode_title}" if episode_title else name
 
     def _generate_subtitle_name(
         self,
@@ -231,23 +428,6 @@ class TVShowService:
         
         return f"{base_name}.{lang_code}{ext}"
 
-    async def _rename_file(self, old_path: str, new_path: str) -> Dict:
-        """Rename a file and return the result"""
-        try:
-            os.rename(old_path, new_path)
-            return {
-                "success": True,
-                "old_path": old_path,
-                "new_path": new_path
-            }
-        except Exception as e:
-            return {
-                "success": False,
-                "old_path": old_path,
-                "new_path": new_path,
-                "error": str(e)
-            }
-
     def _extract_season_number(self, directory_name: str) -> Optional[int]:
         """Extract season number from directory name"""
         # Common patterns for season directories
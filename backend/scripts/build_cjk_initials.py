@@ -0,0 +1,37 @@
+"""Build app/data/cjk_initials.bin, the CJK initial-letter table
+
+The table holds one byte per code point of the CJK Unified Ideographs
+(U+4E00–U+9FFF) and Extension A (U+3400–U+4DBF) blocks: the uppercase ASCII
+initial of the character's most common pinyin reading, or 0 if it has none.
+pypinyin is only needed to run this script, not at runtime:
+
+    pip install pypinyin
+    python scripts/build_cjk_initials.py
+"""
+import os
+import sys
+
+import pypinyin
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.core.initials import TABLE_FIRST, TABLE_LAST, TABLE_PATH
+
+def build() -> bytes:
+    table = bytearray(TABLE_LAST - TABLE_FIRST + 1)
+    for code_point in range(TABLE_FIRST, TABLE_LAST + 1):
+        initials = pypinyin.lazy_pinyin(
+            chr(code_point),
+            style=pypinyin.Style.FIRST_LETTER,
+            errors="ignore"
+        )
+        if initials and initials[0][:1].isascii() and initials[0][:1].isalpha():
+            table[code_point - TABLE_FIRST] = ord(initials[0][0].upper())
+    return bytes(table)
+
+if __name__ == "__main__":
+    table = build()
+    with open(TABLE_PATH, "wb") as f:
+        f.write(table)
+    mapped = sum(1 for value in table if value)
+    print(f"Wrote {TABLE_PATH}: {len(table)} code points, {mapped} with an initial")
@@ -0,0 +1,111 @@
+"""Measure the cold-start import cost of the API against a time budget
+
+Imports app.main in fresh interpreters with `python -X importtime`, reports
+the slowest modules and the cost of each app module, and exits non-zero if
+the median import time exceeds the budget or if a module that should only
+load on first use (the LLM and TMDB SDKs) is imported at startup:
+
+    python scripts/startup_benchmark.py
+    python scripts/startup_benchmark.py --budget-ms 800 --runs 5 --top 15
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Import budget for app.main, overridable with --budget-ms or the environment
+DEFAULT_BUDGET_MS = float(os.environ.get("AIGUA_STARTUP_BUDGET_MS", "1500"))
+
+# Modules that must not be imported until a request needs them
+DEFERRED_MODULES = ("openai", "httpx", "tmdbsimple", "yaml")
+
+CHILD_CODE = (
+    "import time\n"
+    "start = time.perf_counter()\n"
+    "import app.main\n"
+    "print((time.perf_counter() - start) * 1000)\n"
+)
+
+def measure_once() -> Tuple[float, Dict[str, Tuple[int, int]]]:
+    """
+    Import app.main in a fresh interpreter
+
+    Returns:
+        The wall time of the import in milliseconds and, per module, its
+        self and cumulative import time in microseconds
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD_CODE],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing app.main failed:\n{result.stderr}")
+
+    modules: Dict[str, Tuple[int, int]] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # header line
+        modules[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+    return float(result.stdout.strip().splitlines()[-1]), modules
+
+def format_rows(rows: List[Tuple[str, int, int]]) -> str:
+    lines = [f"{'self ms':>9} {'cumul ms':>9}  module"]
+    for name, self_us, cumulative_us in rows:
+        lines.append(f"{self_us / 1000:9.1f} {cumulative_us / 1000:9.1f}  {name}")
+    return "\n".join(lines)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="fail above this median import time")
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters to measure")
+    parser.add_argument("--top", type=int, default=10, help="slowest modules to list")
+    args = parser.parse_args()
+
+    # The median discards the first run's bytecode compilation and other outliers
+    timings: List[float] = []
+    modules: Dict[str, Tuple[int, int]] = {}
+    for _ in range(max(args.runs, 1)):
+        try:
+            elapsed, modules = measure_once()
+        except RuntimeError as e:
+            print(e, file=sys.stderr)
+            return 2
+        timings.append(elapsed)
+    median = statistics.median(timings)
+
+    slowest = sorted(modules.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+    print(f"Slowest modules by own import time (last run):\n{format_rows([(n, s, c) for n, (s, c) in slowest])}\n")
+
+    own = sorted(
+        ((name, times) for name, times in modules.items() if name == "app" or name.startswith("app.")),
+        key=lambda item: item[1][1],
+        reverse=True
+    )
+    print(f"App modules by cumulative import time:\n{format_rows([(n, s, c) for n, (s, c) in own])}\n")
+
+    print(f"Runs (ms): {', '.join(f'{t:.1f}' for t in timings)}")
+    print(f"Median import time: {median:.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+    failed = False
+    deferred = [name for name in DEFERRED_MODULES if name in modules]
+    if deferred:
+        print(f"FAIL: imported at startup but should load on first use: {', '.join(deferred)}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"FAIL: startup import exceeds the budget by {median - args.budget_ms:.1f} ms")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
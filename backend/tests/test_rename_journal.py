@@ -0,0 +1,75 @@
+"""Crash recovery of the rename journal"""
+import asyncio
+import os
+import pytest
+from app.core.rename_journal import RenameJournal, STATE_APPLYING, STATE_APPLIED, STATE_UNDONE
+
+def _tear_last_line(path: str) -> None:
+    """Simulate a crash in the middle of writing a marker"""
+    with open(path, "ab") as f:
+        f.write(b'{"done":')
+
+def test_resume_after_torn_line_keeps_later_markers(tmp_path):
+    ops = [(str(tmp_path / f"a{i}"), str(tmp_path / f"b{i}")) for i in range(3)]
+    journal = RenameJournal.create(str(tmp_path / "journals"), ops)
+    journal.set_state(STATE_APPLYING)
+    journal.mark_done(0)
+    journal.close()
+    _tear_last_line(journal.path)
+
+    resumed = RenameJournal.load(journal.path)
+    assert resumed.state == STATE_APPLYING
+    assert resumed.done == {0}
+    resumed.mark_done(1)
+    resumed.mark_done(2)
+    resumed.set_state(STATE_APPLIED)
+    resumed.close()
+
+    reloaded = RenameJournal.load(journal.path)
+    assert reloaded.state == STATE_APPLIED
+    assert reloaded.done == {0, 1, 2}
+    # Undo reverts exactly the completed renames
+    assert sorted(reloaded.done, reverse=True) == [2, 1, 0]
+
+def test_torn_line_without_newline_is_cut(tmp_path):
+    journal = RenameJournal.create(str(tmp_path), [("a", "b")])
+    journal.mark_done(0)
+    journal.close()
+    with open(journal.path, "rb+") as f:
+        # Crash after the marker but before its newline
+        f.seek(-1, os.SEEK_END)
+        f.truncate()
+
+    resumed = RenameJournal.load(journal.path)
+    assert resumed.done == set()
+    resumed.mark_done(0)
+    resumed.close()
+    assert RenameJournal.load(journal.path).done == {0}
+
+def test_resume_and_undo_after_torn_line(tmp_path):
+    pytest.importorskip("pydantic")
+    from app.services.rename_service import RenameService
+
+    sources = [tmp_path / f"a{i}.mkv" for i in range(3)]
+    for source in sources:
+        source.write_text(source.name)
+    ops = [(str(source), str(tmp_path / f"b{i}.mkv")) for i, source in enumerate(sources)]
+
+    service = RenameService.__new__(RenameService)
+    service.journal_dir = str(tmp_path / "journals")
+    journal = RenameJournal.create(service.journal_dir, ops)
+    journal.set_state(STATE_APPLYING)
+    # The first rename completed before the crash
+    os.rename(ops[0][0], ops[0][1])
+    journal.mark_done(0)
+    journal.close()
+    _tear_last_line(journal.path)
+
+    report = asyncio.run(service.resume(journal.batch_id))
+    assert report["state"] == STATE_APPLIED
+    assert RenameJournal.load(journal.path).done == {0, 1, 2}
+
+    report = asyncio.run(service.undo(journal.batch_id))
+    assert report["state"] == STATE_UNDONE
+    assert all(source.exists() for source in sources)
+    assert not any(os.path.exists(dst) for _, dst in ops)